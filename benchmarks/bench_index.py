@@ -0,0 +1,273 @@
+"""Benchmark of the index on synthetic Django projects.
+
+Run with ``python benchmarks/bench_index.py``. Generates projects at several
+scales (see synthetic_project.py), times building and updating the index and
+the queries behind completion and diagnostics, and optionally stores the
+results as JSON to compare against a run on another commit.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from synthetic_project import Scale, SyntheticWorkspace, generate_workspace
+
+from hx_requests_lsp.index import HxRequestIndex
+from hx_requests_lsp.template_parser import parse_template_for_hx_requests
+
+# Bumped whenever the layout of the results file changes
+RESULTS_VERSION = 1
+
+SCALES = {
+    "small": Scale(apps=5, requests_per_app=10, templates_per_app=20, usages_per_template=4),
+    "medium": Scale(apps=20, requests_per_app=25, templates_per_app=50, usages_per_template=6),
+    "large": Scale(apps=60, requests_per_app=40, templates_per_app=100, usages_per_template=8),
+}
+
+# Incremental updates timed per round
+UPDATES_PER_ROUND = 50
+
+# Slowdown (as a fraction) beyond which --compare reports a regression
+DEFAULT_THRESHOLD = 0.2
+
+
+def measure(func: Callable[[], Any], repeat: int, number: int = 1) -> dict[str, float]:
+    """Time a function, taking the best of several rounds.
+
+    Args:
+        func: Function to time
+        repeat: Rounds to run
+        number: Calls per round
+
+    Returns:
+        Seconds per call: best and mean over the rounds
+    """
+    rounds = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        rounds.append((time.perf_counter() - start) / number)
+    return {"best_s": min(rounds), "mean_s": statistics.fmean(rounds), "calls": number}
+
+
+def run_scale(root: Path, scale: Scale, repeat: int) -> dict[str, Any]:
+    """Generate a project at one scale and time the index operations on it."""
+    start = time.perf_counter()
+    workspace = generate_workspace(root, scale)
+    generated = time.perf_counter() - start
+
+    index = HxRequestIndex(root)
+    operations = {"build_full_index": measure(index.build_full_index, repeat)}
+    operations["template_scan"] = _template_scan(workspace, repeat)
+    operations["update_file_python"] = _update_python(index, workspace, repeat)
+    operations["update_file_template"] = _update_template(index, workspace, repeat)
+    operations.update(_relevance(root, workspace, repeat))
+    operations["find_undefined_usages"] = measure(index.find_undefined_usages, repeat)
+    operations["find_unused_definitions"] = measure(index.find_unused_definitions, repeat)
+    operations.update(_search(index, workspace, repeat))
+
+    return {
+        "scale": vars(scale),
+        "workspace": {
+            "python_files": len(workspace.python_files),
+            "template_files": len(workspace.template_files),
+            "definitions": len(workspace.names),
+            "usages": workspace.usage_count,
+            "bytes": workspace.total_bytes,
+            "generate_s": generated,
+        },
+        "operations": operations,
+    }
+
+
+def _template_scan(workspace: SyntheticWorkspace, repeat: int) -> dict[str, float]:
+    """Parse every template from memory, reporting throughput."""
+    sources = [(str(path), path.read_text(encoding="utf-8")) for path in workspace.template_files]
+    size = sum(len(source.encode()) for _, source in sources)
+
+    def scan():
+        for path, source in sources:
+            parse_template_for_hx_requests(source, path)
+
+    result = measure(scan, repeat)
+    result["files_per_s"] = len(sources) / result["best_s"]
+    result["mb_per_s"] = size / 1e6 / result["best_s"]
+    return result
+
+
+def _update_python(
+    index: HxRequestIndex, workspace: SyntheticWorkspace, repeat: int
+) -> dict[str, float]:
+    """Re-index edited buffers of hx_request modules, as when typing in one."""
+    modules = [path for path in workspace.python_files if path.name.startswith("views_")]
+    sources = [(path, path.read_text(encoding="utf-8")) for path in modules[:UPDATES_PER_ROUND]]
+    edits = iter(range(10**9))
+
+    def update():
+        # A fresh comment each time, so the content is never already indexed
+        edit = next(edits)
+        path, source = sources[edit % len(sources)]
+        index.update_file(path, f"{source}# edit {edit}\n", version=edit)
+
+    return measure(update, repeat, number=UPDATES_PER_ROUND)
+
+
+def _update_template(
+    index: HxRequestIndex, workspace: SyntheticWorkspace, repeat: int
+) -> dict[str, float]:
+    """Re-index edited template buffers."""
+    sources = [
+        (path, path.read_text(encoding="utf-8")) for path in workspace.template_files[:UPDATES_PER_ROUND]
+    ]
+    edits = iter(range(10**9))
+
+    def update():
+        edit = next(edits)
+        path, source = sources[edit % len(sources)]
+        index.update_file(path, f"{source}{{# edit {edit} #}}\n", version=edit)
+
+    return measure(update, repeat, number=UPDATES_PER_ROUND)
+
+
+def _relevance(root: Path, workspace: SyntheticWorkspace, repeat: int) -> dict[str, dict[str, float]]:
+    """Sort definitions for a template of every app, on a fresh index and once cached."""
+    apps = sorted({path.parent.name: path for path in workspace.template_files}.values())
+
+    def sort_all():
+        for path in apps:
+            index.get_definitions_sorted_by_relevance(path)
+
+    # Rebuild the index before each cold round, outside the timing, to drop the per-app cache
+    cold_rounds = []
+    for _ in range(repeat):
+        index = HxRequestIndex(root)
+        index.build_full_index()
+        cold_rounds.append(measure(sort_all, 1)["best_s"])
+    cold = {"best_s": min(cold_rounds), "mean_s": statistics.fmean(cold_rounds), "calls": 1}
+    cached = measure(sort_all, repeat)
+    for result in (cold, cached):
+        result["per_app_s"] = result["best_s"] / len(apps)
+    return {"relevance_sort_cold": cold, "relevance_sort_cached": cached}
+
+
+def _search(
+    index: HxRequestIndex, workspace: SyntheticWorkspace, repeat: int
+) -> dict[str, dict[str, float]]:
+    """Search definitions by a fragment of a name, and by the name with two letters swapped."""
+    name = workspace.names[len(workspace.names) // 2]
+    fragment = name[len(name) // 3 :]
+    typo = name[:2] + name[3] + name[2] + name[4:]
+    return {
+        "search_definitions": measure(lambda: index.search_definitions(fragment, 100), repeat, 100),
+        "search_definitions_typo": measure(lambda: index.search_definitions(typo, 100), repeat, 100),
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Compare two results files, returning a line per operation that got slower than the threshold."""
+    regressions = []
+    for scale, result in current["results"].items():
+        old = baseline.get("results", {}).get(scale)
+        if old is None:
+            continue
+        for name, timing in result["operations"].items():
+            old_timing = old["operations"].get(name)
+            if old_timing is None or not old_timing["best_s"]:
+                continue
+            ratio = timing["best_s"] / old_timing["best_s"]
+            line = (
+                f"{scale:>8} {name:<28} {old_timing['best_s'] * 1000:10.3f} ms -> "
+                f"{timing['best_s'] * 1000:10.3f} ms ({ratio:.2f}x)"
+            )
+            print(line)
+            if ratio > 1 + threshold:
+                regressions.append(line)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scale",
+        action="append",
+        choices=list(SCALES),
+        help="Project size to benchmark; may be repeated (default: small and medium)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Rounds per operation; the best is kept")
+    parser.add_argument("--output", metavar="PATH", help="Write the results as JSON to this file")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="Results file of an earlier run to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Slowdown, as a fraction, that --compare reports as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for name in args.scale or ["small", "medium"]:
+        with tempfile.TemporaryDirectory(prefix=f"hx-bench-{name}-") as root:
+            result = run_scale(Path(root), SCALES[name], args.repeat)
+        results["results"][name] = result
+        workspace = result["workspace"]
+        print(
+            f"{name}: {workspace['python_files']} Python files, {workspace['template_files']} templates, "
+            f"{workspace['usages']} usages",
+            file=sys.stderr,
+        )
+        for operation, timing in result["operations"].items():
+            print(f"  {operation:<28} {timing['best_s'] * 1000:10.3f} ms", file=sys.stderr)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(
+                f"{len(regressions)} operation(s) regressed by more than {args.threshold:.0%}",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""Benchmark of the server's startup: import time and time to first response.
+
+Run with ``python benchmarks/bench_startup.py``. Measures, in fresh
+interpreters, how long the command-line entry point and the server module
+take to import (``-X importtime``), and how long a server takes from launch
+to its first useful answer on synthetic projects (see synthetic_project.py),
+with the full and the lazy index. Results have the layout of bench_index.py,
+so ``--compare`` works the same way.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from bench_index import DEFAULT_THRESHOLD, RESULTS_VERSION, SCALES, _git_commit, compare
+from synthetic_project import Scale, generate_workspace
+
+from hx_requests_lsp.template_parser import parse_template_for_hx_requests
+
+# Modules whose import time is measured: the command line, which is all that
+# --connect needs, and the language server
+IMPORTED_MODULES = ("hx_requests_lsp.cli", "hx_requests_lsp.server")
+
+# Index modes a server is launched with, as initializationOptions
+INDEX_MODES = {"full": {}, "lazy": {"lazyIndex": True}}
+
+# Seconds to wait for a launched server's first useful answer
+FIRST_RESPONSE_TIMEOUT = 120.0
+
+# Seconds between retries of a request the server can't answer yet; polling more often
+# slows the index build it is waiting for
+RETRY_INTERVAL = 0.05
+
+# Make the package importable by the launched interpreters without installing it
+SOURCE_ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_time(module: str, repeat: int) -> dict[str, float]:
+    """Measure how long a module takes to import in a fresh interpreter, with -X importtime."""
+    rounds = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=_environ(),
+        )
+        # Lines read "import time: self [us] | cumulative | imported package"
+        line = next(
+            line for line in reversed(result.stderr.splitlines()) if line.endswith(f"| {module}")
+        )
+        rounds.append(int(line.split("|")[1]) / 1e6)
+    return {"best_s": min(rounds), "mean_s": statistics.fmean(rounds), "calls": 1}
+
+
+def first_response(root: Path, template: Path, position: dict[str, int], options: dict, repeat: int):
+    """Launch servers and time their first answers.
+
+    Returns:
+        Timings from launch to the initialize response, and to the first
+        go-to-definition answer that finds the hx_request under the cursor
+    """
+    initialize_rounds, answer_rounds = [], []
+    for _ in range(repeat):
+        initialized, answered = _launch_and_ask(root, template, position, options)
+        initialize_rounds.append(initialized)
+        answer_rounds.append(answered)
+    return (
+        {"best_s": min(initialize_rounds), "mean_s": statistics.fmean(initialize_rounds), "calls": 1},
+        {"best_s": min(answer_rounds), "mean_s": statistics.fmean(answer_rounds), "calls": 1},
+    )
+
+
+def run_scale(root: Path, scale: Scale, repeat: int) -> dict[str, Any]:
+    """Generate a project at one scale and time server startup on it."""
+    workspace = generate_workspace(root, scale)
+    template, position = _first_usage(workspace.template_files)
+
+    operations = {}
+    for mode, options in INDEX_MODES.items():
+        initialized, answered = first_response(root, template, position, options, repeat)
+        operations[f"initialize_{mode}"] = initialized
+        operations[f"first_response_{mode}"] = answered
+    return {
+        "scale": vars(scale),
+        "workspace": {
+            "python_files": len(workspace.python_files),
+            "template_files": len(workspace.template_files),
+            "definitions": len(workspace.names),
+            "usages": workspace.usage_count,
+        },
+        "operations": operations,
+    }
+
+
+class _Client:
+    """Minimal LSP client talking to a launched server over stdio."""
+
+    def __init__(self, args: list[str]):
+        self.process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=_environ(),
+        )
+        self._ids = itertools.count(1)
+
+    def notify(self, method: str, params: Any) -> None:
+        self._send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def request(self, method: str, params: Any) -> Any:
+        """Send a request and wait for its result, answering the server's own requests with null."""
+        request_id = next(self._ids)
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        while True:
+            message = self._receive()
+            if message.get("id") == request_id and "method" not in message:
+                return message.get("result")
+            if "id" in message and "method" in message:
+                self._send({"jsonrpc": "2.0", "id": message["id"], "result": None})
+
+    def close(self) -> None:
+        try:
+            self.request("shutdown", None)
+            self.notify("exit", None)
+            self.process.wait(timeout=10)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+    def _send(self, message: dict) -> None:
+        body = json.dumps(message).encode()
+        self.process.stdin.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self.process.stdin.flush()
+
+    def _receive(self) -> dict:
+        length = None
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                raise EOFError("The server exited")
+            if line in (b"\r\n", b"\n"):
+                break
+            name, _, value = line.decode("ascii").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return json.loads(self.process.stdout.read(length))
+
+
+def _launch_and_ask(
+    root: Path, template: Path, position: dict[str, int], options: dict
+) -> tuple[float, float]:
+    start = time.perf_counter()
+    client = _Client([sys.executable, "-m", "hx_requests_lsp.cli", "--stdio", "--log-level", "WARNING"])
+    try:
+        client.request(
+            "initialize",
+            {
+                "processId": os.getpid(),
+                "rootUri": root.as_uri(),
+                "capabilities": {},
+                "initializationOptions": options,
+            },
+        )
+        initialized = time.perf_counter() - start
+        client.notify("initialized", {})
+        uri = template.as_uri()
+        client.notify(
+            "textDocument/didOpen",
+            {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "html",
+                    "version": 1,
+                    "text": template.read_text(),
+                }
+            },
+        )
+
+        deadline = start + FIRST_RESPONSE_TIMEOUT
+        while not client.request(
+            "textDocument/definition", {"textDocument": {"uri": uri}, "position": position}
+        ):
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"No answer within {FIRST_RESPONSE_TIMEOUT:.0f}s")
+            time.sleep(RETRY_INTERVAL)
+        return initialized, time.perf_counter() - start
+    finally:
+        client.close()
+
+
+def _first_usage(template_files: list[Path]) -> tuple[Path, dict[str, int]]:
+    """Find a template and the LSP position of a defined hx_request used in it."""
+    for path in template_files:
+        for usage in parse_template_for_hx_requests(path.read_text(), str(path)):
+            if not usage.is_variable and "_missing_" not in usage.name:
+                return path, {"line": usage.line_number - 1, "character": usage.column}
+    raise ValueError("No template uses a defined hx_request")
+
+
+def _environ() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SOURCE_ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scale",
+        action="append",
+        choices=list(SCALES),
+        help="Project size to benchmark; may be repeated (default: small and medium)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Rounds per measurement; the best is kept")
+    parser.add_argument("--output", metavar="PATH", help="Write the results as JSON to this file")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="Results file of an earlier run to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Slowdown, as a fraction, that --compare reports as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "repeat": args.repeat,
+        },
+        "results": {
+            "imports": {
+                "operations": {
+                    f"import_{module.rsplit('.', 1)[-1]}": import_time(module, args.repeat)
+                    for module in IMPORTED_MODULES
+                }
+            }
+        },
+    }
+    for name in args.scale or ["small", "medium"]:
+        with tempfile.TemporaryDirectory(prefix=f"hx-bench-{name}-") as root:
+            results["results"][name] = run_scale(Path(root), SCALES[name], args.repeat)
+
+    for name, result in results["results"].items():
+        workspace = result.get("workspace")
+        if workspace:
+            print(
+                f"{name}: {workspace['python_files']} Python files, "
+                f"{workspace['template_files']} templates",
+                file=sys.stderr,
+            )
+        else:
+            print(f"{name}:", file=sys.stderr)
+        for operation, timing in result["operations"].items():
+            print(f"  {operation:<28} {timing['best_s'] * 1000:10.3f} ms", file=sys.stderr)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(
+                f"{len(regressions)} operation(s) regressed by more than {args.threshold:.0%}",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Throughput benchmark for the template parser.
+
+Run with ``python benchmarks/bench_template_parser.py``. Parses a synthetic
+corpus of Django templates and reports throughput in MB/s.
+"""
+
+import argparse
+import random
+import time
+
+from hx_requests_lsp.template_parser import parse_template_for_hx_requests
+
+PLAIN_LINES = [
+    '<div class="row">',
+    '    <span class="label">{{ item.title }}</span>',
+    "    <p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>",
+    "</div>",
+    "{% if user.is_authenticated %}",
+    "{% endif %}",
+    "{% for item in items %}",
+    "{% endfor %}",
+    "{% include 'partials/row.html' %}",
+    "<a href=\"{% url 'notes:detail' item.pk %}\">{% trans 'Open' %}</a>",
+]
+
+HX_LINES = [
+    "<button {{% hx_post '{name}' object=item %}}>Save</button>",
+    "<div {{% hx_get '{name}' %}} hx-trigger=\"load\"></div>",
+    "<button {{% hx_vals hx_request_name='{name}' title='Edit' %}}>Edit</button>",
+    "<tr {{% hx_request {name} row=row %}}></tr>",
+]
+
+
+def generate_template(rng: random.Random, lines: int, hx_density: float) -> str:
+    """Generate a synthetic template.
+
+    Args:
+        rng: Random number generator
+        lines: Number of lines in the template
+        hx_density: Fraction of lines containing an hx tag
+
+    Returns:
+        Template content
+    """
+    result = []
+    for _ in range(lines):
+        if rng.random() < hx_density:
+            name = f"request_{rng.randrange(500)}"
+            result.append(rng.choice(HX_LINES).format(name=name))
+        else:
+            result.append(rng.choice(PLAIN_LINES))
+    return "\n".join(result) + "\n"
+
+
+def run(templates: int, lines: int, hx_density: float, repeat: int, seed: int) -> dict[str, float]:
+    """Parse the synthetic corpus and measure throughput.
+
+    Returns:
+        Dictionary with corpus size, usage count, best time and MB/s
+    """
+    rng = random.Random(seed)
+    corpus = [generate_template(rng, lines, hx_density) for _ in range(templates)]
+    size = sum(len(content.encode("utf-8")) for content in corpus)
+
+    best = float("inf")
+    usages = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        usages = sum(len(parse_template_for_hx_requests(content)) for content in corpus)
+        best = min(best, time.perf_counter() - start)
+
+    return {
+        "bytes": size,
+        "usages": usages,
+        "seconds": best,
+        "mb_per_second": size / best / 1_000_000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--templates", type=int, default=200, help="Number of templates")
+    parser.add_argument("--lines", type=int, default=500, help="Lines per template")
+    parser.add_argument("--hx-density", type=float, default=0.05, help="Fraction of lines with hx tags")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs to take the best of")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    result = run(args.templates, args.lines, args.hx_density, args.repeat, args.seed)
+    print(
+        f"{result['bytes'] / 1_000_000:.1f} MB, {result['usages']} usages: "
+        f"{result['seconds'] * 1000:.1f} ms, {result['mb_per_second']:.1f} MB/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
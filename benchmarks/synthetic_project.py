@@ -0,0 +1,198 @@
+"""Generator of synthetic Django projects for the index benchmark."""
+
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Base classes shipped by hx-requests that generated classes build on
+LIBRARY_BASES = ("BaseHxRequest", "FormHxRequest", "ModalHxRequest", "DeleteHxRequest")
+
+# Template tags generated usages are spread across, most common first
+USAGE_TAGS = ("hx_post", "hx_get", "hx_vals", "hx_request")
+USAGE_TAG_WEIGHTS = (5, 4, 2, 1)
+
+# Share of generated usages that name an hx_request nobody defines, or a variable
+UNDEFINED_RATE = 0.02
+VARIABLE_RATE = 0.03
+
+# hx_request classes per Python module
+REQUESTS_PER_MODULE = 10
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Size of a synthetic project."""
+
+    apps: int  # Django apps
+    requests_per_app: int  # hx_request classes in each app
+    templates_per_app: int  # Templates in each app
+    usages_per_template: int  # Average hx_request usages in each template
+
+
+@dataclass
+class SyntheticWorkspace:
+    """Files and names of a generated project."""
+
+    root: Path
+    scale: Scale
+    python_files: list[Path] = field(default_factory=list)
+    template_files: list[Path] = field(default_factory=list)
+    names: list[str] = field(default_factory=list)  # Defined hx_request names
+    usage_count: int = 0
+    total_bytes: int = 0
+
+
+def generate_workspace(root: str | Path, scale: Scale, seed: int = 0) -> SyntheticWorkspace:
+    """Write a synthetic Django project.
+
+    Each app has a ``hx_requests/base.py`` with app-level base classes built
+    on the hx-requests library, and modules of hx_request classes that
+    inherit from them, so base-class resolution follows real import chains.
+    Templates mix plain markup with ``hx_post``, ``hx_get``, ``hx_vals`` and
+    ``hx_request`` usages, mostly of the app's own hx_requests, with a few
+    of other apps, unknown names and variables.
+
+    Args:
+        root: Directory to write the project into (created if missing)
+        scale: Size of the project
+        seed: Seed for the random choices, so a scale always generates the same project
+
+    Returns:
+        Description of what was written
+    """
+    rng = random.Random(seed)
+    workspace = SyntheticWorkspace(root=Path(root), scale=scale)
+
+    apps = [f"app{i:03d}" for i in range(scale.apps)]
+    names_by_app = {
+        app: [f"{app}_request_{j:04d}" for j in range(scale.requests_per_app)] for app in apps
+    }
+    for app in apps:
+        _write_hx_requests(workspace, app, names_by_app[app], rng)
+    for app in apps:
+        _write_templates(workspace, app, names_by_app, rng)
+    return workspace
+
+
+def _write_hx_requests(
+    workspace: SyntheticWorkspace, app: str, names: list[str], rng: random.Random
+) -> None:
+    package = workspace.root / app / "hx_requests"
+    package.mkdir(parents=True, exist_ok=True)
+    app_class = "".join(part.capitalize() for part in app.split("_"))
+
+    bases = [f"{app_class}{library_base}" for library_base in LIBRARY_BASES]
+    base_source = [
+        '"""Base hx_requests of the app."""',
+        "",
+        f"from hx_requests.hx_requests import {', '.join(LIBRARY_BASES)}",
+        "",
+    ]
+    for base, library_base in zip(bases, LIBRARY_BASES, strict=True):
+        base_source += [
+            "",
+            f"class {base}({library_base}):",
+            f'    """Shared behaviour of {app} hx_requests."""',
+            "",
+            "    def get_context_data(self, **kwargs):",
+            "        context = super().get_context_data(**kwargs)",
+            f'        context["app"] = "{app}"',
+            "        return context",
+            "",
+        ]
+    _write(workspace, package / "base.py", base_source, python=True)
+    _write(workspace, package / "__init__.py", [], python=True)
+
+    for start in range(0, len(names), REQUESTS_PER_MODULE):
+        module_names = names[start : start + REQUESTS_PER_MODULE]
+        source = [
+            "from django.contrib import messages",
+            "",
+            f"from {app}.hx_requests.base import {', '.join(bases)}",
+            f"from {app}.models import Item",
+            "",
+        ]
+        for name in module_names:
+            class_name = "".join(part.capitalize() for part in name.split("_"))
+            source += [
+                "",
+                f"class {class_name}({rng.choice(bases)}):",
+                f'    """Handles {name.replace("_", " ")}."""',
+                "",
+                f'    name = "{name}"',
+                f'    GET_template = "{app}/partials/{name}.html"',
+            ]
+            if rng.random() < 0.5:
+                source.append(f'    POST_template = "{app}/partials/{name}_result.html"')
+            source += [
+                "",
+                "    def post(self, request, *args, **kwargs):",
+                "        item = Item.objects.get(pk=kwargs['pk'])",
+                "        item.save()",
+                '        messages.success(request, "Saved")',
+                "        return super().post(request, *args, **kwargs)",
+                "",
+            ]
+        _write(workspace, package / f"views_{start // REQUESTS_PER_MODULE:03d}.py", source, python=True)
+        workspace.names.extend(module_names)
+
+
+def _write_templates(
+    workspace: SyntheticWorkspace, app: str, names_by_app: dict[str, list[str]], rng: random.Random
+) -> None:
+    templates = workspace.root / app / "templates" / app
+    templates.mkdir(parents=True, exist_ok=True)
+    other_apps = [other for other in names_by_app if other != app] or [app]
+
+    for i in range(workspace.scale.templates_per_app):
+        lines = ['{% extends "base.html" %}', "{% load hx_requests %}", "", "{% block content %}"]
+        usages = rng.randint(0, 2 * workspace.scale.usages_per_template)
+        for _ in range(usages):
+            lines += _markup(rng)
+            lines.append(_usage(rng, app, names_by_app, other_apps))
+        lines += _markup(rng)
+        lines.append("{% endblock %}")
+        _write(workspace, templates / f"page_{i:04d}.html", lines, python=False)
+        workspace.usage_count += usages
+
+
+def _usage(
+    rng: random.Random, app: str, names_by_app: dict[str, list[str]], other_apps: list[str]
+) -> str:
+    roll = rng.random()
+    if roll < UNDEFINED_RATE:
+        name = f"'{app}_missing_{rng.randrange(1000)}'"
+    elif roll < UNDEFINED_RATE + VARIABLE_RATE:
+        name = "request_name"
+    else:
+        # Mostly the app's own hx_requests, sometimes another app's
+        source_app = app if rng.random() < 0.9 else rng.choice(other_apps)
+        name = f"'{rng.choice(names_by_app[source_app])}'"
+
+    tag = rng.choices(USAGE_TAGS, USAGE_TAG_WEIGHTS)[0]
+    if tag == "hx_vals":
+        return f"    <div hx-post=\"{{% url 'hx' %}}\" {{% hx_vals hx_request_name={name} pk=item.pk %}}></div>"
+    target = rng.choice(("#list", "#detail", "this", "closest tr"))
+    return f'    <button {{% {tag} {name} %}} hx-target="{target}" class="btn">Go</button>'
+
+
+def _markup(rng: random.Random) -> list[str]:
+    return [
+        rng.choice(
+            (
+                '    <div class="row">',
+                "    </div>",
+                "    <p>{{ item.description|truncatewords:20 }}</p>",
+                "    {% for item in items %}<li>{{ item.name }}</li>{% endfor %}",
+                '    <a href="{% url "detail" item.pk %}">{% trans "Details" %}</a>',
+            )
+        )
+        for _ in range(rng.randint(1, 4))
+    ]
+
+
+def _write(workspace: SyntheticWorkspace, path: Path, lines: list[str], python: bool) -> None:
+    text = "\n".join(lines) + "\n"
+    path.write_text(text, encoding="utf-8")
+    workspace.total_bytes += len(text.encode())
+    (workspace.python_files if python else workspace.template_files).append(path)
@@ -1,7 +1,6 @@
 """hx-requests Language Server Protocol implementation."""
 
-from hx_requests_lsp.python_parser import HxRequestDefinition, parse_hx_requests_from_file
-from hx_requests_lsp.template_parser import HxRequestUsage, parse_template_for_hx_requests
+from importlib import import_module
 
 __all__ = [
     "HxRequestDefinition",
@@ -9,3 +8,19 @@ __all__ = [
     "parse_hx_requests_from_file",
     "parse_template_for_hx_requests",
 ]
+
+# Maps each public name to the module defining it; modules are imported on first use,
+# so that entry points which don't parse anything (e.g. --connect) start quickly
+_EXPORTS = {
+    "HxRequestDefinition": "hx_requests_lsp.python_parser",
+    "parse_hx_requests_from_file": "hx_requests_lsp.python_parser",
+    "HxRequestUsage": "hx_requests_lsp.template_parser",
+    "parse_template_for_hx_requests": "hx_requests_lsp.template_parser",
+}
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module), name)
@@ -152,3 +152,17 @@ def resolve_all_base_classes(
 ) -> list[BaseClassInfo]:
     """Resolve all base classes for an HxRequest definition."""
     return [resolve_base_class(name, source_file, imports, workspace_root) for name in base_class_names]
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    """Return hit and miss counters of the resolver's caches."""
+    caches = {
+        "class_lines": _parse_file_for_classes,
+        "module_paths": _find_module_path,
+        "installed_classes": _find_class_in_installed_module,
+    }
+    stats = {}
+    for name, cached in caches.items():
+        info = cached.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
+    return stats
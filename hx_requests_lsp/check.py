@@ -0,0 +1,311 @@
+"""Offline ``check`` command reporting undefined and unused hx_requests."""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from importlib.metadata import version as get_version
+from pathlib import Path
+from typing import TYPE_CHECKING, TextIO
+
+from hx_requests_lsp.discovery import DiscoveryOptions, discover_workspace_files
+
+if TYPE_CHECKING:
+    from hx_requests_lsp.index import HxRequestIndex
+
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES = 200
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+INFORMATION_URI = "https://github.com/jordannpenn/hx-requests-lsp"
+
+# Rule ID -> (SARIF level, short description)
+RULES = {
+    "unknown-hx-request": ("error", "Template uses an hx_request name that is not defined"),
+    "unused-hx-request": ("warning", "hx_request is defined but never used in a template"),
+}
+
+
+@dataclass
+class Finding:
+    """A problem reported by the check command."""
+
+    rule: str  # Rule ID, a key of RULES
+    message: str
+    file_path: str  # Absolute path of the file
+    line: int  # 1-based
+    column: int | None = None  # 0-based start column, if known
+    end_column: int | None = None  # 0-based end column, if known
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the check command's arguments to a parser."""
+    parser.add_argument("path", nargs="?", default=".", help="Project root to check (default: .)")
+    parser.add_argument(
+        "--format",
+        choices=["text", "json", "sarif"],
+        default="text",
+        help="Output format (default: text)",
+    )
+    parser.add_argument(
+        "--no-unused", action="store_true", help="Don't report definitions that are never used"
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes used to parse files (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--exclude-dir",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="Extra directory name to skip; may be repeated",
+    )
+    parser.add_argument(
+        "--template-dir",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="Extra template root, e.g. from TEMPLATES['DIRS']; may be repeated",
+    )
+    parser.add_argument(
+        "--template-ext",
+        action="append",
+        default=[],
+        metavar="EXT",
+        help="Extra template file extension, e.g. .txt; may be repeated",
+    )
+    parser.add_argument(
+        "--no-gitignore", action="store_true", help="Don't skip files ignored by .gitignore"
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep the index in a SQLite database so later runs only parse changed files",
+    )
+    parser.add_argument(
+        "--cache-file", metavar="PATH", help="Database for --cache (default: under the user's cache dir)"
+    )
+
+
+def run(args: argparse.Namespace, stdout: TextIO | None = None, stderr: TextIO | None = None) -> int:
+    """Run the check command.
+
+    Args:
+        args: Parsed arguments (see add_arguments)
+        stdout: Stream for the report (default: sys.stdout)
+        stderr: Stream for the timing summary (default: sys.stderr)
+
+    Returns:
+        Exit code: 0 if there are no findings, 1 if there are, 2 on bad input
+    """
+    # The index and its parsers are only imported when a check runs, not to build the command line
+    from hx_requests_lsp.index import HxRequestIndex
+    from hx_requests_lsp.store import open_store
+
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+
+    root = Path(args.path).resolve()
+    if not root.is_dir():
+        print(f"hx-requests-lsp check: {args.path} is not a directory", file=stderr)
+        return 2
+
+    start = time.perf_counter()
+    options = _discovery_options(args)
+    files = discover_workspace_files(root, options)
+    discovered = time.perf_counter()
+
+    backend = "sqlite" if args.cache or args.cache_file else "memory"
+    index = HxRequestIndex(root, options, open_store(root, backend, args.cache_file))
+    file_count = len(files.python_files) + len(files.template_files)
+    if args.jobs > 1 and file_count >= PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            index.build_full_index(executor, files=files)
+    else:
+        index.build_full_index(files=files)
+    indexed = time.perf_counter()
+
+    findings = collect_findings(index, include_unused=not args.no_unused)
+    index.close()
+
+    if args.format == "json":
+        json.dump(_to_json(findings, root), stdout, indent=2)
+        stdout.write("\n")
+    elif args.format == "sarif":
+        json.dump(_to_sarif(findings, root), stdout, indent=2)
+        stdout.write("\n")
+    else:
+        for finding in findings:
+            stdout.write(_to_text(finding, root) + "\n")
+
+    print(
+        f"Checked {len(files.python_files)} hx_request files and {len(files.template_files)} templates: "
+        f"{len(findings)} finding(s) in {indexed - start:.2f}s "
+        f"(discovery {(discovered - start) * 1000:.0f} ms, parsing {(indexed - discovered) * 1000:.0f} ms)",
+        file=stderr,
+    )
+    return 1 if findings else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Parse arguments and run the check command."""
+    parser = argparse.ArgumentParser(
+        prog="hx-requests-lsp check", description="Report undefined and unused hx_requests"
+    )
+    add_arguments(parser)
+    return run(parser.parse_args(argv))
+
+
+def collect_findings(index: "HxRequestIndex", include_unused: bool = True) -> list[Finding]:
+    """Collect undefined usages and, optionally, unused definitions from an index.
+
+    Template variables are skipped, as in the language server's diagnostics.
+
+    Args:
+        index: A built index
+        include_unused: Whether to report definitions that are never used
+
+    Returns:
+        Findings sorted by file and position
+    """
+    findings = [
+        Finding(
+            rule="unknown-hx-request",
+            message=f"Unknown hx_request: '{usage.name}'",
+            file_path=usage.file_path,
+            line=usage.line_number,
+            column=usage.column,
+            end_column=usage.end_column,
+        )
+        for usage in index.find_undefined_usages()
+        if not usage.is_variable
+    ]
+    if include_unused:
+        findings.extend(
+            Finding(
+                rule="unused-hx-request",
+                message=f"hx_request '{definition.name}' ({definition.class_name}) is never used",
+                file_path=definition.file_path,
+                line=definition.line_number,
+            )
+            for definition in index.find_unused_definitions()
+        )
+    findings.sort(key=lambda f: (f.file_path, f.line, f.column or 0, f.rule))
+    return findings
+
+
+def _discovery_options(args: argparse.Namespace) -> DiscoveryOptions:
+    options = DiscoveryOptions(use_gitignore=not args.no_gitignore)
+    if args.exclude_dir:
+        options.excluded_dirs = options.excluded_dirs | set(args.exclude_dir)
+    if args.template_dir:
+        options.template_dirs = list(args.template_dir)
+    if args.template_ext:
+        extensions = (ext if ext.startswith(".") else f".{ext}" for ext in args.template_ext)
+        options.template_extensions = tuple(dict.fromkeys([*options.template_extensions, *extensions]))
+    return options
+
+
+def _relative(file_path: str, root: Path) -> str:
+    """Path relative to the root where possible, with forward slashes."""
+    try:
+        return Path(file_path).relative_to(root).as_posix()
+    except ValueError:
+        return Path(file_path).as_posix()
+
+
+def _to_text(finding: Finding, root: Path) -> str:
+    level = RULES[finding.rule][0]
+    column = f":{finding.column + 1}" if finding.column is not None else ""
+    return (
+        f"{_relative(finding.file_path, root)}:{finding.line}{column}: "
+        f"{level}: {finding.message} [{finding.rule}]"
+    )
+
+
+def _to_json(findings: list[Finding], root: Path) -> dict:
+    return {
+        "findings": [
+            {
+                "rule": f.rule,
+                "level": RULES[f.rule][0],
+                "message": f.message,
+                "path": _relative(f.file_path, root),
+                "line": f.line,
+                "column": f.column,
+                "end_column": f.end_column,
+            }
+            for f in findings
+        ],
+        "summary": {rule: sum(1 for f in findings if f.rule == rule) for rule in RULES},
+    }
+
+
+def _package_version() -> str:
+    # Read from the package metadata rather than the server module, which would import pygls
+    try:
+        return get_version("hx-requests-lsp")
+    except Exception:
+        return "0.0.0"  # Fallback for development
+
+
+def _to_sarif(findings: list[Finding], root: Path) -> dict:
+    results = []
+    for f in findings:
+        region: dict[str, int] = {"startLine": f.line}
+        if f.column is not None:
+            # SARIF columns are 1-based and the end column is exclusive
+            region["startColumn"] = f.column + 1
+        if f.end_column is not None:
+            region["endColumn"] = f.end_column + 1
+        results.append(
+            {
+                "ruleId": f.rule,
+                "level": RULES[f.rule][0],
+                "message": {"text": f.message},
+                "locations": [
+                    {
+                        "physicalLocation": {
+                            "artifactLocation": {
+                                "uri": _relative(f.file_path, root),
+                                "uriBaseId": "%SRCROOT%",
+                            },
+                            "region": region,
+                        }
+                    }
+                ],
+            }
+        )
+
+    return {
+        "$schema": SARIF_SCHEMA,
+        "version": "2.1.0",
+        "runs": [
+            {
+                "tool": {
+                    "driver": {
+                        "name": "hx-requests-lsp",
+                        "version": _package_version(),
+                        "informationUri": INFORMATION_URI,
+                        "rules": [
+                            {
+                                "id": rule,
+                                "shortDescription": {"text": description},
+                                "defaultConfiguration": {"level": level},
+                            }
+                            for rule, (level, description) in RULES.items()
+                        ],
+                    }
+                },
+                "originalUriBaseIds": {"%SRCROOT%": {"uri": root.as_uri() + "/"}},
+                "results": results,
+            }
+        ],
+    }
@@ -0,0 +1,207 @@
+"""Command line of hx-requests-lsp.
+
+Only what a command needs is imported: relaying to the shared daemon
+(``--connect``), which editors run on every start, doesn't import pygls or
+the parsers at all.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from hx_requests_lsp.profiling import DEFAULT_SAMPLE_RATE
+from hx_requests_lsp.relay import (
+    DEFAULT_IDLE_TIMEOUT,
+    connect_to_daemon,
+    default_socket_path,
+    relay_stdio,
+)
+
+# Commands whose output is the point, e.g. in pre-commit hooks, only log warnings by default
+QUIET_COMMANDS = {"check"}
+
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+
+def _configure_logging(level: str) -> None:
+    """Log to stderr at the given level."""
+    logging.basicConfig(level=level)
+    if level != "DEBUG":
+        # pygls logs the body of every message it sends at INFO
+        logging.getLogger("pygls").setLevel(logging.WARNING)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the parser of the command line."""
+    from hx_requests_lsp import check, recording
+
+    parser = argparse.ArgumentParser(description="hx-requests Language Server")
+    parser.add_argument("--stdio", action="store_true", help="Use stdio transport")
+    parser.add_argument("--tcp", action="store_true", help="Use TCP transport")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host")
+    parser.add_argument("--port", type=int, default=2087, help="TCP port")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Serve several editor clients from one shared index, over --tcp or a Unix socket",
+    )
+    parser.add_argument(
+        "--connect",
+        action="store_true",
+        help="Relay stdio to the shared daemon, starting it if it isn't running",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help=(
+            "Unix socket of the shared daemon "
+            "(default: per-user socket in $XDG_RUNTIME_DIR or a private temp directory)"
+        ),
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="Seconds the daemon stays up after its last client disconnects",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        help="Level of the log written to stderr (default: INFO, WARNING for check); DEBUG also "
+        "logs every LSP message",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="Record the messages the client sends to a file, for replaying with the replay command",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        metavar="DIR",
+        help="Write cProfile stats (.prof) of indexing and of sampled requests to a directory",
+    )
+    parser.add_argument(
+        "--profile-sample-rate",
+        type=float,
+        default=DEFAULT_SAMPLE_RATE,
+        metavar="RATE",
+        help=f"Fraction of requests to profile, from 0 to 1 (default: {DEFAULT_SAMPLE_RATE})",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace allocations and write tracemalloc snapshots to --profile-dir once the index is "
+        "built and on the hxRequests.memorySnapshot command",
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    check_parser = subparsers.add_parser(
+        "check", help="Report undefined and unused hx_requests without starting the server"
+    )
+    check.add_arguments(check_parser)
+    # Also accepted after the command; SUPPRESS keeps a level given before it
+    check_parser.add_argument(
+        "--log-level",
+        choices=LOG_LEVELS,
+        default=argparse.SUPPRESS,
+        help="Level of the log written to stderr (default: WARNING)",
+    )
+    replay_parser = subparsers.add_parser(
+        "replay", help="Replay a recorded session against the server and report latencies"
+    )
+    recording.add_arguments(replay_parser)
+    return parser
+
+
+def main():
+    """Run the language server, or one of its commands."""
+    args = build_parser().parse_args()
+    if args.log_level is None:
+        args.log_level = "WARNING" if args.command in QUIET_COMMANDS else "INFO"
+    _configure_logging(args.log_level)
+
+    if args.command == "check":
+        from hx_requests_lsp import check
+
+        sys.exit(check.run(args))
+    if args.command == "replay":
+        from hx_requests_lsp import recording
+
+        sys.exit(recording.run(args))
+
+    if args.connect:
+        _connect(args)
+        return
+
+    from hx_requests_lsp.profiling import Profiler
+    from hx_requests_lsp.server import __version__, server
+
+    if args.profile_dir:
+        server.profiler = Profiler(args.profile_dir, args.profile_sample_rate, args.trace_memory)
+        server.profiler.start()
+
+    if args.daemon:
+        from hx_requests_lsp.daemon import Daemon
+
+        daemon = Daemon(server.create_session, args.idle_timeout)
+        try:
+            if args.tcp:
+                daemon.serve_tcp(args.host, args.port)
+            else:
+                daemon.serve_unix(args.socket or default_socket_path())
+        except OSError as e:
+            sys.exit(f"hx-requests-lsp: can't start the daemon: {e}")
+        return
+
+    if args.record:
+        from hx_requests_lsp.recording import SessionRecorder
+
+        SessionRecorder(args.record, __version__).attach(server.lsp)
+
+    if args.tcp:
+        server.start_tcp(args.host, args.port)
+    else:
+        server.start_io()
+
+
+def _connect(args: argparse.Namespace) -> None:
+    """Relay stdio to the shared daemon, starting it with the same options if needed."""
+    if args.tcp:
+        address = (args.host, args.port)
+        transport = ["--tcp", "--host", args.host, "--port", str(args.port)]
+    else:
+        try:
+            address = args.socket or default_socket_path()
+        except OSError as e:
+            sys.exit(f"hx-requests-lsp: {e}")
+        transport = ["--socket", address]
+    start_command = [
+        sys.executable,
+        "-m",
+        "hx_requests_lsp.cli",
+        "--daemon",
+        *transport,
+        "--idle-timeout",
+        str(args.idle_timeout),
+        "--log-level",
+        args.log_level,
+    ]
+    if args.profile_dir:
+        start_command += [
+            "--profile-dir",
+            os.path.abspath(args.profile_dir),
+            "--profile-sample-rate",
+            str(args.profile_sample_rate),
+        ]
+        if args.trace_memory:
+            start_command.append("--trace-memory")
+    try:
+        sock = connect_to_daemon(address, start_command)
+    except OSError as e:
+        sys.exit(f"hx-requests-lsp: can't connect to the daemon: {e}")
+    relay_stdio(sock)
+
+
+if __name__ == "__main__":
+    main()
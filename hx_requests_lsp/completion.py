@@ -0,0 +1,164 @@
+"""Cache of rendered completion items for hx_request names."""
+
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from lsprotocol import types as lsp
+
+from hx_requests_lsp.index import HxRequestIndex
+from hx_requests_lsp.python_parser import HxRequestDefinition
+
+
+@dataclass
+class _CacheEntry:
+    """Everything rendered for one generation of a definition."""
+
+    generation: int
+    app: str | None
+    # Maps (needs_quotes, is_same_app) -> completion item
+    items: dict[tuple[bool, bool], lsp.CompletionItem] = field(default_factory=dict)
+    detail: str | None = None
+    documentation: lsp.MarkupContent | None = None
+
+
+class CompletionItemCache:
+    """Builds completion items once per definition and reuses them.
+
+    Entries are keyed by hx_request name and invalidated when the definition's
+    generation in the index changes. The only per-request variations are
+    whether quotes must be inserted and whether the definition is in the
+    current app, which only affects its sort text, so each definition has at
+    most four cached items.
+    """
+
+    def __init__(self, index: HxRequestIndex):
+        """Initialize the cache.
+
+        Args:
+            index: Index the completion items are built from
+        """
+        self._index = index
+        self._lock = threading.Lock()
+        self._entries: dict[str, _CacheEntry] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_items(self, current_file: str | Path, needs_quotes: bool) -> list[lsp.CompletionItem]:
+        """Get completion items for all definitions, most relevant first.
+
+        Args:
+            current_file: Path to the file being edited
+            needs_quotes: Whether the inserted text should include quotes
+
+        Returns:
+            Completion items; the items are shared and must not be mutated
+        """
+        current_app = self._index.get_app_name(current_file)
+        definitions = self._index.get_definitions_sorted_by_relevance(current_file)
+        generations = self._index.get_definition_generations()
+
+        items = []
+        with self._lock:
+            for definition in definitions:
+                entry = self._get_entry(definition, generations.get(definition.name, 0))
+                is_same_app = entry.app == current_app
+                item = entry.items.get((needs_quotes, is_same_app))
+                if item is None:
+                    self.misses += 1
+                    item = _build_item(definition, needs_quotes, is_same_app)
+                    entry.items[(needs_quotes, is_same_app)] = item
+                else:
+                    self.hits += 1
+                items.append(item)
+
+            if len(self._entries) > len(generations):
+                # Drop entries for names that are no longer defined
+                for name in self._entries.keys() - generations.keys():
+                    del self._entries[name]
+        return items
+
+    def resolve(self, item: lsp.CompletionItem) -> lsp.CompletionItem:
+        """Fill in the detail and documentation of a completion item.
+
+        Args:
+            item: Item sent back by the client, with the hx_request name in ``data``
+
+        Returns:
+            The same item, with detail and documentation set if the name is known
+        """
+        name = item.data.get("name") if isinstance(item.data, dict) else None
+        definition = self._index.get_definition(name) if name else None
+        if definition is None:
+            return item
+
+        generation = self._index.get_definition_generation(definition.name) or 0
+        with self._lock:
+            entry = self._get_entry(definition, generation)
+            if entry.documentation is None:
+                self.misses += 1
+                entry.detail = _build_detail(definition)
+                entry.documentation = _build_documentation(definition)
+            else:
+                self.hits += 1
+            item.detail = entry.detail
+            item.documentation = entry.documentation
+        return item
+
+    def clear(self) -> None:
+        """Drop all cached items."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return cache hit and miss counters."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _get_entry(self, definition: HxRequestDefinition, generation: int) -> _CacheEntry:
+        entry = self._entries.get(definition.name)
+        if entry is None or entry.generation != generation:
+            entry = _CacheEntry(
+                generation=generation,
+                app=self._index.get_app_name(definition.file_path),
+            )
+            self._entries[definition.name] = entry
+        return entry
+
+
+def _build_item(
+    definition: HxRequestDefinition, needs_quotes: bool, is_same_app: bool
+) -> lsp.CompletionItem:
+    """Build a lightweight completion item; documentation is added on resolve."""
+    insert_text = f'"{definition.name}"' if needs_quotes else definition.name
+
+    # Same app first, then alphabetical
+    sort_text = f"{0 if is_same_app else 1}{definition.name}"
+
+    return lsp.CompletionItem(
+        label=definition.name,
+        kind=lsp.CompletionItemKind.Reference,
+        insert_text=insert_text,
+        sort_text=sort_text,
+        data={"name": definition.name},
+    )
+
+
+def _build_detail(definition: HxRequestDefinition) -> str:
+    """Build the detail line shown next to a completion item."""
+    detail = f"Class: {definition.class_name}"
+    if definition.get_template:
+        detail += f"\nTemplate: {definition.get_template}"
+    return detail
+
+
+def _build_documentation(definition: HxRequestDefinition) -> lsp.MarkupContent:
+    """Build the markdown documentation shown for a completion item."""
+    doc_string = definition.docstring or ""
+    return lsp.MarkupContent(
+        kind=lsp.MarkupKind.Markdown,
+        value=f"**{definition.class_name}**\n\n"
+        f"File: `{Path(definition.file_path).name}`\n\n"
+        f"Bases: {', '.join(definition.base_classes)}\n\n"
+        f"{doc_string}",
+    )
@@ -0,0 +1,282 @@
+"""Shared daemon serving several editor clients from one index per workspace."""
+
+import asyncio
+import logging
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from lsprotocol import types as lsp
+from pygls.protocol import LanguageServerProtocol
+from pygls.protocol.language_server import lsp_method
+
+from hx_requests_lsp.completion import CompletionItemCache
+from hx_requests_lsp.index import HxRequestIndex
+from hx_requests_lsp.pipeline import ParsePipeline
+from hx_requests_lsp.relay import DEFAULT_IDLE_TIMEOUT
+from hx_requests_lsp.settings import ServerSettings
+from hx_requests_lsp.store import open_store
+
+logger = logging.getLogger(__name__)
+
+
+class SessionProtocol(LanguageServerProtocol):
+    """Protocol of one daemon client: disconnecting ends the session, not the process."""
+
+    def __init__(self, server, converter):
+        super().__init__(server, converter)
+        # Called once the client has disconnected
+        self.on_disconnect: Callable[[], None] | None = None
+
+    @lsp_method(lsp.EXIT)
+    def lsp_exit(self, *args) -> None:
+        """Close the client's connection instead of exiting the process."""
+        if self.transport is not None:
+            self.transport.close()
+
+    def connection_lost(self, exc):
+        """End the session when the client goes away."""
+        logger.info("Daemon client disconnected")
+        if self.on_disconnect is not None:
+            self.on_disconnect()
+
+
+class SharedWorkspace:
+    """Index and parsing machinery for one workspace root, shared by its clients.
+
+    The first client to open a root decides its discovery options and worker
+    pool size. Every client keeps its own documents, settings and debouncing.
+    """
+
+    def __init__(self, root: str, settings: ServerSettings):
+        """Initialize the workspace.
+
+        Args:
+            root: Canonical workspace root
+            settings: Settings of the first client to open the root
+        """
+        self.root = root
+        self.index = HxRequestIndex(
+            root,
+            settings.discovery,
+            open_store(root, settings.index_store, settings.index_store_path, settings.usage_budget),
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.worker_threads, thread_name_prefix="hx-requests-lsp"
+        )
+        self.pipeline = ParsePipeline(self.index, self.executor)
+        self.completion_cache = CompletionItemCache(self.index)
+
+        # Session servers of the connected clients
+        self.sessions: set[Any] = set()
+
+        # Pending release once the last client has left
+        self.release_handle: asyncio.TimerHandle | None = None
+
+        self._build: asyncio.Future[None] | None = None
+
+    async def build_index(self, build: Callable[[], None] | None = None) -> None:
+        """Build the index once; clients joining later wait for the same build.
+
+        Args:
+            build: Builds the index, in place of ``index.build_full_index`` (e.g. to profile it)
+        """
+        if self._build is None:
+            self._build = asyncio.wrap_future(self.executor.submit(build or self.index.build_full_index))
+        # A client cancelling its wait mustn't cancel the build for the others
+        await asyncio.shield(self._build)
+
+    def is_open_elsewhere(self, session: Any, file_path: str) -> bool:
+        """Check whether a client other than the given one has a file open."""
+        return any(file_path in other.open_files for other in self.sessions if other is not session)
+
+    def leave(self, session: Any) -> None:
+        """Remove a client, reverting files it had open that no other client has open."""
+        self.sessions.discard(session)
+        for file_path in session.open_files:
+            if not self.is_open_elsewhere(session, file_path):
+                self.pipeline.forget(file_path)
+                self.index.close_buffer(file_path)
+        session.open_files.clear()
+
+    def close(self) -> None:
+        """Stop the worker pool and release the index's store."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.index.close()
+
+
+class Daemon:
+    """Accepts LSP clients over TCP or a Unix socket and shares an index per workspace root.
+
+    Each connection gets its own session server, created by the session
+    factory, while clients that open the same workspace root share its index,
+    parse pipeline, completion cache and worker pool. Workspaces are reference
+    counted: a workspace is dropped once its last client has been gone for
+    the idle timeout, and the daemon exits once it has had no clients at all
+    for that long.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[asyncio.AbstractEventLoop], Any],
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        """Initialize the daemon.
+
+        Args:
+            session_factory: Creates the session server for a new client on the given loop
+            idle_timeout: Seconds to keep the daemon and unused workspaces alive without clients
+            loop: Event loop to serve on (a new one if None)
+        """
+        self.session_factory = session_factory
+        self.idle_timeout = idle_timeout
+        self.loop = loop or asyncio.new_event_loop()
+
+        # Session servers of the connected clients
+        self.sessions: set[Any] = set()
+
+        # Maps canonical workspace root -> shared workspace
+        self.workspaces: dict[str, SharedWorkspace] = {}
+
+        self.stopping = False
+        self._idle_handle: asyncio.TimerHandle | None = None
+
+    def connect(self) -> LanguageServerProtocol:
+        """Create the session for a new client and return its protocol."""
+        session = self.session_factory(self.loop)
+        session.daemon = self
+        session.lsp.on_disconnect = lambda: self.disconnect(session)
+        self.sessions.add(session)
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        logger.info(f"Daemon client connected ({len(self.sessions)} connected)")
+        return session.lsp
+
+    def disconnect(self, session: Any) -> None:
+        """End a client's session, releasing its workspace and stopping the daemon if it was the last."""
+        if session not in self.sessions:
+            return
+        self.sessions.discard(session)
+        session.scheduler.cancel_all()
+        session.stop_metrics_file()
+
+        workspace = session.shared
+        if workspace is not None:
+            workspace.leave(session)
+            if not workspace.sessions:
+                workspace.release_handle = self._after_idle(lambda: self._release(workspace))
+
+        if not self.sessions:
+            self._idle_handle = self._after_idle(self.stop)
+
+    def join(self, session: Any, root: str, settings: ServerSettings) -> SharedWorkspace:
+        """Add a client to the shared workspace for a root, creating it if needed.
+
+        Args:
+            session: Session server of the client
+            root: Workspace root the client opened
+            settings: The client's settings, used if the workspace is new
+
+        Returns:
+            The shared workspace
+        """
+        key = os.path.realpath(root)
+        workspace = self.workspaces.get(key)
+        if workspace is None:
+            workspace = self.workspaces[key] = SharedWorkspace(key, settings)
+            logger.info(f"Opened shared workspace {key}")
+        elif workspace.release_handle is not None:
+            workspace.release_handle.cancel()
+            workspace.release_handle = None
+        workspace.sessions.add(session)
+        logger.info(f"{len(workspace.sessions)} client(s) sharing {key}")
+        return workspace
+
+    def stop(self) -> None:
+        """Stop serving."""
+        logger.info("No clients left, stopping daemon")
+        self.stopping = True
+        self.loop.stop()
+
+    def serve_tcp(self, host: str, port: int) -> None:
+        """Serve clients over TCP until the daemon stops."""
+        logger.info(f"Starting daemon on {host}:{port}")
+        self._serve(self.loop.create_server(self.connect, host, port))
+
+    def serve_unix(self, path: str) -> None:
+        """Serve clients over a Unix socket until the daemon stops.
+
+        Returns right away if another daemon is already serving on the path.
+
+        Raises:
+            OSError: If the socket or its lock file can't be set up
+        """
+        lock = _lock_socket(path)
+        if lock is None:
+            logger.info(f"A daemon is already serving on {path}")
+            return
+        try:
+            if os.path.exists(path):
+                # Left behind by a daemon that didn't shut down cleanly
+                os.unlink(path)
+            logger.info(f"Starting daemon on {path}")
+            self._serve(self.loop.create_unix_server(self.connect, path))
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+            os.close(lock)
+
+    def _serve(self, listen) -> None:
+        asyncio.set_event_loop(self.loop)
+        listener = self.loop.run_until_complete(listen)
+        # Exit if no client ever connects, e.g. when the one that started us gave up
+        self._idle_handle = self._after_idle(self.stop)
+        try:
+            self.loop.run_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            listener.close()
+            self.loop.run_until_complete(listener.wait_closed())
+            for workspace in self.workspaces.values():
+                workspace.close()
+            self.workspaces.clear()
+            self.loop.close()
+
+    def _after_idle(self, callback: Callable[[], None]) -> asyncio.TimerHandle | None:
+        """Run a callback after the idle timeout, or right away if there is none."""
+        if self.idle_timeout <= 0:
+            callback()
+            return None
+        return self.loop.call_later(self.idle_timeout, callback)
+
+    def _release(self, workspace: SharedWorkspace) -> None:
+        if workspace.sessions or self.workspaces.get(workspace.root) is not workspace:
+            return
+        del self.workspaces[workspace.root]
+        workspace.close()
+        logger.info(f"Closed shared workspace {workspace.root}")
+
+
+def _lock_socket(path: str) -> int | None:
+    """Take the lock file guarding a socket path; None if another daemon holds it.
+
+    Raises:
+        OSError: If the lock file can't be opened, e.g. in a directory of another user
+    """
+    import fcntl
+
+    lock_path = f"{path}.lock"
+    try:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    except OSError as e:
+        raise OSError(e.errno, f"Can't open the daemon's lock file: {e.strerror}", lock_path) from e
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
@@ -0,0 +1,297 @@
+"""Workspace walker for discovering hx_request and template files."""
+
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Directories never worth descending into: VCS metadata, virtualenvs,
+# dependencies, caches and build output
+DEFAULT_EXCLUDED_DIRS = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        ".venv",
+        "venv",
+        "node_modules",
+        "site-packages",
+        "__pycache__",
+        ".tox",
+        ".nox",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        "staticfiles",
+        "build",
+        "dist",
+    }
+)
+
+DEFAULT_TEMPLATE_EXTENSIONS = (".html",)
+
+# Files below directories with these names are templates
+TEMPLATE_DIR_NAMES = frozenset({"templates", "template_partials"})
+
+
+@dataclass
+class DiscoveryOptions:
+    """Options controlling which files the workspace walker finds."""
+
+    excluded_dirs: frozenset[str] = DEFAULT_EXCLUDED_DIRS  # Directory names that are never entered
+    # Extra template roots, e.g. the paths in TEMPLATES["DIRS"], relative to the workspace
+    template_dirs: list[str] = field(default_factory=list)
+    template_extensions: tuple[str, ...] = DEFAULT_TEMPLATE_EXTENSIONS  # Template file extensions
+    use_gitignore: bool = True  # Skip files and directories ignored by .gitignore files
+
+    def is_template_path(self, file_path: str | Path) -> bool:
+        """Check whether a file has one of the template extensions."""
+        return str(file_path).endswith(self.template_extensions)
+
+
+@dataclass
+class WorkspaceFiles:
+    """Files found by a workspace walk."""
+
+    python_files: list[Path]  # hx_requests.py files and Python files in hx_requests/ directories
+    template_files: list[Path]  # Template files
+    directories: int  # Number of directories visited
+    seconds: float  # Wall-clock time the walk took
+
+
+class GitIgnore:
+    """Rules from a single .gitignore file.
+
+    Supports comments, negation, directory-only and anchored patterns, and
+    ``*``, ``?``, ``[...]`` and ``**`` wildcards.
+    """
+
+    def __init__(self, base_dir: str, lines: list[str]):
+        """Initialize the rules.
+
+        Args:
+            base_dir: Directory containing the .gitignore; patterns are relative to it
+            lines: Lines of the .gitignore file
+        """
+        self.base_dir = base_dir
+        # List of (regex, negated, dir_only)
+        self._rules: list[tuple[re.Pattern[str], bool, bool]] = []
+        for line in lines:
+            rule = _parse_gitignore_line(line)
+            if rule is not None:
+                self._rules.append(rule)
+
+    @classmethod
+    def from_file(cls, path: str) -> "GitIgnore | None":
+        """Read a .gitignore file, returning None if it can't be read or has no rules."""
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        gitignore = cls(os.path.dirname(path), lines)
+        return gitignore if gitignore._rules else None
+
+    def match(self, path: str, is_dir: bool) -> bool | None:
+        """Check a path against the rules.
+
+        Args:
+            path: Absolute path below base_dir
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if ignored, False if re-included by a negated rule, None if no rule matches
+        """
+        relative = path[len(self.base_dir) + 1 :]
+        if os.sep != "/":
+            relative = relative.replace(os.sep, "/")
+
+        result = None
+        for regex, negated, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative):
+                result = not negated
+        return result
+
+
+def _parse_gitignore_line(line: str) -> tuple[re.Pattern[str], bool, bool] | None:
+    """Turn a .gitignore line into (regex, negated, dir_only), or None for blanks and comments."""
+    line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+    anchored = "/" in line
+    line = line.lstrip("/")
+
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(prefix + _translate_glob(line) + "$"), negated, dir_only
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob to a regex matching a slash-separated relative path."""
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i) and i + 2 == n and (i == 0 or pattern[i - 1] == "/"):
+            parts.append(".*")
+            i += 2
+        elif c == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif c == "?":
+            parts.append("[^/]")
+            i += 1
+        elif c == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(c))
+            i += 1
+    return "".join(parts)
+
+
+def discover_workspace_files(
+    root_dir: str | Path, options: DiscoveryOptions | None = None
+) -> WorkspaceFiles:
+    """Find hx_request Python files and template files in a single walk.
+
+    Excluded directories and anything ignored by a .gitignore are pruned
+    without being entered. Template files are those with a template extension
+    below a ``templates`` or ``template_partials`` directory, or below one of
+    the extra template roots; extra roots outside the workspace are walked too.
+
+    Args:
+        root_dir: Root directory of the workspace
+        options: Discovery options (defaults if None)
+
+    Returns:
+        The files found, sorted, with walk statistics
+    """
+    options = options or DiscoveryOptions()
+    start = time.perf_counter()
+
+    root = os.path.abspath(root_dir)
+    extra_roots = {os.path.abspath(os.path.join(root, d)) for d in options.template_dirs}
+    walker = _Walker(options, extra_roots)
+
+    walker.walk(root, in_templates=root in extra_roots, in_hx_requests=False)
+    for extra_root in sorted(extra_roots):
+        if extra_root != root and not extra_root.startswith(root + os.sep):
+            walker.walk(extra_root, in_templates=True, in_hx_requests=False)
+
+    result = WorkspaceFiles(
+        python_files=sorted(Path(p) for p in walker.python_files),
+        template_files=sorted(Path(p) for p in walker.template_files),
+        directories=walker.directories,
+        seconds=time.perf_counter() - start,
+    )
+    logger.info(
+        f"Discovered {len(result.python_files)} hx_request files and {len(result.template_files)} "
+        f"templates in {result.directories} directories ({result.seconds * 1000:.1f} ms)"
+    )
+    return result
+
+
+class _Walker:
+    """State of a single discovery walk."""
+
+    def __init__(self, options: DiscoveryOptions, extra_roots: set[str]):
+        self.options = options
+        self.extra_roots = extra_roots
+        self.python_files: set[str] = set()
+        self.template_files: set[str] = set()
+        self.directories = 0
+        # (device, inode) of symlinked directories already entered, to avoid cycles
+        self._visited_links: set[tuple[int, int]] = set()
+
+    def walk(self, top: str, in_templates: bool, in_hx_requests: bool) -> None:
+        # Stack of (directory, in_templates, in_hx_requests, active .gitignore rules)
+        stack: list[tuple[str, bool, bool, tuple[GitIgnore, ...]]] = [
+            (top, in_templates, in_hx_requests, ())
+        ]
+        while stack:
+            directory, in_templates, in_hx_requests, ignores = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            self.directories += 1
+
+            if self.options.use_gitignore and any(e.name == ".gitignore" for e in entries):
+                gitignore = GitIgnore.from_file(os.path.join(directory, ".gitignore"))
+                if gitignore is not None:
+                    ignores = (*ignores, gitignore)
+
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if ignores and _is_ignored(ignores, entry.path, is_dir):
+                    continue
+
+                if is_dir:
+                    if entry.name in self.options.excluded_dirs or not self._enter_link(entry):
+                        continue
+                    stack.append(
+                        (
+                            entry.path,
+                            in_templates
+                            or entry.name in TEMPLATE_DIR_NAMES
+                            or entry.path in self.extra_roots,
+                            in_hx_requests or entry.name == "hx_requests",
+                            ignores,
+                        )
+                    )
+                elif in_templates and entry.name.endswith(self.options.template_extensions):
+                    self.template_files.add(entry.path)
+                elif entry.name.endswith(".py") and (in_hx_requests or entry.name == "hx_requests.py"):
+                    self.python_files.add(entry.path)
+
+    def _enter_link(self, entry: os.DirEntry) -> bool:
+        """Check whether a directory may be entered, following each symlinked directory once."""
+        if not entry.is_symlink():
+            return True
+        try:
+            st = entry.stat()
+        except OSError:
+            return False
+        key = (st.st_dev, st.st_ino)
+        if key in self._visited_links:
+            return False
+        self._visited_links.add(key)
+        return True
+
+
+def _is_ignored(ignores: tuple[GitIgnore, ...], path: str, is_dir: bool) -> bool:
+    """Check a path against nested .gitignore rules; deeper files take precedence."""
+    for gitignore in reversed(ignores):
+        result = gitignore.match(path, is_dir)
+        if result is not None:
+            return result
+    return False
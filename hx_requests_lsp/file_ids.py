@@ -0,0 +1,117 @@
+"""Interning table mapping file paths and URIs to canonical file IDs."""
+
+import itertools
+import os
+import threading
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+
+class FileIdTable:
+    """Maps the many spellings of a file to one small integer ID.
+
+    Paths and ``file://`` URIs are resolved to a canonical absolute path the
+    first time they're seen; after that, looking them up is a dictionary hit
+    instead of a chain of ``lstat``/``readlink`` calls. Entries stay valid
+    until the file is renamed or deleted, when ``invalidate`` drops them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+
+        # Maps path or URI as given -> file ID
+        self._ids_by_key: dict[str, int] = {}
+
+        # Maps canonical path -> file ID
+        self._ids_by_path: dict[str, int] = {}
+
+        # Maps file ID -> canonical path
+        self._paths: dict[int, str] = {}
+
+        self.resolve_count = 0
+
+    def get_id(self, file: str | Path) -> int:
+        """Get the ID of a file, interning it if it hasn't been seen before.
+
+        Args:
+            file: Path or ``file://`` URI of the file
+
+        Returns:
+            The file's ID; every spelling of the same file gets the same ID
+        """
+        key = str(file)
+        file_id = self._ids_by_key.get(key)
+        if file_id is not None:
+            return file_id
+
+        # Resolve outside the lock; racing threads agree on the canonical path
+        path = _to_path(key)
+        canonical = str(Path(path).resolve())
+
+        with self._lock:
+            self.resolve_count += 1
+            file_id = self._ids_by_path.get(canonical)
+            if file_id is None:
+                file_id = next(self._counter)
+                self._ids_by_path[canonical] = file_id
+                self._paths[file_id] = canonical
+            self._ids_by_key[key] = file_id
+        return file_id
+
+    def get_path(self, file_id: int) -> str | None:
+        """Get the canonical path of a file ID, or None if it was invalidated."""
+        return self._paths.get(file_id)
+
+    def canonical_path(self, file: str | Path) -> str:
+        """Get the canonical absolute path of a file, interning it if needed."""
+        path = self._paths.get(self.get_id(file))
+        if path is None:
+            # Invalidated between the two lookups
+            path = str(Path(_to_path(str(file))).resolve())
+        return path
+
+    def invalidate(self, file: str | Path) -> list[int]:
+        """Drop a renamed or deleted file (or directory) from the table.
+
+        Every spelling of the file, and of any file below it if it's a
+        directory, is forgotten. Interning the path again gives a new ID.
+
+        Args:
+            file: Path or ``file://`` URI that was renamed or deleted
+
+        Returns:
+            IDs that were dropped
+        """
+        key = str(file)
+        with self._lock:
+            file_id = self._ids_by_key.get(key)
+            canonical = self._paths.get(file_id) if file_id is not None else None
+        if canonical is None:
+            # Never interned under this spelling: fall back to an absolute, unresolved path
+            canonical = os.path.abspath(_to_path(key))
+
+        prefix = canonical + os.sep
+        with self._lock:
+            dropped = [
+                dropped_id
+                for path, dropped_id in self._ids_by_path.items()
+                if path == canonical or path.startswith(prefix)
+            ]
+            if not dropped:
+                return []
+            for dropped_id in dropped:
+                del self._ids_by_path[self._paths.pop(dropped_id)]
+            dropped_set = set(dropped)
+            self._ids_by_key = {k: v for k, v in self._ids_by_key.items() if v not in dropped_set}
+        return dropped
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+
+def _to_path(key: str) -> str:
+    """Convert a ``file://`` URI to a path; other strings are returned unchanged."""
+    if key.startswith("file://"):
+        return unquote(urlparse(key).path)
+    return key
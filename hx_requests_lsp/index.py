@@ -1,59 +1,181 @@
 """Index manager for caching and looking up hx_request definitions and usages."""
 
+import hashlib
+import itertools
 import logging
 import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import Executor
+from dataclasses import astuple, dataclass
 from pathlib import Path
 
+from hx_requests_lsp.discovery import DiscoveryOptions, WorkspaceFiles, discover_workspace_files
+from hx_requests_lsp.file_ids import FileIdTable
+from hx_requests_lsp.metrics import Metrics
+from hx_requests_lsp.name_index import NgramIndex
 from hx_requests_lsp.python_parser import (
     HxRequestDefinition,
+    PythonModuleSnapshot,
     collect_all_hx_requests,
-    find_hx_request_files,
-    parse_hx_requests_from_file,
     parse_hx_requests_from_source,
+    reparse_python_module,
 )
+from hx_requests_lsp.store import MemoryUsageStore
 from hx_requests_lsp.template_parser import (
     HxRequestUsage,
     collect_all_usages,
-    find_template_files,
-    parse_template_file,
     parse_template_for_hx_requests,
 )
 
 logger = logging.getLogger(__name__)
 
+# Files handed to each executor task when building the index in parallel
+PARSE_CHUNK_SIZE = 32
+
+# Most edits between an unknown name and a defined name suggested for it
+MAX_SUGGESTION_DISTANCE = 2
+
+# Names of the histograms in HxRequestIndex.metrics
+PARSE_PYTHON = "parse.python"
+PARSE_TEMPLATE = "parse.template"
+BUILD_INDEX = "index.build"
+
+
+@dataclass
+class ParsedFile:
+    """Result of parsing a single file, ready to be applied to the index.
+
+    Exactly one of ``definitions`` (Python files) or ``usages`` (templates) is
+    set. Both are None when a Python buffer had syntax errors, or when the
+    content is unchanged from what is already indexed.
+
+    Results with a version come from an open editor buffer; results without
+    one reflect the file on disk. Saved results are both: the buffer's content
+    was just written to disk.
+    """
+
+    file_id: int
+    file_path: str  # Canonical path of the file
+    version: int | None = None
+    definitions: list[HxRequestDefinition] | None = None
+    usages: list[HxRequestUsage] | None = None
+    snapshot: PythonModuleSnapshot | None = None
+    content_hash: int | None = None  # Hash of the parsed content (None if the file couldn't be read)
+    unchanged: bool = False  # True if the content matched the indexed content and wasn't parsed
+    saved: bool = False  # True if the content is an open buffer's, just saved to disk
+
+    @property
+    def is_buffer(self) -> bool:
+        """Whether the content came from an open editor buffer rather than disk."""
+        return self.version is not None
+
+
+@dataclass
+class _DiskEntry:
+    """What was indexed from disk for a file while an open buffer overlays it."""
+
+    definitions: list[HxRequestDefinition] | None  # None if not indexed as a Python file
+    usages: list[HxRequestUsage] | None  # None if not indexed as a template
+    content_hash: int | None
+
 
 class HxRequestIndex:
     """Manages an index of hx_request definitions and usages.
 
     This class maintains a cache of all hx_request definitions (from Python files)
     and their usages (from Django templates) for efficient lookup during LSP
-    operations.
+    operations. Per-file data is keyed by the file's ID in ``file_ids``, so
+    paths are only resolved the first time a file is seen.
+
+    Edits to open buffers overlay what was indexed from disk: the disk entries
+    of a file are set aside when its buffer first diverges from them, kept up
+    to date by later disk updates, and restored when the buffer is closed.
+
+    Usages are kept by a usage store: in memory by default, compacted beyond
+    a budget (see ``store.CompactUsageStore``), or in a SQLite database (see
+    ``store.SqliteIndexStore``) that bounds memory use on large repositories
+    and lets a restart skip files that haven't changed.
+
+    An index built with build_lazy_index holds every definition but only the
+    templates of the Django apps asked for with index_app; lookups that need
+    every usage of a name index the remaining apps first.
     """
 
-    def __init__(self, workspace_root: str | Path | None = None):
+    def __init__(
+        self,
+        workspace_root: str | Path | None = None,
+        discovery: DiscoveryOptions | None = None,
+        store: MemoryUsageStore | None = None,
+    ):
         """Initialize the index.
 
         Args:
             workspace_root: Root directory of the workspace to index
+            discovery: Options for finding files in the workspace
+            store: Where to keep usages (in memory if None)
         """
         self._workspace_root = Path(workspace_root) if workspace_root else None
+        self.discovery = discovery or DiscoveryOptions()
+        self.file_ids = FileIdTable()
         self._lock = threading.RLock()
 
+        # Result of the last workspace walk, for reporting
+        self.last_discovery: WorkspaceFiles | None = None
+
         # Maps hx_request name -> definition
         self._definitions: dict[str, HxRequestDefinition] = {}
 
-        # Maps hx_request name -> list of usages
-        self._usages: dict[str, list[HxRequestUsage]] = {}
+        # Maps file ID -> list of definitions in that file
+        self._definitions_by_file: dict[int, list[HxRequestDefinition]] = {}
+
+        # Usages of template files, by file and by name
+        self._store = store or MemoryUsageStore()
+
+        # Maps file ID -> last good parse of buffer content, for incremental re-parsing
+        self._python_snapshots: dict[int, PythonModuleSnapshot] = {}
+
+        # Maps file ID -> LSP document version of the indexed buffer content
+        self._file_versions: dict[int, int] = {}
+
+        # Maps file ID -> hash of the indexed content, to skip re-parsing identical text
+        self._content_hashes: dict[int, int] = {}
+
+        # Maps file ID -> disk entries underneath an open buffer that differs from disk
+        self._disk_entries: dict[int, _DiskEntry] = {}
+
+        # Track indexed files (by ID) for incremental updates
+        self._indexed_python_files: set[int] = set()
+        self._indexed_template_files: set[int] = set()
+
+        # Maps hx_request name -> generation, bumped whenever its definition changes.
+        # Generations are never reused, so callers can key caches on them.
+        self._generation_counter = itertools.count(1)
+        self._definition_generations: dict[str, int] = {}
 
-        # Maps file path -> list of definitions in that file
-        self._definitions_by_file: dict[str, list[HxRequestDefinition]] = {}
+        # Bumped whenever any definition is added, replaced or removed
+        self._definitions_epoch = 0
 
-        # Maps file path -> list of usages in that file
-        self._usages_by_file: dict[str, list[HxRequestUsage]] = {}
+        # N-grams of every definition's name and class name, for searching by name
+        self._name_index = NgramIndex()
 
-        # Track indexed files for incremental updates
-        self._indexed_python_files: set[str] = set()
-        self._indexed_template_files: set[str] = set()
+        # Maps (by_app, app name) -> definitions sorted by relevance for that app
+        self._relevance_orderings: dict[tuple[bool, str | None], list[HxRequestDefinition]] = {}
+
+        # Maps (unknown name, limit) -> defined names suggested instead, until a definition changes
+        self._suggestions: dict[tuple[str, int], list[str]] = {}
+
+        # Maps app name -> templates not indexed yet, by a lazy build
+        self._pending_templates: dict[str | None, list[Path]] = {}
+
+        # Apps whose templates were asked for, so a lazy build indexes them right away
+        self._requested_apps: set[str | None] = set()
+
+        # Held while templates of pending apps are indexed, so each app is indexed once
+        self._app_lock = threading.Lock()
+
+        # Parse and build timings
+        self.metrics = Metrics()
 
     @property
     def workspace_root(self) -> Path | None:
@@ -63,75 +185,337 @@ class HxRequestIndex:
     def workspace_root(self, value: str | Path | None):
         self._workspace_root = Path(value) if value else None
 
-    def build_full_index(self) -> None:
+    @property
+    def store(self) -> MemoryUsageStore:
+        return self._store
+
+    def use_store(self, store: MemoryUsageStore) -> None:
+        """Keep usages in a different store from now on; call before building the index."""
+        with self._lock:
+            self._store.close()
+            self._store = store
+
+    def close(self) -> None:
+        """Release the index's store once work on the index has stopped."""
+        with self._lock:
+            self._store.close()
+
+    def build_full_index(
+        self, executor: Executor | None = None, files: WorkspaceFiles | None = None
+    ) -> None:
         """Build the complete index from the workspace root.
 
         This scans all hx_requests.py files and template files to build
-        the initial index.
+        the initial index. Files are parsed before the index is locked, on the
+        executor if one is given; parsing is CPU-bound, so only a process pool
+        parses in parallel.
+
+        Args:
+            executor: Executor to parse files on (parses inline if None)
+            files: Files to index, if they were already discovered
         """
+        self._build(executor, files, lazy=False)
+
+    def build_lazy_index(
+        self, executor: Executor | None = None, files: WorkspaceFiles | None = None
+    ) -> None:
+        """Build an index of every definition, leaving templates until their app is needed.
+
+        Any template may use an hx_request of any app, so all Python files are
+        indexed. Templates are only indexed for apps already passed to
+        index_app; the others wait for it (or for a lookup that needs every
+        usage), which makes the index useful much sooner on large projects.
+
+        Args:
+            executor: Executor to parse files on (parses inline if None)
+            files: Files to index, if they were already discovered
+        """
+        self._build(executor, files, lazy=True)
+
+    def _build(self, executor: Executor | None, files: WorkspaceFiles | None, lazy: bool) -> None:
         if not self._workspace_root:
             logger.warning("No workspace root set, cannot build index")
             return
 
-        logger.info(f"Building full index from {self._workspace_root}")
-
-        with self._lock:
-            # Clear existing index
-            self._definitions.clear()
-            self._usages.clear()
-            self._definitions_by_file.clear()
-            self._usages_by_file.clear()
-            self._indexed_python_files.clear()
-            self._indexed_template_files.clear()
-
-            # Index Python files
-            for file_path in find_hx_request_files(self._workspace_root):
-                self._index_python_file(file_path)
-
-            # Index template files
-            for file_path in find_template_files(self._workspace_root):
-                self._index_template_file(file_path)
-
+        logger.info(f"Building {'lazy' if lazy else 'full'} index from {self._workspace_root}")
+        start = time.perf_counter()
+
+        if files is None:
+            files = discover_workspace_files(self._workspace_root, self.discovery)
+        self.last_discovery = files
+
+        with self._app_lock:
+            template_files = files.template_files
+            pending: dict[str | None, list[Path]] = {}
+            if lazy:
+                template_files = []
+                with self._lock:
+                    requested = set(self._requested_apps)
+                for path in files.template_files:
+                    app = self._extract_app_name(path)
+                    if app in requested:
+                        template_files.append(path)
+                    else:
+                        pending.setdefault(app, []).append(path)
+
+            file_ids = [self.file_ids.get_id(p) for p in (*files.python_files, *template_files)]
+            paths = [self.file_ids.get_path(file_id) for file_id in file_ids]
+            is_python = [True] * len(files.python_files) + [False] * len(template_files)
+            with self._lock:
+                # To recognize files indexed while the others are parsed, e.g. saved
+                indexed_hashes = dict(self._content_hashes)
+                disk_hashes = {
+                    file_id: disk.content_hash for file_id, disk in self._disk_entries.items()
+                }
+            results, stored = self._parse_disk_files(paths, is_python, executor)
+
+            with self._lock, self._store.batch():
+                # Open buffers and files indexed since they were parsed outlive the rebuild
+                versions = dict(self._file_versions)
+                snapshots = dict(self._python_snapshots)
+                kept = self._capture_kept_files(indexed_hashes, disk_hashes)
+
+                # Clear existing index
+                self._definitions.clear()
+                self._name_index.clear()
+                self._definition_generations.clear()
+                self._relevance_orderings.clear()
+                self._suggestions.clear()
+                self._definitions_by_file.clear()
+                self._store.clear()
+                self._python_snapshots.clear()
+                self._file_versions.clear()
+                self._content_hashes.clear()
+                self._disk_entries.clear()
+                self._indexed_python_files.clear()
+                self._indexed_template_files.clear()
+                self._pending_templates = pending
+
+                self._restore_kept_files(kept, versions, snapshots)
+                self._add_disk_files(file_ids, paths, is_python, results, stored)
+
+                # Stored entries of templates that are still pending are kept for later
+                pending_paths = {str(path) for paths in pending.values() for path in paths}
+                self._store.prune(set(paths) | pending_paths)
+
+        elapsed = time.perf_counter() - start
+        self.metrics.record(BUILD_INDEX, elapsed)
         logger.info(
-            f"Index built: {len(self._definitions)} definitions, "
-            f"{sum(len(u) for u in self._usages.values())} usages"
+            f"Index built: {len(self._definitions)} definitions, {self._store.count()} usages "
+            f"({len(results)} of {len(paths)} files parsed, {len(pending)} apps pending) "
+            f"in {elapsed * 1000:.0f} ms"
         )
 
-    def _index_python_file(self, file_path: Path) -> None:
-        """Index a single Python file.
+    def index_app(self, app: str | None) -> int:
+        """Index the templates of an app that a lazy build left pending.
+
+        Waits for an index build or another app in progress. Apps asked for
+        before a lazy build are indexed by the build itself.
 
         Args:
-            file_path: Path to the Python file
+            app: Name of the app (see get_app_name)
+
+        Returns:
+            Number of templates indexed
         """
-        file_path_str = str(file_path.resolve())
+        with self._app_lock:
+            with self._lock:
+                self._requested_apps.add(app)
+                template_files = self._pending_templates.pop(app, None)
+            if not template_files:
+                return 0
+
+            start = time.perf_counter()
+            file_ids = [self.file_ids.get_id(path) for path in template_files]
+            paths = [self.file_ids.get_path(file_id) for file_id in file_ids]
+            is_python = [False] * len(paths)
+            results, stored = self._parse_disk_files(paths, is_python, None)
+            with self._lock, self._store.batch():
+                self._add_disk_files(file_ids, paths, is_python, results, stored)
 
-        definitions = parse_hx_requests_from_file(file_path, self._workspace_root)
+        logger.info(
+            f"Indexed {len(paths)} templates of app {app} in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return len(paths)
 
-        self._definitions_by_file[file_path_str] = definitions
-        self._indexed_python_files.add(file_path_str)
+    def index_app_of(self, file_path: str | Path) -> int:
+        """Index the templates of the app a file belongs to, if they are pending.
 
-        for definition in definitions:
-            self._definitions[definition.name] = definition
+        Returns:
+            Number of templates indexed
+        """
+        return self.index_app(self.get_app_name(file_path))
 
-    def _index_template_file(self, file_path: Path) -> None:
-        """Index a single template file.
+    def index_pending_apps(self) -> int:
+        """Index the templates of every app a lazy build left pending.
 
-        Args:
-            file_path: Path to the template file
+        Returns:
+            Number of templates indexed
         """
-        file_path_str = str(file_path.resolve())
+        with self._lock:
+            apps = list(self._pending_templates)
+        return sum(self.index_app(app) for app in apps)
 
-        usages = parse_template_file(file_path)
+    def has_pending_app(self, file_path: str | Path) -> bool:
+        """Check whether the templates of a file's app are waiting to be indexed."""
+        app = self.get_app_name(file_path)
+        with self._lock:
+            return app in self._pending_templates
+
+    def _capture_kept_files(
+        self, indexed_hashes: dict[int, int], disk_hashes: dict[int, int | None]
+    ) -> dict[int, tuple[_DiskEntry, _DiskEntry | None]]:
+        """Capture the files a rebuild keeps rather than index from what it parsed.
 
-        self._usages_by_file[file_path_str] = usages
-        self._indexed_template_files.add(file_path_str)
+        These are files open in a buffer that differs from disk, and files
+        indexed since the rebuild parsed them.
 
-        for usage in usages:
-            if usage.name not in self._usages:
-                self._usages[usage.name] = []
-            self._usages[usage.name].append(usage)
+        Args:
+            indexed_hashes: Content hashes of the indexed files before parsing
+            disk_hashes: Content hashes of the entries set aside underneath
+                open buffers before parsing
 
-    def update_file(self, file_path: str | Path, content: str | None = None) -> None:
+        Returns:
+            Maps file ID -> (indexed entries, entries set aside underneath its
+            buffer); the latter are None if there is no buffer overlay, and
+            empty if they should be filled in from disk again
+        """
+        kept: dict[int, tuple[_DiskEntry, _DiskEntry | None]] = {}
+        for file_id in self._content_hashes.keys() | self._disk_entries.keys():
+            if self.file_ids.get_path(file_id) is None:
+                continue
+            disk = self._disk_entries.get(file_id)
+            if disk is None:
+                if self._content_hashes[file_id] != indexed_hashes.get(file_id):
+                    kept[file_id] = (self._capture_disk_entry(file_id), None)
+                continue
+            if file_id in disk_hashes and disk.content_hash == disk_hashes[file_id]:
+                disk = _DiskEntry(definitions=None, usages=None, content_hash=None)
+            kept[file_id] = (self._capture_disk_entry(file_id), disk)
+        return kept
+
+    def _restore_kept_files(
+        self,
+        kept: dict[int, tuple[_DiskEntry, _DiskEntry | None]],
+        versions: dict[int, int],
+        snapshots: dict[int, PythonModuleSnapshot],
+    ) -> None:
+        """Put kept files and the state of open buffers back into a freshly cleared index."""
+        for file_id, (entry, disk) in kept.items():
+            if disk is not None:
+                self._disk_entries[file_id] = disk
+            self._apply_entry(
+                file_id,
+                self.file_ids.get_path(file_id),
+                entry.definitions,
+                entry.usages,
+                entry.content_hash,
+                None,
+            )
+        for file_id, version in versions.items():
+            if self.file_ids.get_path(file_id) is not None:
+                self._file_versions[file_id] = version
+                if file_id in snapshots:
+                    self._python_snapshots[file_id] = snapshots[file_id]
+
+    def _parse_disk_files(
+        self, paths: list[str], is_python: list[bool], executor: Executor | None
+    ) -> tuple[dict[int, tuple], dict[str, tuple]]:
+        """Parse files from disk, except those the store has unchanged.
+
+        Returns:
+            Parse results by position in ``paths``, and stored entries by path
+        """
+        with self._lock:
+            stored = self._store.load_unchanged(paths)
+        to_parse = [i for i, path in enumerate(paths) if path not in stored]
+        parse_args = (
+            [paths[i] for i in to_parse],
+            [is_python[i] for i in to_parse],
+            itertools.repeat(self._workspace_root),
+        )
+        if executor is None:
+            parsed = list(map(_parse_disk_file, *parse_args))
+        else:
+            parsed = list(executor.map(_parse_disk_file, *parse_args, chunksize=PARSE_CHUNK_SIZE))
+        return dict(zip(to_parse, parsed, strict=True)), stored
+
+    def _add_disk_files(
+        self,
+        file_ids: list[int],
+        paths: list[str],
+        is_python: list[bool],
+        results: dict[int, tuple],
+        stored: dict[str, tuple],
+    ) -> None:
+        """Add files parsed from disk (or unchanged in the store) to the index.
+
+        Files indexed since they were parsed, e.g. by a save, are left alone;
+        for files open in a buffer that differs from disk, only the entries set
+        aside for when the buffer is closed are filled in.
+        """
+        for i, (file_id, path, python) in enumerate(zip(file_ids, paths, is_python, strict=True)):
+            if path is None:
+                continue
+            disk = self._disk_entries.get(file_id)
+            if disk is not None:
+                if disk.usages is None and disk.definitions is None:
+                    # The store may hold usages, but not separately from the buffer's
+                    if i in results:
+                        content_hash, records, _ = results[i]
+                    else:
+                        content_hash, records, _ = _parse_disk_file(path, python, self._workspace_root)
+                    self._disk_entries[file_id] = _DiskEntry(
+                        definitions=records if python else None,
+                        usages=None if python else records,
+                        content_hash=content_hash,
+                    )
+                continue
+            if file_id in self._indexed_python_files or file_id in self._indexed_template_files:
+                continue
+
+            if i in results:
+                content_hash, records, seconds = results[i]
+                self.metrics.record(PARSE_PYTHON if python else PARSE_TEMPLATE, seconds)
+                if python:
+                    self._index_python_definitions(file_id, records)
+                else:
+                    self._index_template_usages(file_id, path, records)
+                if content_hash is not None:
+                    self._store.save_file(file_id, path, content_hash, records if python else None)
+            else:
+                content_hash, definitions = stored[path]
+                if python:
+                    self._index_python_definitions(file_id, definitions)
+                else:
+                    # Usages stay in the store until they're looked up
+                    self._store.adopt(file_id, path)
+                    self._indexed_template_files.add(file_id)
+            if content_hash is not None:
+                self._content_hashes[file_id] = content_hash
+
+    def _index_python_definitions(self, file_id: int, definitions: list[HxRequestDefinition]) -> None:
+        """Add the definitions of a Python file to a freshly cleared index."""
+        self._definitions_by_file[file_id] = definitions
+        self._indexed_python_files.add(file_id)
+
+        for definition in definitions:
+            self._set_definition(definition)
+
+    def _index_template_usages(
+        self, file_id: int, file_path_str: str, usages: list[HxRequestUsage]
+    ) -> None:
+        """Add the usages of a template file to a freshly cleared index."""
+        self._set_file_usages(file_id, file_path_str, usages)
+        self._indexed_template_files.add(file_id)
+
+    def update_file(
+        self,
+        file_path: str | Path,
+        content: str | None = None,
+        version: int | None = None,
+        saved: bool = False,
+    ) -> bool:
         """Update the index for a single file.
 
         This is called when a file is modified to update the index incrementally.
@@ -139,92 +523,396 @@ class HxRequestIndex:
         Args:
             file_path: Path to the modified file
             content: Optional content of the file (if None, reads from disk)
+            version: Optional LSP document version of the content
+            saved: Whether the content is an open buffer's, just saved to disk
+
+        Returns:
+            True if the index was updated
+        """
+        parsed = self.parse_file(file_path, content, version, saved)
+        if parsed is None:
+            return False
+        return self.apply_parsed_file(parsed)
+
+    def parse_file(
+        self,
+        file_path: str | Path,
+        content: str | None = None,
+        version: int | None = None,
+        saved: bool = False,
+    ) -> ParsedFile | None:
+        """Parse a file without modifying the index.
+
+        Safe to call from worker threads; the result is applied later with
+        apply_parsed_file. Content identical to what is already indexed for
+        the file isn't parsed at all; the result is marked ``unchanged``.
+
+        Args:
+            file_path: Path to the file
+            content: Optional content of the file (if None, reads from disk)
+            version: Optional LSP document version of the content
+            saved: Whether the content is an open buffer's, just saved to disk
+
+        Returns:
+            The parse result, or None if the file type isn't indexed
         """
-        file_path = Path(file_path)
-        file_path_str = str(file_path.resolve())
+        file_id = self.file_ids.get_id(file_path)
+        file_path_str = self.file_ids.get_path(file_id)
+        if file_path_str is None:
+            # Invalidated by a concurrent rename or delete
+            return None
 
-        with self._lock:
-            if file_path.suffix == ".py":
-                self._update_python_file(file_path, file_path_str, content)
-            elif file_path.suffix == ".html":
-                self._update_template_file(file_path, file_path_str, content)
-
-    def _update_python_file(self, file_path: Path, file_path_str: str, content: str | None) -> None:
-        """Update index for a Python file."""
-        old_definitions = self._definitions_by_file.get(file_path_str, [])
-        for old_def in old_definitions:
-            if old_def.name in self._definitions:
-                if self._definitions[old_def.name].file_path == file_path_str:
-                    del self._definitions[old_def.name]
+        is_python = file_path_str.endswith(".py")
+        if not is_python and not self.is_template_file(file_path_str):
+            return None
+
+        from_disk = content is None
+        if from_disk:
+            content = _read_source(file_path_str)
 
+        content_hash = None
         if content is not None:
-            definitions = parse_hx_requests_from_source(content, file_path_str, self._workspace_root)
+            content_hash = _content_hash(content)
+            with self._lock:
+                disk = self._disk_entries.get(file_id) if from_disk else None
+                if content_hash in (
+                    self._content_hashes.get(file_id),
+                    disk.content_hash if disk else None,
+                ):
+                    return ParsedFile(
+                        file_id=file_id,
+                        file_path=file_path_str,
+                        version=version,
+                        content_hash=content_hash,
+                        unchanged=True,
+                        saved=saved,
+                    )
+
+        start = time.perf_counter()
+        if is_python:
+            parsed = self._parse_python_file(file_id, file_path_str, content, version, from_disk)
         else:
-            definitions = parse_hx_requests_from_file(file_path, self._workspace_root)
+            usages = (
+                parse_template_for_hx_requests(content, file_path_str) if content is not None else []
+            )
+            parsed = ParsedFile(file_id=file_id, file_path=file_path_str, version=version, usages=usages)
+        self.metrics.record(PARSE_PYTHON if is_python else PARSE_TEMPLATE, time.perf_counter() - start)
+        parsed.content_hash = content_hash
+        parsed.saved = saved
+        return parsed
+
+    def _parse_python_file(
+        self,
+        file_id: int,
+        file_path_str: str,
+        content: str | None,
+        version: int | None,
+        from_disk: bool,
+    ) -> ParsedFile:
+        """Parse a Python file.
+
+        Buffer content is re-parsed incrementally against the previous snapshot.
+        If it has syntax errors the result carries no definitions, so the last
+        good ones are kept.
+        """
+        if from_disk:
+            definitions = []
+            if content is not None:
+                definitions = parse_hx_requests_from_source(content, file_path_str, self._workspace_root)
+            return ParsedFile(
+                file_id=file_id, file_path=file_path_str, version=version, definitions=definitions
+            )
 
-        self._definitions_by_file[file_path_str] = definitions
-        self._indexed_python_files.add(file_path_str)
+        with self._lock:
+            previous = self._python_snapshots.get(file_id)
+        try:
+            snapshot = reparse_python_module(content, file_path_str, previous, self._workspace_root)
+        except SyntaxError:
+            logger.debug("Syntax error in %s, keeping last good definitions", file_path_str)
+            return ParsedFile(file_id=file_id, file_path=file_path_str, version=version)
+        return ParsedFile(
+            file_id=file_id,
+            file_path=file_path_str,
+            version=version,
+            definitions=snapshot.definitions,
+            snapshot=snapshot,
+        )
 
-        for definition in definitions:
-            self._definitions[definition.name] = definition
-
-    def _update_template_file(self, file_path: Path, file_path_str: str, content: str | None) -> None:
-        """Update index for a template file."""
-        # Remove old usages from this file
-        old_usages = self._usages_by_file.get(file_path_str, [])
-        for old_usage in old_usages:
-            if old_usage.name in self._usages:
-                self._usages[old_usage.name] = [
-                    u for u in self._usages[old_usage.name] if u.file_path != file_path_str
-                ]
-                if not self._usages[old_usage.name]:
-                    del self._usages[old_usage.name]
-
-        # Parse new usages
-        if content is not None:
-            usages = parse_template_for_hx_requests(content, file_path_str)
+    def apply_parsed_file(self, parsed: ParsedFile) -> bool:
+        """Apply a parse result to the index.
+
+        Results for an older document version than the one already indexed are
+        discarded. Unchanged results only record their version. Disk results
+        for a file whose open buffer differs from disk only update the entries
+        set aside for when the buffer is closed. Saved results update both the
+        buffer's entries and those set aside.
+
+        Args:
+            parsed: Result of parse_file
+
+        Returns:
+            True if the index was updated
+        """
+        file_id = parsed.file_id
+        with self._lock:
+            if self.file_ids.get_path(file_id) is None:
+                # The file was renamed or deleted while it was being parsed
+                return False
+            overlaid = file_id in self._disk_entries
+            if not parsed.is_buffer and not parsed.saved and overlaid:
+                self._update_disk_entry(parsed)
+                return False
+
+            indexed_version = self._file_versions.get(file_id)
+            if parsed.version is not None and indexed_version is not None:
+                if parsed.version < indexed_version:
+                    if parsed.saved and overlaid:
+                        # The buffer has moved on since it was saved; disk hasn't
+                        self._update_disk_entry(parsed)
+                    return False
+            if parsed.unchanged and self._content_hashes.get(file_id) != parsed.content_hash:
+                # The indexed content changed after this result was checked against it
+                return False
+            if parsed.version is not None:
+                self._file_versions[file_id] = parsed.version
+            if parsed.unchanged:
+                if parsed.saved and overlaid:
+                    # Disk now matches the buffer: share the buffer's entries
+                    self._disk_entries[file_id] = self._capture_disk_entry(file_id)
+                return False
+
+            if parsed.is_buffer and not parsed.saved and not overlaid:
+                # First divergence of an open buffer from disk: set the disk entries aside
+                self._disk_entries[file_id] = self._capture_disk_entry(file_id)
+
+            self._apply_entry(
+                file_id,
+                parsed.file_path,
+                parsed.definitions,
+                parsed.usages,
+                parsed.content_hash,
+                parsed.snapshot,
+            )
+            if parsed.saved and overlaid:
+                # The saved entries are what is on disk now
+                self._disk_entries[file_id] = self._capture_disk_entry(file_id)
+            return True
+
+    def close_buffer(self, file_path: str | Path) -> bool:
+        """Revert a file to its disk entries when its editor buffer is closed.
+
+        Neither reads nor parses the file: the entries set aside when the
+        buffer diverged from disk (and kept up to date since) are restored,
+        and everything held for the buffer is released.
+
+        Args:
+            file_path: Path of the closed document
+
+        Returns:
+            True if the index changed, i.e. the buffer differed from disk
+        """
+        file_id = self.file_ids.get_id(file_path)
+        with self._lock:
+            self._file_versions.pop(file_id, None)
+            self._python_snapshots.pop(file_id, None)
+            disk = self._disk_entries.pop(file_id, None)
+            if disk is None:
+                return False
+
+            if disk.definitions is None and disk.usages is None:
+                # Never indexed from disk, e.g. a new file that was never saved
+                self._remove_file_id(file_id)
+            else:
+                file_path_str = self._file_path_of(file_id)
+                self._apply_entry(
+                    file_id, file_path_str, disk.definitions, disk.usages, disk.content_hash, None
+                )
+            return True
+
+    def has_buffer_overlay(self, file_path: str | Path) -> bool:
+        """Check whether a file's indexed entries come from an open buffer that differs from disk."""
+        file_id = self.file_ids.get_id(file_path)
+        with self._lock:
+            return file_id in self._disk_entries
+
+    def _capture_disk_entry(self, file_id: int) -> _DiskEntry:
+        """Capture the entries currently indexed for a file."""
+        return _DiskEntry(
+            definitions=self._definitions_by_file.get(file_id)
+            if file_id in self._indexed_python_files
+            else None,
+            usages=self._store.get_file(file_id) if file_id in self._indexed_template_files else None,
+            content_hash=self._content_hashes.get(file_id),
+        )
+
+    def _update_disk_entry(self, parsed: ParsedFile) -> None:
+        """Update the entries set aside underneath an open buffer from a disk result."""
+        disk = self._disk_entries[parsed.file_id]
+        if parsed.unchanged:
+            if parsed.content_hash == self._content_hashes.get(parsed.file_id):
+                # Disk now matches the buffer, e.g. after a save: share the buffer's entries
+                self._disk_entries[parsed.file_id] = self._capture_disk_entry(parsed.file_id)
+            return
+        if parsed.definitions is None and parsed.usages is None:
+            # Syntax error on disk: keep the last good definitions, like for buffers
+            disk.content_hash = parsed.content_hash
+            return
+        self._disk_entries[parsed.file_id] = _DiskEntry(
+            definitions=parsed.definitions, usages=parsed.usages, content_hash=parsed.content_hash
+        )
+
+    def _apply_entry(
+        self,
+        file_id: int,
+        file_path_str: str,
+        definitions: list[HxRequestDefinition] | None,
+        usages: list[HxRequestUsage] | None,
+        content_hash: int | None,
+        snapshot: PythonModuleSnapshot | None,
+    ) -> None:
+        """Make the given entries the ones indexed for a file.
+
+        Entries from disk are saved to the store; entries of an open buffer
+        that differs from disk only shadow them.
+        """
+        if content_hash is not None:
+            self._content_hashes[file_id] = content_hash
         else:
-            usages = parse_template_file(file_path)
+            self._content_hashes.pop(file_id, None)
+
+        from_disk = file_id not in self._disk_entries
+        with self._store.batch():
+            if definitions is not None:
+                if snapshot is not None:
+                    self._python_snapshots[file_id] = snapshot
+                else:
+                    self._python_snapshots.pop(file_id, None)
+                self._replace_python_definitions(file_id, file_path_str, definitions)
+            elif usages is not None:
+                self._replace_template_usages(file_id, file_path_str, usages, pinned=not from_disk)
+            if (
+                from_disk
+                and content_hash is not None
+                and (definitions is not None or usages is not None)
+            ):
+                self._store.save_file(file_id, file_path_str, content_hash, definitions)
+
+    def is_template_file(self, file_path: str | Path) -> bool:
+        """Check whether a file is a template, by its extension."""
+        return self.discovery.is_template_path(file_path)
+
+    def get_file_version(self, file_path: str | Path) -> int | None:
+        """Get the LSP document version last applied for a file, if any."""
+        file_id = self.file_ids.get_id(file_path)
+        with self._lock:
+            return self._file_versions.get(file_id)
+
+    def forget_file_version(self, file_path: str | Path) -> None:
+        """Stop tracking the document version of a file, e.g. when it is closed."""
+        file_id = self.file_ids.get_id(file_path)
+        with self._lock:
+            self._file_versions.pop(file_id, None)
 
-        # Update index
-        self._usages_by_file[file_path_str] = usages
-        self._indexed_template_files.add(file_path_str)
+    def _replace_python_definitions(
+        self, file_id: int, file_path_str: str, definitions: list[HxRequestDefinition]
+    ) -> None:
+        """Replace the definitions indexed for a Python file.
 
-        for usage in usages:
-            if usage.name not in self._usages:
-                self._usages[usage.name] = []
-            self._usages[usage.name].append(usage)
+        Definitions that come back unchanged keep their generation, so that
+        re-parsing a file only invalidates caches for the classes that changed.
+        """
+        # The last class with a name wins, as when the definitions are set in order
+        latest = {definition.name: definition for definition in definitions}
+        for old_def in self._definitions_by_file.get(file_id, []):
+            if old_def.name not in latest and old_def.name in self._definitions:
+                if self._definitions[old_def.name].file_path == file_path_str:
+                    self._delete_definition(old_def.name)
+
+        self._definitions_by_file[file_id] = definitions
+        self._indexed_python_files.add(file_id)
+
+        for definition in latest.values():
+            current = self._definitions.get(definition.name)
+            if current is None or not _same_definition(current, definition):
+                self._set_definition(definition)
+
+    def _replace_template_usages(
+        self, file_id: int, file_path_str: str, usages: list[HxRequestUsage], pinned: bool = False
+    ) -> None:
+        """Replace the usages indexed for a template file; pinned usages come from an open buffer."""
+        self._set_file_usages(file_id, file_path_str, usages, pinned)
+        self._indexed_template_files.add(file_id)
+
+    def _remove_python_definitions(self, file_id: int, file_path_str: str) -> None:
+        """Remove the definitions indexed for a Python file from the name map."""
+        for old_def in self._definitions_by_file.get(file_id, []):
+            if old_def.name in self._definitions:
+                if self._definitions[old_def.name].file_path == file_path_str:
+                    self._delete_definition(old_def.name)
+
+    def _set_file_usages(
+        self, file_id: int, file_path_str: str, usages: list[HxRequestUsage], pinned: bool = False
+    ) -> None:
+        """Store the usages of a template file, sorted by position."""
+        usages = sorted(usages, key=lambda u: (u.line_number, u.column))
+        self._store.set_usages(file_id, file_path_str, usages, pinned)
+
+    def _set_definition(self, definition: HxRequestDefinition) -> None:
+        """Add or replace a definition, invalidating caches that depend on it."""
+        self._definitions[definition.name] = definition
+        self._name_index.add(definition.name, definition.name, definition.class_name)
+        self._definitions_epoch = next(self._generation_counter)
+        self._definition_generations[definition.name] = self._definitions_epoch
+        self._relevance_orderings.clear()
+        self._suggestions.clear()
+
+    def _delete_definition(self, name: str) -> None:
+        """Remove a definition, invalidating caches that depend on it."""
+        del self._definitions[name]
+        self._name_index.remove(name)
+        self._definitions_epoch = next(self._generation_counter)
+        self._definition_generations.pop(name, None)
+        self._relevance_orderings.clear()
+        self._suggestions.clear()
 
     def remove_file(self, file_path: str | Path) -> None:
-        """Remove a file from the index.
+        """Remove a deleted or renamed file from the index.
+
+        If the path is a directory, every indexed file below it is removed. The
+        path is also dropped from the file ID table, so a new file at the same
+        path is resolved afresh.
 
         Args:
-            file_path: Path to the removed file
+            file_path: Path to the removed file or directory
         """
-        file_path = Path(file_path)
-        file_path_str = str(file_path.resolve())
-
         with self._lock:
-            if file_path_str in self._indexed_python_files:
-                old_definitions = self._definitions_by_file.get(file_path_str, [])
-                for old_def in old_definitions:
-                    if old_def.name in self._definitions:
-                        if self._definitions[old_def.name].file_path == file_path_str:
-                            del self._definitions[old_def.name]
-                self._definitions_by_file.pop(file_path_str, None)
-                self._indexed_python_files.discard(file_path_str)
-
-            if file_path_str in self._indexed_template_files:
-                old_usages = self._usages_by_file.get(file_path_str, [])
-                for old_usage in old_usages:
-                    if old_usage.name in self._usages:
-                        self._usages[old_usage.name] = [
-                            u for u in self._usages[old_usage.name] if u.file_path != file_path_str
-                        ]
-                        if not self._usages[old_usage.name]:
-                            del self._usages[old_usage.name]
-                self._usages_by_file.pop(file_path_str, None)
-                self._indexed_template_files.discard(file_path_str)
+            # Intern first, so that any spelling of an indexed path is recognized
+            self.file_ids.get_id(file_path)
+            for file_id in self.file_ids.invalidate(file_path):
+                self._remove_file_id(file_id)
+
+    def _remove_file_id(self, file_id: int) -> None:
+        """Remove everything indexed for a file ID."""
+        file_path_str = self._file_path_of(file_id)
+
+        if file_id in self._indexed_python_files:
+            self._remove_python_definitions(file_id, file_path_str)
+            self._definitions_by_file.pop(file_id, None)
+            self._python_snapshots.pop(file_id, None)
+            self._indexed_python_files.discard(file_id)
+
+        self._store.remove(file_id, file_path_str)
+        self._indexed_template_files.discard(file_id)
+        self._file_versions.pop(file_id, None)
+        self._content_hashes.pop(file_id, None)
+        self._disk_entries.pop(file_id, None)
+
+    def _file_path_of(self, file_id: int) -> str:
+        """Get the path records of a file were indexed with, even after it was invalidated."""
+        definitions = self._definitions_by_file.get(file_id)
+        if definitions:
+            return definitions[0].file_path
+        return self._store.path_of(file_id) or self.file_ids.get_path(file_id) or ""
 
     def get_definition(self, name: str) -> HxRequestDefinition | None:
         """Get the definition of an hx_request by name.
@@ -247,8 +935,35 @@ class HxRequestIndex:
         Returns:
             List of usages (may be empty)
         """
+        self._index_pending_apps()
+        with self._lock:
+            return self._store.get_by_name(name)
+
+    def count_usages(self, name: str) -> int:
+        """Count the usages of an hx_request without looking up their positions.
+
+        Args:
+            name: The hx_request name
+
+        Returns:
+            Number of usages
+        """
+        self._index_pending_apps()
+        with self._lock:
+            return self._store.count_by_name(name)
+
+    def get_files_using(self, name: str) -> list[str]:
+        """Get the template files using an hx_request, without looking up the usages themselves.
+
+        Args:
+            name: The hx_request name
+
+        Returns:
+            Paths of the files, each once
+        """
+        self._index_pending_apps()
         with self._lock:
-            return list(self._usages.get(name, []))
+            return self._store.files_using(name)
 
     def get_all_definition_names(self) -> list[str]:
         """Get all known hx_request names.
@@ -259,13 +974,43 @@ class HxRequestIndex:
         with self._lock:
             return sorted(self._definitions.keys())
 
+    def get_definition_generation(self, name: str) -> int | None:
+        """Get the generation of a definition.
+
+        The generation changes whenever the definition is replaced, so it can
+        be used to invalidate anything derived from it.
+
+        Args:
+            name: The hx_request name
+
+        Returns:
+            The generation, or None if the name isn't defined
+        """
+        with self._lock:
+            return self._definition_generations.get(name)
+
+    def get_definition_generations(self) -> dict[str, int]:
+        """Get the generations of all definitions.
+
+        Returns:
+            Dictionary mapping hx_request names to their generation
+        """
+        with self._lock:
+            return dict(self._definition_generations)
+
+    @property
+    def definitions_epoch(self) -> int:
+        """Number that changes whenever any definition is added, replaced or removed."""
+        return self._definitions_epoch
+
     def get_definitions_sorted_by_relevance(
         self, current_file: str | Path | None = None
     ) -> list[HxRequestDefinition]:
         """Get all definitions sorted by relevance to the current file.
 
         Definitions from the same app (directory) as the current file come first,
-        then the rest are sorted alphabetically.
+        then the rest are sorted alphabetically. The ordering is cached per app
+        until a definition changes.
 
         Args:
             current_file: Path to the current file being edited
@@ -273,21 +1018,39 @@ class HxRequestIndex:
         Returns:
             List of definitions sorted by relevance
         """
+        # Without a current file the ordering is purely alphabetical
+        key = (True, self.get_app_name(current_file)) if current_file else (False, None)
+
         with self._lock:
-            all_defs = list(self._definitions.values())
+            ordering = self._relevance_orderings.get(key)
+            if ordering is None:
+                ordering = self._sort_definitions(*key)
+                self._relevance_orderings[key] = ordering
+            return list(ordering)
 
-            if not current_file:
-                return sorted(all_defs, key=lambda d: d.name)
+    def _sort_definitions(self, by_app: bool, app: str | None) -> list[HxRequestDefinition]:
+        """Sort all definitions, with those from the given app first if by_app is set."""
+        all_defs = list(self._definitions.values())
+        if not by_app:
+            return sorted(all_defs, key=lambda d: d.name)
 
-            current_path = Path(current_file).resolve()
-            current_app = self._extract_app_name(current_path)
+        def sort_key(definition: HxRequestDefinition) -> tuple[int, str]:
+            def_app = self._extract_app_name(Path(definition.file_path))
+            is_same_app = 0 if def_app == app else 1
+            return (is_same_app, definition.name)
 
-            def sort_key(definition: HxRequestDefinition) -> tuple[int, str]:
-                def_app = self._extract_app_name(Path(definition.file_path))
-                is_same_app = 0 if def_app == current_app else 1
-                return (is_same_app, definition.name)
+        return sorted(all_defs, key=sort_key)
 
-            return sorted(all_defs, key=sort_key)
+    def get_app_name(self, file_path: str | Path) -> str | None:
+        """Get the Django app a file belongs to.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            App name or None if not determinable
+        """
+        return self._extract_app_name(Path(self.file_ids.canonical_path(file_path)))
 
     def _extract_app_name(self, file_path: Path) -> str | None:
         """Extract the Django app name from a file path.
@@ -318,6 +1081,47 @@ class HxRequestIndex:
         with self._lock:
             return list(self._definitions.values())
 
+    def search_definitions(self, query: str, limit: int) -> tuple[list[HxRequestDefinition], bool]:
+        """Find definitions whose name or class name matches a query, best matches first.
+
+        Matches are looked up in an n-gram index of the names (see
+        name_index.NgramIndex), so typos still find something and the
+        lookup doesn't scan every definition.
+
+        Args:
+            query: Text to look for; an empty query matches every definition
+            limit: Most definitions to return
+
+        Returns:
+            The definitions, and whether more matched than the limit
+        """
+        with self._lock:
+            result = self._name_index.search(query, limit)
+            return [self._definitions[name] for name in result.keys], result.is_incomplete
+
+    def suggest_names(self, name: str, limit: int) -> list[str]:
+        """Suggest defined names close to an unknown one, closest first.
+
+        Candidates come from the n-gram index of the names, so only names
+        sharing enough of the unknown name's n-grams are compared letter by
+        letter. Suggestions are cached until a definition changes, so a
+        typo repeated across a template is only looked up once.
+
+        Args:
+            name: The unknown hx_request name
+            limit: Most names to suggest
+
+        Returns:
+            Defined names at most a few edits away (more for longer names)
+        """
+        max_distance = min(MAX_SUGGESTION_DISTANCE, max(1, len(name) // 4))
+        with self._lock:
+            suggestions = self._suggestions.get((name, limit))
+            if suggestions is None:
+                suggestions = self._name_index.nearest(name, limit, max_distance)
+                self._suggestions[(name, limit)] = suggestions
+            return list(suggestions)
+
     def get_definitions_in_file(self, file_path: str | Path) -> list[HxRequestDefinition]:
         """Get all definitions in a specific file.
 
@@ -327,9 +1131,9 @@ class HxRequestIndex:
         Returns:
             List of definitions in that file
         """
-        file_path_str = str(Path(file_path).resolve())
+        file_id = self.file_ids.get_id(file_path)
         with self._lock:
-            return list(self._definitions_by_file.get(file_path_str, []))
+            return list(self._definitions_by_file.get(file_id, []))
 
     def get_usages_in_file(self, file_path: str | Path) -> list[HxRequestUsage]:
         """Get all usages in a specific file.
@@ -340,9 +1144,39 @@ class HxRequestIndex:
         Returns:
             List of usages in that file
         """
-        file_path_str = str(Path(file_path).resolve())
+        file_id = self.file_ids.get_id(file_path)
         with self._lock:
-            return list(self._usages_by_file.get(file_path_str, []))
+            return list(self._store.get_file(file_id) or [])
+
+    def get_usage_at_position(
+        self, file_path: str | Path, line: int, column: int
+    ) -> HxRequestUsage | None:
+        """Get the usage whose name is under a cursor position.
+
+        Looks the position up in the usages already indexed for the file, so
+        the document isn't tokenized again.
+
+        Args:
+            file_path: Path to the template file
+            line: Line number (1-based)
+            column: Column number (0-based)
+
+        Returns:
+            The usage if the position is within its name, None otherwise
+        """
+        file_id = self.file_ids.get_id(file_path)
+        with self._lock:
+            positions = self._store.get_positions(file_id)
+            if not positions:
+                return None
+            # Last usage starting at or before the cursor
+            i = bisect_right(positions, (line, column)) - 1
+            if i < 0:
+                return None
+            usage = self._store.get_file(file_id)[i]
+        if usage.line_number == line and column < usage.end_column:
+            return usage
+        return None
 
     def find_undefined_usages(self) -> list[HxRequestUsage]:
         """Find all usages that reference undefined hx_requests.
@@ -350,12 +1184,9 @@ class HxRequestIndex:
         Returns:
             List of usages that don't have corresponding definitions
         """
+        self._index_pending_apps()
         with self._lock:
-            undefined = []
-            for name, usages in self._usages.items():
-                if name not in self._definitions:
-                    undefined.extend(usages)
-            return undefined
+            return self._store.get_undefined(self._definitions)
 
     def find_unused_definitions(self) -> list[HxRequestDefinition]:
         """Find all definitions that are never used.
@@ -363,9 +1194,69 @@ class HxRequestIndex:
         Returns:
             List of definitions with no usages
         """
+        self._index_pending_apps()
         with self._lock:
-            unused = []
-            for name, definition in self._definitions.items():
-                if name not in self._usages or not self._usages[name]:
-                    unused.append(definition)
-            return unused
+            used = self._store.used_names()
+            return [definition for name, definition in self._definitions.items() if name not in used]
+
+    def _index_pending_apps(self) -> None:
+        """Index any pending apps before a lookup that needs every usage."""
+        if self._pending_templates:
+            self.index_pending_apps()
+
+    def stats(self) -> dict[str, int | str]:
+        """Return gauges describing the size of the index."""
+        with self._lock:
+            return {
+                "definitions": len(self._definitions),
+                "usages": self._store.count(),
+                "python_files": len(self._indexed_python_files),
+                "template_files": len(self._indexed_template_files),
+                "buffer_overlays": len(self._disk_entries),
+                "pending_apps": len(self._pending_templates),
+                "file_ids": len(self.file_ids),
+                "store": self._store.backend,
+                **self._store.stats(),
+            }
+
+
+def _read_source(file_path: str) -> str | None:
+    """Read a source file, returning None if it's missing or not UTF-8."""
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _same_definition(a: HxRequestDefinition, b: HxRequestDefinition) -> bool:
+    """Check whether two definitions have the same content, location included."""
+    # HxRequestDefinition's __eq__ only compares the name, file and line
+    return astuple(a) == astuple(b)
+
+
+def _content_hash(content: str) -> int:
+    """Hash file content; unlike hash(), stable across processes and runs."""
+    digest = hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    # Signed, so that it fits in a SQLite integer
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def _parse_disk_file(
+    file_path_str: str, is_python: bool, workspace_root: Path | None
+) -> tuple[int | None, list[HxRequestDefinition] | list[HxRequestUsage], float]:
+    """Read and parse a file for a full index build; may run in a worker process.
+
+    Returns:
+        Tuple of (content hash, definitions or usages, seconds spent parsing);
+        the hash is None if the file couldn't be read
+    """
+    content = _read_source(file_path_str)
+    if content is None:
+        return None, [], 0.0
+    start = time.perf_counter()
+    if is_python:
+        records = parse_hx_requests_from_source(content, file_path_str, workspace_root)
+    else:
+        records = parse_template_for_hx_requests(content, file_path_str)
+    return _content_hash(content), records, time.perf_counter() - start
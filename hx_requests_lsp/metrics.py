@@ -0,0 +1,198 @@
+"""Latency histograms and gauges describing how the server performs."""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in milliseconds, of the latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Seconds between lines of the metrics file
+DEFAULT_METRICS_INTERVAL = 60.0
+
+
+class LatencyHistogram:
+    """Counts durations into fixed buckets, so recording is cheap and memory is bounded.
+
+    Percentiles are estimated as the upper bound of the bucket they fall in.
+    """
+
+    def __init__(self, bounds_ms: tuple[float, ...] = LATENCY_BUCKETS_MS):
+        """Initialize the histogram.
+
+        Args:
+            bounds_ms: Ascending upper bounds of the buckets in milliseconds; a
+                last bucket catches anything slower
+        """
+        self.bounds_ms = bounds_ms
+        self.counts = [0] * (len(bounds_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Record one duration."""
+        ms = seconds * 1000
+        self.counts[bisect_left(self.bounds_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-th percentile (0-100) in milliseconds; 0 if nothing was recorded."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds_ms, self.counts, strict=False):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self) -> dict[str, Any]:
+        """Summarize the histogram as JSON-serializable data."""
+        buckets = {
+            f"<={bound}": count for bound, count in zip(self.bounds_ms, self.counts, strict=False)
+        }
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class Metrics:
+    """Latency histograms by name, safe to record into from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record a duration under a name."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Record how long the body of a ``with`` block takes."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def get(self, name: str) -> LatencyHistogram | None:
+        """Get the histogram recorded under a name, if any."""
+        with self._lock:
+            return self._histograms.get(name)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Summarize every histogram, by name."""
+        with self._lock:
+            return {name: self._histograms[name].snapshot() for name in sorted(self._histograms)}
+
+    def reset(self) -> None:
+        """Drop everything recorded so far."""
+        with self._lock:
+            self._histograms.clear()
+
+
+def hit_rate(hits: int, misses: int) -> float | None:
+    """Fraction of lookups that hit a cache, or None if there were none."""
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def memory_usage() -> dict[str, int]:
+    """Get the resident memory of this process in bytes: current (where known) and peak."""
+    usage = {}
+    try:
+        import resource
+    except ImportError:  # Windows
+        pass
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        usage["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    return usage
+
+
+class MetricsFileWriter:
+    """Appends a JSON line of stats to a file at a fixed interval.
+
+    Each line is the collected stats with a ``timestamp`` added, so the file
+    can be tailed or loaded line by line for plotting.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        collect: Callable[[], dict[str, Any]],
+        interval: float = DEFAULT_METRICS_INTERVAL,
+    ):
+        """Initialize the writer.
+
+        Args:
+            path: File to append to
+            collect: Returns the stats to write
+            interval: Seconds between lines
+        """
+        self.path = path
+        self.collect = collect
+        self.interval = interval
+        self._handle: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start writing on an event loop; the first line is written after one interval."""
+        self._loop = loop
+        self._schedule()
+
+    def stop(self) -> None:
+        """Write a last line and stop."""
+        if self._handle is None:
+            return
+        self._handle.cancel()
+        self._handle = None
+        self.write()
+
+    def write(self) -> None:
+        """Append the current stats to the file."""
+        try:
+            line = json.dumps({"timestamp": time.time(), **self.collect()}, default=str)
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+        except Exception:
+            logger.exception(f"Could not write metrics to {self.path}")
+
+    def _tick(self) -> None:
+        self.write()
+        self._schedule()
+
+    def _schedule(self) -> None:
+        self._handle = self._loop.call_later(self.interval, self._tick)
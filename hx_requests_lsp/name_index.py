@@ -0,0 +1,234 @@
+"""N-gram index over hx_request names, for fuzzy lookups by name."""
+
+import heapq
+from dataclasses import dataclass
+
+# Length of the n-grams names are indexed by
+NGRAM_SIZE = 3
+
+# Tiers a match is ranked by, best first
+EXACT, PREFIX, SUBSTRING, SIMILAR = range(4)
+
+_EMPTY: frozenset[str] = frozenset()
+
+
+@dataclass
+class SearchResult:
+    """Keys matching a query, best first."""
+
+    keys: list[str]
+    is_incomplete: bool  # True if more keys matched than the limit allowed
+
+
+class NgramIndex:
+    """Maps the n-grams of names to the keys indexed under them.
+
+    Each key is indexed under one or more texts, e.g. an hx_request's name
+    and its class name, compared case-insensitively. A query matches a key
+    if one of its texts equals, starts with or contains the query, or,
+    failing that, shares at least half of the query's n-grams, so that
+    typos still find something. Queries shorter than an n-gram are matched
+    by scanning every text.
+
+    The index isn't thread-safe; the owner serializes access.
+    """
+
+    def __init__(self, n: int = NGRAM_SIZE):
+        """Initialize the index.
+
+        Args:
+            n: Length of the n-grams
+        """
+        self.n = n
+
+        # Maps key -> lowercased texts it is indexed under
+        self._texts: dict[str, tuple[str, ...]] = {}
+
+        # Maps n-gram -> keys with a text containing it
+        self._postings: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, key: str, *texts: str) -> None:
+        """Index a key under some texts, replacing what it was indexed under before."""
+        texts = tuple(dict.fromkeys(text.lower() for text in texts if text))
+        if self._texts.get(key) == texts:
+            return
+        self.remove(key)
+        self._texts[key] = texts
+        for gram in self._ngrams(*texts):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        """Stop indexing a key."""
+        texts = self._texts.pop(key, None)
+        if texts is None:
+            return
+        for gram in self._ngrams(*texts):
+            keys = self._postings[gram]
+            keys.discard(key)
+            if not keys:
+                del self._postings[gram]
+
+    def clear(self) -> None:
+        """Forget every key."""
+        self._texts.clear()
+        self._postings.clear()
+
+    def search(self, query: str, limit: int) -> SearchResult:
+        """Find the keys matching a query.
+
+        Keys are ranked by how their best text matches (exact, prefix,
+        substring, similar), then by how many n-grams it shares with the
+        query, then by length and name.
+
+        Args:
+            query: Text to look for; an empty query matches every key
+            limit: Most keys to return
+
+        Returns:
+            The best keys, and whether more matched
+        """
+        query = query.strip().lower()
+        if not query:
+            return SearchResult(heapq.nsmallest(limit, self._texts), len(self._texts) > limit)
+
+        grams = self._ngrams(query)
+        if not grams:
+            candidates = {key: 0 for key, texts in self._texts.items() if _contains(texts, query)}
+        else:
+            postings = sorted((self._postings.get(gram, _EMPTY) for gram in grams), key=len)
+            candidates = _containing_all(postings)
+            if not candidates:
+                # No text contains the query; look for similar ones instead
+                candidates = _sharing_at_least(postings, max(1, (len(postings) + 1) // 2))
+
+        ranked = []
+        for key, shared in candidates.items():
+            tier, length = _best_match(query, self._texts[key])
+            ranked.append((tier, -shared, length, key))
+        return SearchResult([key for *_, key in heapq.nsmallest(limit, ranked)], len(ranked) > limit)
+
+    def nearest(self, query: str, limit: int, max_distance: int) -> list[str]:
+        """Find the keys whose first text is closest to a query by edit distance, closest first.
+
+        Each edit breaks at most ``n + 1`` of the query's n-grams (a swap of
+        two letters touches ``n + 1``), so only keys sharing all but
+        ``(n + 1) * max_distance`` of them are compared, unless the query is
+        too short to rule any out. Keys sharing the most n-grams are compared
+        first, and comparing stops once the n-grams the rest lack show they
+        can't be closer than the keys already found.
+
+        Args:
+            query: Text to compare with, e.g. a misspelled name
+            limit: Most keys to return
+            max_distance: Most edits (see _edit_distance) a key's text may be away
+
+        Returns:
+            The closest keys, ties broken by name
+        """
+        query = query.lower()
+        grams = self._ngrams(query)
+        threshold = len(grams) - (self.n + 1) * max_distance
+        if threshold >= 1:
+            postings = sorted((self._postings.get(gram, _EMPTY) for gram in grams), key=len)
+            candidates = sorted(
+                _sharing_at_least(postings, threshold).items(), key=lambda item: -item[1]
+            )
+        else:
+            candidates = [(key, len(grams)) for key in self._texts]
+
+        found: list[tuple[int, str]] = []
+        bound = max_distance
+        for key, shared in candidates:
+            # Fewest edits that could break the n-grams this key lacks
+            if -(-(len(grams) - shared) // (self.n + 1)) > bound:
+                break
+            distance = _edit_distance(query, self._texts[key][0], bound)
+            if distance <= bound:
+                found.append((distance, key))
+                if len(found) >= limit:
+                    found = heapq.nsmallest(limit, found)
+                    bound = found[-1][0]
+        return [key for _, key in heapq.nsmallest(limit, found)]
+
+    def _ngrams(self, *texts: str) -> set[str]:
+        n = self.n
+        return {text[i : i + n] for text in texts for i in range(len(text) - n + 1)}
+
+
+def _containing_all(postings: list[set[str]]) -> dict[str, int]:
+    """Find the keys in every posting list, by the number of lists.
+
+    Args:
+        postings: Posting lists of the query's n-grams, shortest first
+    """
+    keys = set(postings[0])
+    for posting in postings[1:]:
+        if not keys:
+            break
+        keys &= posting
+    return dict.fromkeys(keys, len(postings))
+
+
+def _sharing_at_least(postings: list[set[str]], threshold: int) -> dict[str, int]:
+    """Find the keys in at least ``threshold`` of the posting lists, by the number of lists.
+
+    A key in ``threshold`` of the lists is in at least one of the
+    ``len(postings) - threshold + 1`` shortest, so only those are scanned for
+    candidates; the lists of common n-grams are only probed.
+
+    Args:
+        postings: Posting lists of the query's n-grams, shortest first
+        threshold: Lists a key must be in, at least 1
+    """
+    candidates = set().union(*postings[: len(postings) - threshold + 1])
+    shared = {key: sum(key in posting for posting in postings) for key in candidates}
+    return {key: count for key, count in shared.items() if count >= threshold}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Count the insertions, deletions, substitutions and swaps of adjacent letters turning a into b.
+
+    Gives up as soon as the distance must exceed ``limit``, returning ``limit + 1``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _contains(texts: tuple[str, ...], query: str) -> bool:
+    for text in texts:
+        if query in text:
+            return True
+    return False
+
+
+def _best_match(query: str, texts: tuple[str, ...]) -> tuple[int, int]:
+    """Get the tier and length of the text that matches a query best."""
+    if len(texts) == 1:
+        return _match_tier(query, texts[0]), len(texts[0])
+    return min((_match_tier(query, text), len(text)) for text in texts)
+
+
+def _match_tier(query: str, text: str) -> int:
+    if text == query:
+        return EXACT
+    if text.startswith(query):
+        return PREFIX
+    if query in text:
+        return SUBSTRING
+    return SIMILAR
@@ -0,0 +1,148 @@
+"""Version-checked pipeline for parsing documents off the request thread."""
+
+import itertools
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, Future
+from pathlib import Path
+
+from hx_requests_lsp.index import HxRequestIndex
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of parsing and applying an update
+_APPLIED = "applied"
+_UNCHANGED = "unchanged"
+_DISCARDED = "discarded"
+
+
+class ParsePipeline:
+    """Parses document updates on an executor and applies them to the index.
+
+    Every submitted update gets a ticket. When its parse finishes, the result
+    is only applied if no newer update for the same file was submitted in the
+    meantime, so a slow parse of an old version can never overwrite a newer
+    one. Updates whose content is identical to the indexed content are not
+    applied at all. Without an executor, updates are parsed synchronously.
+    """
+
+    def __init__(self, index: HxRequestIndex, executor: Executor | None = None):
+        """Initialize the pipeline.
+
+        Args:
+            index: Index to apply parse results to
+            executor: Executor to parse on (parses inline if None)
+        """
+        self.index = index
+        self.executor = executor
+        self._lock = threading.Lock()
+        self._tickets = itertools.count(1)
+
+        # Maps file path -> (ticket, future) of the latest submitted update
+        self._latest: dict[str, tuple[int, Future[bool]]] = {}
+
+        self.applied_count = 0
+        self.unchanged_count = 0
+        self.discarded_count = 0
+
+    def submit(
+        self,
+        file_path: str | Path,
+        content: str | None = None,
+        version: int | None = None,
+        saved: bool = False,
+        on_applied: Callable[[], None] | None = None,
+        on_unchanged: Callable[[], None] | None = None,
+    ) -> Future[bool]:
+        """Submit a document update for parsing.
+
+        Args:
+            file_path: Path of the document
+            content: Document content (if None, reads from disk)
+            version: LSP document version of the content
+            saved: Whether the content is an open buffer's, just saved to disk
+            on_applied: Called (on the parsing thread) once the result is applied
+            on_unchanged: Called (on the parsing thread) if the content was already indexed
+
+        Returns:
+            Future resolving to True if the result was applied, False if it was
+            stale or unchanged
+        """
+        key = str(file_path)
+        future: Future[bool] = Future()
+        with self._lock:
+            ticket = next(self._tickets)
+            self._latest[key] = (ticket, future)
+
+        def run() -> None:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                outcome = self._parse_and_apply(key, ticket, content, version, saved)
+                if outcome == _APPLIED and on_applied is not None:
+                    on_applied()
+                elif outcome == _UNCHANGED and on_unchanged is not None:
+                    on_unchanged()
+            except Exception as e:
+                logger.exception(f"Failed to parse {key}")
+                future.set_exception(e)
+            else:
+                future.set_result(outcome == _APPLIED)
+
+        if self.executor is None:
+            run()
+        else:
+            self.executor.submit(run)
+        return future
+
+    def pending(self, file_path: str | Path) -> Future[bool] | None:
+        """Get the future of the latest update submitted for a file, if any."""
+        with self._lock:
+            latest = self._latest.get(str(file_path))
+        return latest[1] if latest else None
+
+    def forget(self, file_path: str | Path) -> None:
+        """Drop tracking for a file; any update still in flight becomes stale."""
+        with self._lock:
+            self._latest.pop(str(file_path), None)
+        self.index.forget_file_version(file_path)
+
+    def stats(self) -> dict[str, int]:
+        """Return counters for applied, unchanged and discarded parse results."""
+        return {
+            "applied": self.applied_count,
+            "unchanged": self.unchanged_count,
+            "discarded": self.discarded_count,
+        }
+
+    def _parse_and_apply(
+        self, key: str, ticket: int, content: str | None, version: int | None, saved: bool
+    ) -> str:
+        if not self._check_current(key, ticket):
+            # Superseded before we even started
+            return _DISCARDED
+
+        parsed = self.index.parse_file(key, content, version, saved)
+        if parsed is None:
+            return _DISCARDED
+
+        with self._lock:
+            latest = self._latest.get(key)
+            if latest is not None and latest[0] == ticket:
+                if self.index.apply_parsed_file(parsed):
+                    self.applied_count += 1
+                    return _APPLIED
+                if parsed.unchanged:
+                    self.unchanged_count += 1
+                    return _UNCHANGED
+            self.discarded_count += 1
+            return _DISCARDED
+
+    def _check_current(self, key: str, ticket: int) -> bool:
+        with self._lock:
+            latest = self._latest.get(key)
+            if latest is None or latest[0] != ticket:
+                self.discarded_count += 1
+                return False
+            return True
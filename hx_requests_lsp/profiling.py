@@ -0,0 +1,163 @@
+"""cProfile and tracemalloc hooks for capturing profiles from a running server."""
+
+import cProfile
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# Fraction of requests profiled by default
+DEFAULT_SAMPLE_RATE = 0.1
+
+# Frames kept per traced allocation; more frames cost more memory and time
+TRACE_FRAMES = 10
+
+# Allocation sites reported with each memory snapshot
+TOP_ALLOCATIONS = 10
+
+T = TypeVar("T")
+
+
+class Profiler:
+    """Writes cProfile stats and tracemalloc snapshots to a directory.
+
+    Profiles are written as ``.prof`` files, which ``pstats``, snakeviz and
+    similar tools open, and snapshots as ``.tracemalloc`` files, which
+    ``tracemalloc.Snapshot.load`` reads back.
+
+    Only one profile is collected at a time: work that starts while another
+    is being profiled runs unprofiled.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        trace_memory: bool = False,
+    ):
+        """Initialize the profiler.
+
+        Args:
+            directory: Directory to write profiles and snapshots to
+            sample_rate: Fraction of requests to profile, from 0 to 1
+            trace_memory: Trace allocations with tracemalloc, so snapshots can be taken
+        """
+        self.directory = directory
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+        self._credit = 0.0
+        self._sequence = 0
+
+    def start(self) -> None:
+        """Create the output directory and start tracing allocations if asked to."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        logger.info(f"Writing profiles to {self.directory}")
+
+    def sample(self) -> cProfile.Profile | None:
+        """Decide whether to profile a request, returning a profile to collect into if so.
+
+        Requests are picked evenly rather than at random, so a rate of 0.25
+        profiles every fourth request.
+        """
+        with self._lock:
+            self._credit += self.sample_rate
+            if self._credit < 1.0:
+                return None
+            self._credit -= 1.0
+        return cProfile.Profile()
+
+    def run(self, profile: cProfile.Profile, func: Callable[..., T], *args: Any) -> T:
+        """Call a function, collecting into a profile unless another one is running."""
+        if not self._busy.acquire(blocking=False):
+            return func(*args)
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            self._busy.release()
+
+    def profiled(self, name: str, func: Callable[..., T]) -> Callable[..., T]:
+        """Wrap a function so every call to it is profiled and written out under a name."""
+
+        def wrapper(*args: Any) -> T:
+            profile = cProfile.Profile()
+            try:
+                return self.run(profile, func, *args)
+            finally:
+                self.dump(profile, name)
+
+        return wrapper
+
+    def dump(self, profile: cProfile.Profile, name: str) -> str | None:
+        """Write a profile's stats to a ``.prof`` file.
+
+        Returns:
+            Path of the file, or None if nothing was collected
+        """
+        profile.create_stats()
+        if not profile.stats:
+            return None
+        path = self._path(name, ".prof")
+        try:
+            profile.dump_stats(path)
+        except OSError:
+            logger.exception(f"Could not write profile to {path}")
+            return None
+        logger.debug("Wrote profile %s", path)
+        return path
+
+    def take_snapshot(self, label: str) -> dict[str, Any] | None:
+        """Write a tracemalloc snapshot and summarize where memory is allocated.
+
+        Returns:
+            The snapshot's path, traced and peak bytes and the biggest
+            allocation sites, or None if allocations aren't being traced
+        """
+        if not (self.trace_memory and tracemalloc.is_tracing()):
+            return None
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        path = self._path(label, ".tracemalloc")
+        snapshot.dump(path)
+        logger.info(f"Wrote memory snapshot {path}")
+
+        snapshot = snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+        return {
+            "path": path,
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "top": [
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+            ],
+        }
+
+    def _path(self, name: str, suffix: str) -> str:
+        """Build a unique, sortable file name for a profile or snapshot."""
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        stem = re.sub(r"[^\w.-]+", "-", name).strip("-")
+        return os.path.join(
+            self.directory,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sequence:04d}-{stem}{suffix}",
+        )
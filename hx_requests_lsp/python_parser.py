@@ -2,9 +2,11 @@
 
 import ast
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 
+from hx_requests_lsp.discovery import DiscoveryOptions, discover_workspace_files
+
 
 @dataclass
 class BaseClassInfo:
@@ -58,7 +60,7 @@ class HxRequestVisitor(ast.NodeVisitor):
     def __init__(self, file_path: str, source: str):
         self.file_path = file_path
         self.source = source
-        self.source_lines = source.splitlines()
+        self.source_lines = source.split("\n")
         self.definitions: list[HxRequestDefinition] = []
         self._imports: dict[str, str] = {}  # Maps imported names to their sources
 
@@ -172,8 +174,6 @@ def parse_hx_requests_from_file(
     Returns:
         List of HxRequestDefinition objects found in the file
     """
-    from hx_requests_lsp.base_class_resolver import resolve_all_base_classes
-
     file_path = Path(file_path)
     if not file_path.exists():
         return []
@@ -187,14 +187,7 @@ def parse_hx_requests_from_file(
     visitor = HxRequestVisitor(str(file_path.resolve()), source)
     visitor.visit(tree)
 
-    workspace_root_str = str(workspace_root) if workspace_root else None
-    for definition in visitor.definitions:
-        definition.base_class_info = resolve_all_base_classes(
-            definition.base_classes,
-            definition.file_path,
-            visitor.imports,
-            workspace_root_str,
-        )
+    _resolve_base_classes(visitor.definitions, visitor.imports, workspace_root)
 
     return visitor.definitions
 
@@ -212,57 +205,214 @@ def parse_hx_requests_from_source(
     Returns:
         List of HxRequestDefinition objects found in the source
     """
-    from hx_requests_lsp.base_class_resolver import resolve_all_base_classes
-
     try:
-        tree = ast.parse(source, filename=file_path)
+        return parse_python_module(source, file_path, workspace_root).definitions
     except SyntaxError:
         return []
 
+
+@dataclass
+class PythonModuleSnapshot:
+    """The last successfully parsed state of a Python module.
+
+    Kept by the index for open buffers so that later edits can be re-parsed
+    incrementally, and so that the last good definitions survive while the
+    buffer temporarily contains syntax errors.
+    """
+
+    source: str
+    definitions: list[HxRequestDefinition]
+    imports: dict[str, str] = field(default_factory=dict)
+
+
+def parse_python_module(
+    source: str, file_path: str = "<string>", workspace_root: str | Path | None = None
+) -> PythonModuleSnapshot:
+    """Parse a complete Python module.
+
+    Args:
+        source: Python source code as a string
+        file_path: Virtual file path for error messages
+        workspace_root: Root of workspace for resolving local imports
+
+    Returns:
+        Snapshot with the source, its definitions and its imports
+
+    Raises:
+        SyntaxError: If the source cannot be parsed
+    """
+    tree = ast.parse(source, filename=file_path)
+
     visitor = HxRequestVisitor(file_path, source)
     visitor.visit(tree)
 
+    _resolve_base_classes(visitor.definitions, visitor.imports, workspace_root)
+
+    return PythonModuleSnapshot(source=source, definitions=visitor.definitions, imports=visitor.imports)
+
+
+def reparse_python_module(
+    source: str,
+    file_path: str,
+    previous: PythonModuleSnapshot | None = None,
+    workspace_root: str | Path | None = None,
+) -> PythonModuleSnapshot:
+    """Parse a Python module, re-using a previous snapshot where possible.
+
+    When the edit between ``previous.source`` and ``source`` is confined to a
+    single top-level HxRequest class, only that class is re-parsed. Any other
+    edit falls back to a full parse.
+
+    Args:
+        source: New Python source code
+        file_path: Path of the module
+        previous: Snapshot of the last successful parse, if any
+        workspace_root: Root of workspace for resolving local imports
+
+    Returns:
+        Snapshot for the new source
+
+    Raises:
+        SyntaxError: If the new source cannot be parsed
+    """
+    if previous is not None:
+        snapshot = _reparse_enclosing_class(source, file_path, previous, workspace_root)
+        if snapshot is not None:
+            return snapshot
+    return parse_python_module(source, file_path, workspace_root)
+
+
+def _reparse_enclosing_class(
+    source: str,
+    file_path: str,
+    previous: PythonModuleSnapshot,
+    workspace_root: str | Path | None,
+) -> PythonModuleSnapshot | None:
+    """Re-parse only the top-level class that encloses the edited lines.
+
+    Returns:
+        The new snapshot, or None if the edit can't be handled incrementally
+    """
+    # Split on "\n" only: str.splitlines also breaks on form feeds and other
+    # characters that Python treats as part of a line
+    old_lines = previous.source.split("\n")
+    new_lines = source.split("\n")
+
+    # Common prefix and suffix (in lines) between the old and new source
+    max_common = min(len(old_lines), len(new_lines))
+    prefix = 0
+    while prefix < max_common and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < max_common - prefix
+        and old_lines[len(old_lines) - 1 - suffix] == new_lines[len(new_lines) - 1 - suffix]
+    ):
+        suffix += 1
+
+    if prefix == len(old_lines) == len(new_lines):
+        return PythonModuleSnapshot(source, list(previous.definitions), previous.imports)
+
+    # Edited range in the old source (1-based, inclusive); empty for pure insertions
+    edit_start = prefix + 1
+    edit_end = len(old_lines) - suffix
+    delta = len(new_lines) - len(old_lines)
+
+    enclosing = None
+    for definition in previous.definitions:
+        if definition.column != 0:
+            continue
+        if edit_end >= edit_start:
+            inside = definition.line_number <= edit_start and edit_end <= definition.end_line_number
+        else:
+            # Inserted lines must follow the class header and reach at most one past its end
+            inside = definition.line_number < edit_start <= definition.end_line_number + 1
+        if inside:
+            enclosing = definition
+            break
+    if enclosing is None:
+        return None
+
+    block_start = enclosing.line_number
+    block_end = max(enclosing.end_line_number, edit_end) + delta
+    block_lines = new_lines[block_start - 1 : block_end]
+
+    # The class must not continue past the block
+    for line in new_lines[block_end:]:
+        if line.strip():
+            if line[0].isspace():
+                return None
+            break
+
+    block_source = "\n".join(block_lines)
+    try:
+        tree = ast.parse(block_source, filename=file_path)
+    except SyntaxError:
+        return None
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.ClassDef):
+        return None
+
+    visitor = HxRequestVisitor(file_path, block_source)
+    visitor.visit(tree)
+
+    block_definitions = [
+        replace(
+            definition,
+            line_number=definition.line_number + block_start - 1,
+            end_line_number=definition.end_line_number + block_start - 1,
+        )
+        for definition in visitor.definitions
+    ]
+    _resolve_base_classes(block_definitions, previous.imports, workspace_root)
+
+    old_block_end = enclosing.end_line_number
+    definitions = []
+    for definition in previous.definitions:
+        if definition.line_number < block_start:
+            definitions.append(definition)
+        elif definition.line_number > old_block_end:
+            definitions.append(
+                replace(
+                    definition,
+                    line_number=definition.line_number + delta,
+                    end_line_number=definition.end_line_number + delta,
+                )
+            )
+    definitions.extend(block_definitions)
+    definitions.sort(key=lambda d: (d.line_number, d.column))
+
+    return PythonModuleSnapshot(source, definitions, previous.imports)
+
+
+def _resolve_base_classes(
+    definitions: list[HxRequestDefinition],
+    imports: dict[str, str],
+    workspace_root: str | Path | None,
+) -> None:
+    """Populate base_class_info on each definition."""
+    from hx_requests_lsp.base_class_resolver import resolve_all_base_classes
+
     workspace_root_str = str(workspace_root) if workspace_root else None
-    for definition in visitor.definitions:
+    for definition in definitions:
         definition.base_class_info = resolve_all_base_classes(
             definition.base_classes,
             definition.file_path,
-            visitor.imports,
+            imports,
             workspace_root_str,
         )
 
-    return visitor.definitions
-
 
-def find_hx_request_files(root_dir: str | Path) -> list[Path]:
+def find_hx_request_files(root_dir: str | Path, options: DiscoveryOptions | None = None) -> list[Path]:
     """Find all Python files that likely contain HxRequest definitions.
 
     Args:
         root_dir: Root directory to search
+        options: Discovery options (excluded directories)
 
     Returns:
         List of paths to Python files named hx_requests.py or in hx_requests/ directories
     """
-    root_dir = Path(root_dir)
-    files = []
-
-    # Find files named hx_requests.py
-    files.extend(root_dir.rglob("hx_requests.py"))
-
-    # Find Python files in hx_requests/ directories
-    for hx_dir in root_dir.rglob("hx_requests"):
-        if hx_dir.is_dir():
-            files.extend(hx_dir.rglob("*.py"))
-
-    # Deduplicate and filter out __pycache__ etc
-    seen = set()
-    result = []
-    for f in files:
-        if f.resolve() not in seen and "__pycache__" not in str(f):
-            seen.add(f.resolve())
-            result.append(f)
-
-    return sorted(result)
+    return discover_workspace_files(root_dir, options).python_files
 
 
 def collect_all_hx_requests(root_dir: str | Path) -> dict[str, HxRequestDefinition]:
@@ -0,0 +1,425 @@
+"""Recording of client sessions, and replaying them against an in-process server."""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, TextIO
+from urllib.parse import unquote, urlparse
+
+# Bumped whenever the layout of recordings changes
+RECORDING_FORMAT = 1
+
+# Client messages that end a session; replay ends the session itself
+SESSION_END_METHODS = ("shutdown", "exit")
+
+# Seconds replay waits for the server to answer outstanding requests at the end
+DEFAULT_REPLAY_TIMEOUT = 30.0
+
+# Longest pause replay keeps between two messages, so idle time doesn't count
+DEFAULT_MAX_GAP = 1.0
+
+_CONTENT_LENGTH = re.compile(rb"Content-Length:\s*(\d+)", re.IGNORECASE)
+
+
+class SessionRecorder:
+    """Writes every message a client sends to a JSON-lines file.
+
+    The first line describes the recording; each following line holds a
+    message and the seconds since recording started. Recordings contain
+    the full text of the documents the client opened and edited.
+    """
+
+    def __init__(self, path: str | Path, server_version: str):
+        """Start a recording.
+
+        Args:
+            path: File to write (overwritten)
+            server_version: Version of the recording server
+        """
+        self.path = str(path)
+        self._file: TextIO = open(self.path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._buffer = b""
+        self._start = time.monotonic()
+        self._write(
+            {
+                "type": "header",
+                "format": RECORDING_FORMAT,
+                "server_version": server_version,
+                "recorded_at": time.time(),
+            }
+        )
+
+    def attach(self, protocol: Any) -> None:
+        """Record the data a protocol receives before it handles it."""
+        data_received = protocol.data_received
+
+        def recording_data_received(data: bytes) -> None:
+            self.feed(data)
+            data_received(data)
+
+        protocol.data_received = recording_data_received
+
+    def feed(self, data: bytes) -> None:
+        """Take raw data from the client, recording each complete message."""
+        self._buffer += data
+        while (header_end := self._buffer.find(b"\r\n\r\n")) >= 0:
+            match = _CONTENT_LENGTH.search(self._buffer[:header_end])
+            body_start = header_end + 4
+            if match is None:
+                # Not a message header; skip it
+                self._buffer = self._buffer[body_start:]
+                continue
+            body_end = body_start + int(match.group(1))
+            if len(self._buffer) < body_end:
+                return
+            body, self._buffer = self._buffer[body_start:body_end], self._buffer[body_end:]
+            try:
+                self.record(json.loads(body))
+            except ValueError:
+                pass
+
+    def record(self, message: dict[str, Any]) -> None:
+        """Record one client message."""
+        self._write({"t": round(time.monotonic() - self._start, 6), "message": message})
+
+    def close(self) -> None:
+        """Finish the recording."""
+        with self._lock:
+            self._file.close()
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            # Flush every message, so a crash still leaves a usable recording
+            self._file.flush()
+
+
+def read_recording(path: str | Path) -> tuple[dict[str, Any], list[tuple[float, dict[str, Any]]]]:
+    """Read a recording.
+
+    Returns:
+        The header, and (seconds since start, message) for each client message
+
+    Raises:
+        ValueError: If the file isn't a recording in a known format
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("type") != "header":
+        raise ValueError(f"{path} is not a session recording")
+    header = lines[0]
+    if header.get("format") != RECORDING_FORMAT:
+        raise ValueError(
+            f"{path} has recording format {header.get('format')}, expected {RECORDING_FORMAT}"
+        )
+    return header, [(entry["t"], entry["message"]) for entry in lines[1:]]
+
+
+@dataclass
+class MethodStats:
+    """What the client saw of one LSP method during a replay."""
+
+    latencies: list[float] = field(default_factory=list)  # Seconds from request to response
+    bytes_sent: int = 0  # Bytes the server sent for the method's responses or notifications
+    messages: int = 0  # Responses or notifications the server sent
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize as JSON-serializable data, with latencies in milliseconds."""
+        summary: dict[str, Any] = {"messages": self.messages, "bytes_sent": self.bytes_sent}
+        if self.latencies:
+            summary.update(
+                requests=len(self.latencies),
+                p50_ms=round(_percentile(self.latencies, 50) * 1000, 3),
+                p95_ms=round(_percentile(self.latencies, 95) * 1000, 3),
+                p99_ms=round(_percentile(self.latencies, 99) * 1000, 3),
+                max_ms=round(max(self.latencies) * 1000, 3),
+            )
+        return summary
+
+
+@dataclass
+class ReplayReport:
+    """Result of replaying a recording."""
+
+    methods: dict[str, MethodStats] = field(default_factory=dict)
+    bytes_sent: int = 0  # Total bytes the server sent
+    bytes_received: int = 0  # Total bytes the client sent
+    unanswered: list[str] = field(default_factory=list)  # Methods of requests with no response
+    seconds: float = 0.0
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize as JSON-serializable data."""
+        return {
+            "seconds": round(self.seconds, 3),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "unanswered": self.unanswered,
+            "methods": {name: self.methods[name].summary() for name in sorted(self.methods)},
+        }
+
+
+class _ReplayClient:
+    """Plays the client side of a recording over a pair of pipes."""
+
+    def __init__(self, to_server: BinaryIO, from_server: BinaryIO):
+        self._to_server = to_server
+        self._from_server = from_server
+        self._write_lock = threading.Lock()
+        self._done = threading.Condition()
+
+        # Maps request ID -> (method, time sent) of requests still waiting for a response
+        self._pending: dict[Any, tuple[str, float]] = {}
+        self.report = ReplayReport()
+
+    def send(self, message: dict[str, Any]) -> None:
+        if "id" in message and "method" in message:
+            with self._done:
+                self._pending[message["id"]] = (message["method"], time.perf_counter())
+        body = json.dumps(message).encode()
+        with self._write_lock:
+            self._to_server.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+            self._to_server.flush()
+        self.report.bytes_received += len(body)
+
+    def hang_up(self) -> None:
+        with self._write_lock:
+            self._to_server.close()
+
+    def wait_for_responses(self, timeout: float) -> None:
+        with self._done:
+            self._done.wait_for(lambda: not self._pending, timeout)
+            self.report.unanswered = sorted(method for method, _ in self._pending.values())
+
+    def read_responses(self) -> None:
+        """Read the server's messages until it closes its end (runs on a thread)."""
+        while (message := self._read_message()) is not None:
+            body_size, message = message
+            received = time.perf_counter()
+            self.report.bytes_sent += body_size
+
+            method = message.get("method")
+            if method is not None:
+                if "id" in message:
+                    # A request from the server, e.g. to register capabilities
+                    self.send({"jsonrpc": "2.0", "id": message["id"], "result": None})
+                self._count(method, body_size)
+                continue
+
+            with self._done:
+                method, sent = self._pending.pop(message.get("id"), (None, None))
+                if method is not None:
+                    self._count(method, body_size).latencies.append(received - sent)
+                if not self._pending:
+                    self._done.notify_all()
+
+    def _count(self, method: str, body_size: int) -> MethodStats:
+        stats = self.report.methods.setdefault(method, MethodStats())
+        stats.messages += 1
+        stats.bytes_sent += body_size
+        return stats
+
+    def _read_message(self) -> tuple[int, dict[str, Any]] | None:
+        length = None
+        while True:
+            line = self._from_server.readline()
+            if not line:
+                return None
+            if line in (b"\r\n", b"\n"):
+                break
+            match = _CONTENT_LENGTH.match(line)
+            if match:
+                length = int(match.group(1))
+        body = self._from_server.read(length or 0)
+        if len(body) < (length or 0):
+            return None
+        return len(body), json.loads(body)
+
+
+def replay(
+    messages: list[tuple[float, dict[str, Any]]],
+    speed: float = 1.0,
+    max_gap: float = DEFAULT_MAX_GAP,
+    timeout: float = DEFAULT_REPLAY_TIMEOUT,
+) -> ReplayReport:
+    """Replay client messages against a fresh in-process server over pipes.
+
+    Messages are sent with the pauses they were recorded with, so debouncing
+    behaves as it did in the session. Requests aren't held back waiting for
+    earlier responses, as with a real client.
+
+    Args:
+        messages: (seconds since start, message) of each client message
+        speed: Playback speed; 0 sends every message without pausing
+        max_gap: Longest pause kept between two messages, in recorded seconds
+        timeout: Seconds to wait for outstanding responses at the end
+
+    Returns:
+        Latencies and sizes of what the server sent, by method
+    """
+    # Imported here so that building the command line doesn't import asyncio and pygls
+    import asyncio
+
+    from hx_requests_lsp.server import server
+
+    client_read, server_write = os.pipe()
+    server_read, client_write = os.pipe()
+    loop = asyncio.new_event_loop()
+    session = server.create_session(loop)
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        session.start_io(os.fdopen(server_read, "rb"), os.fdopen(server_write, "wb"))
+
+    server_thread = threading.Thread(target=serve, name="hx-requests-lsp-replay-server", daemon=True)
+    server_thread.start()
+
+    client = _ReplayClient(os.fdopen(client_write, "wb"), os.fdopen(client_read, "rb"))
+    reader = threading.Thread(
+        target=client.read_responses, name="hx-requests-lsp-replay-client", daemon=True
+    )
+    reader.start()
+
+    start = time.perf_counter()
+    previous = messages[0][0] if messages else 0.0
+    for recorded_at, message in messages:
+        if message.get("method") in SESSION_END_METHODS:
+            continue
+        gap = min(recorded_at - previous, max_gap)
+        previous = recorded_at
+        if speed > 0 and gap > 0:
+            time.sleep(gap / speed)
+        client.send(message)
+
+    client.wait_for_responses(timeout)
+    client.report.seconds = time.perf_counter() - start
+
+    # End the session, then hang up so the server's read loop finishes
+    client.send({"jsonrpc": "2.0", "id": "replay-shutdown", "method": "shutdown"})
+    client.wait_for_responses(timeout)
+    client.report.methods.pop("shutdown", None)
+    client.hang_up()
+    server_thread.join(timeout)
+    reader.join(timeout)
+    if not loop.is_closed():
+        loop.close()
+    return client.report
+
+
+def rebase_messages(
+    messages: list[tuple[float, dict[str, Any]]], old_root: str, new_root: str
+) -> list[tuple[float, dict[str, Any]]]:
+    """Point the paths and URIs of a recording at a different checkout of the workspace."""
+    old_root, new_root = old_root.rstrip("/"), new_root.rstrip("/")
+    replacements = {Path(old_root).as_uri(): Path(new_root).as_uri(), old_root: new_root}
+    # One pass, URIs first, and only whole path components
+    pattern = re.compile("(" + "|".join(re.escape(old) for old in replacements) + r')(?=[/"\\])')
+    rebased = []
+    for recorded_at, message in messages:
+        text = pattern.sub(lambda m: replacements[m.group(1)], json.dumps(message))
+        rebased.append((recorded_at, json.loads(text)))
+    return rebased
+
+
+def recorded_root(messages: list[tuple[float, dict[str, Any]]]) -> str | None:
+    """Get the workspace root the recorded client initialized with."""
+    for _, message in messages:
+        if message.get("method") == "initialize":
+            params = message.get("params") or {}
+            root_uri = params.get("rootUri")
+            if root_uri and root_uri.startswith("file://"):
+                return unquote(urlparse(root_uri).path)
+            return params.get("rootPath")
+    return None
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the replay command's arguments to a parser."""
+    parser.add_argument("recording", help="Session recorded with --record")
+    parser.add_argument(
+        "--root",
+        metavar="PATH",
+        help="Workspace to replay against, if it isn't where the session was recorded",
+    )
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="Playback speed; 0 sends messages without pausing"
+    )
+    parser.add_argument(
+        "--max-gap",
+        type=float,
+        default=DEFAULT_MAX_GAP,
+        help="Longest recorded pause to keep between two messages, in seconds",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_REPLAY_TIMEOUT,
+        help="Seconds to wait for outstanding responses",
+    )
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Report format")
+
+
+def run(args: argparse.Namespace, stdout: TextIO | None = None, stderr: TextIO | None = None) -> int:
+    """Run the replay command.
+
+    Returns:
+        Exit code: 0 if every request was answered, 1 if some weren't, 2 on bad input
+    """
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+
+    try:
+        header, messages = read_recording(args.recording)
+    except (OSError, ValueError) as e:
+        print(f"hx-requests-lsp replay: {e}", file=stderr)
+        return 2
+
+    old_root = recorded_root(messages)
+    if args.root and old_root:
+        messages = rebase_messages(messages, old_root, str(Path(args.root).resolve()))
+
+    report = replay(messages, speed=args.speed, max_gap=args.max_gap, timeout=args.timeout)
+
+    if args.format == "json":
+        json.dump({"recording": header, **report.summary()}, stdout, indent=2)
+        stdout.write("\n")
+    else:
+        stdout.write(_to_text(report))
+    if report.unanswered:
+        print(f"{len(report.unanswered)} request(s) got no response: {report.unanswered}", file=stderr)
+        return 1
+    return 0
+
+
+def _to_text(report: ReplayReport) -> str:
+    lines = [f"{'method':<36} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'bytes sent':>12}"]
+    for name, summary in report.summary()["methods"].items():
+        if "requests" in summary:
+            lines.append(
+                f"{name:<36} {summary['requests']:>6} {summary['p50_ms']:>9.2f} "
+                f"{summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f} {summary['bytes_sent']:>12}"
+            )
+        else:
+            lines.append(
+                f"{name:<36} {summary['messages']:>6} {'':>9} {'':>9} {'':>9} {summary['bytes_sent']:>12}"
+            )
+    lines.append(
+        f"{report.seconds:.2f}s, {report.bytes_sent} bytes sent by the server, "
+        f"{report.bytes_received} bytes sent by the client"
+    )
+    return "\n".join(lines) + "\n"
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
@@ -0,0 +1,156 @@
+"""Client side of the shared daemon: starting it and relaying an editor's stdio to it.
+
+Kept apart from the daemon itself so that ``--connect``, which editors run on
+every start, doesn't import the language server.
+"""
+
+import os
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Seconds the daemon, and each workspace's index, outlive their last client,
+# so that reloading an editor window doesn't throw the index away
+DEFAULT_IDLE_TIMEOUT = 30.0
+
+# Seconds a client waits for a daemon it started to accept connections
+DAEMON_START_TIMEOUT = 10.0
+
+# Bytes copied at a time between stdio and the daemon's socket
+RELAY_CHUNK_SIZE = 65536
+
+# Mode of the directory made for the socket outside $XDG_RUNTIME_DIR: only its owner may enter
+SOCKET_DIR_MODE = 0o700
+
+
+def default_socket_path() -> str:
+    """Get the per-user Unix socket path of the shared daemon.
+
+    The socket is in $XDG_RUNTIME_DIR, which only the user can access. Without
+    one, it is in a directory of the temp directory that is made for the user
+    with mode 0700, so other users can't connect to the daemon or replace it.
+
+    Raises:
+        PermissionError: If that directory exists but isn't private to the user
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, f"hx-requests-lsp-{os.getuid()}.sock")
+    socket_dir = os.path.join(tempfile.gettempdir(), f"hx-requests-lsp-{os.getuid()}")
+    _make_private_dir(socket_dir)
+    return os.path.join(socket_dir, "daemon.sock")
+
+
+def connect_to_daemon(
+    address: str | tuple[str, int], start_command: list[str] | None = None
+) -> socket.socket:
+    """Connect to a running daemon, starting one if none is listening.
+
+    Args:
+        address: Unix socket path, or (host, port) for TCP
+        start_command: Command that starts a daemon on the address (don't start one if None)
+
+    Returns:
+        Connected socket
+
+    Raises:
+        PermissionError: If the daemon on the Unix socket runs as another user
+        OSError: If no daemon accepted the connection in time
+    """
+    try:
+        return _connect(address)
+    except PermissionError:
+        raise
+    except OSError:
+        if start_command is None:
+            raise
+
+    log_path = f"{address}.log" if isinstance(address, str) else os.devnull
+    with open(log_path, "ab") as log:
+        subprocess.Popen(
+            start_command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=log,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + DAEMON_START_TIMEOUT
+    while True:
+        try:
+            return _connect(address)
+        except PermissionError:
+            raise
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def relay_stdio(sock: socket.socket) -> None:
+    """Copy stdin to the daemon and the daemon's replies to stdout until either side closes."""
+    # Read stdin unbuffered: a thread blocked on the buffered reader would abort interpreter shutdown
+    stdin_fd = sys.stdin.fileno()
+    stdout = sys.stdout.buffer
+
+    def forward_stdin() -> None:
+        try:
+            while chunk := os.read(stdin_fd, RELAY_CHUNK_SIZE):
+                sock.sendall(chunk)
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    threading.Thread(target=forward_stdin, name="hx-requests-lsp-relay", daemon=True).start()
+    try:
+        while chunk := sock.recv(RELAY_CHUNK_SIZE):
+            stdout.write(chunk)
+            stdout.flush()
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+def _connect(address: str | tuple[str, int]) -> socket.socket:
+    if isinstance(address, tuple):
+        return socket.create_connection(address)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+        _check_daemon_owner(sock, address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _check_daemon_owner(sock: socket.socket, path: str) -> None:
+    """Make sure the daemon on the other end of a Unix socket runs as the current user."""
+    if hasattr(socket, "SO_PEERCRED"):
+        credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", credentials)
+    else:
+        uid = os.stat(path).st_uid
+    if uid != os.getuid():
+        raise PermissionError(
+            f"The daemon on {path} runs as another user (uid {uid}), not relaying to it"
+        )
+
+
+def _make_private_dir(path: str) -> None:
+    """Create a directory only the current user can access, or check an existing one is."""
+    try:
+        os.mkdir(path, SOCKET_DIR_MODE)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(
+            f"{path} must be a directory only you can access (mode 0700); remove it or pass --socket"
+        )
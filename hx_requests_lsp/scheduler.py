@@ -0,0 +1,117 @@
+"""Per-document scheduler that coalesces bursts of edits."""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class DebounceScheduler:
+    """Runs work for a document only once its edits have settled.
+
+    Each call to ``schedule`` replaces any work still pending for the same key,
+    so during fast typing only the latest version of a document is parsed and
+    diagnostics are published once. Callbacks run on the event loop.
+    """
+
+    def __init__(self, delay: float = 0.2):
+        """Initialize the scheduler.
+
+        Args:
+            delay: Seconds to wait after the last edit before running its work
+        """
+        self.delay = delay
+        self._pending: dict[str, tuple[asyncio.TimerHandle, Callable[..., Any], tuple]] = {}
+
+        self.scheduled_count = 0
+        self.coalesced_count = 0
+        self.executed_count = 0
+
+    def schedule(self, key: str, callback: Callable[..., Any], *args: Any) -> None:
+        """Schedule work for a key, dropping any work still pending for it.
+
+        Runs the callback immediately when the delay is zero or no event loop
+        is running.
+
+        Args:
+            key: Identifies the document (usually its URI)
+            callback: Function to call once the document has settled
+            *args: Arguments for the callback
+        """
+        self.scheduled_count += 1
+        if self.cancel(key):
+            self.coalesced_count += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if self.delay <= 0 or loop is None:
+            self._execute(callback, args)
+            return
+
+        handle = loop.call_later(self.delay, self._fire, key)
+        self._pending[key] = (handle, callback, args)
+
+    def cancel(self, key: str) -> bool:
+        """Drop the work pending for a key.
+
+        Returns:
+            True if there was pending work
+        """
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return False
+        pending[0].cancel()
+        return True
+
+    def cancel_all(self) -> None:
+        """Drop all pending work."""
+        for handle, _, _ in self._pending.values():
+            handle.cancel()
+        self._pending.clear()
+
+    def flush(self, key: str) -> bool:
+        """Run the work pending for a key right away.
+
+        Used before answering requests that need the index to reflect the
+        latest edits.
+
+        Returns:
+            True if there was pending work
+        """
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return False
+        handle, callback, args = pending
+        handle.cancel()
+        self._execute(callback, args)
+        return True
+
+    def has_pending(self, key: str) -> bool:
+        """Check whether work is pending for a key."""
+        return key in self._pending
+
+    def stats(self) -> dict[str, int]:
+        """Return counters describing how much work was coalesced."""
+        return {
+            "scheduled": self.scheduled_count,
+            "coalesced": self.coalesced_count,
+            "executed": self.executed_count,
+            "pending": len(self._pending),
+        }
+
+    def _fire(self, key: str) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            self._execute(pending[1], pending[2])
+
+    def _execute(self, callback: Callable[..., Any], args: tuple) -> None:
+        self.executed_count += 1
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception("Scheduled work failed")
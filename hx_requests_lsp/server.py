@@ -1,21 +1,59 @@
 """hx-requests Language Server implementation using pygls."""
 
+import asyncio
+import cProfile
+import functools
 import logging
 import re
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
 from importlib.metadata import version as get_version
 from pathlib import Path
+from typing import Any, TypeVar
 from urllib.parse import unquote, urlparse
 
 from lsprotocol import types as lsp
 from pygls.server import LanguageServer
 
-from hx_requests_lsp.index import HxRequestIndex
-from hx_requests_lsp.template_parser import get_hx_request_name_at_position
+from hx_requests_lsp import base_class_resolver
+from hx_requests_lsp.completion import CompletionItemCache
+from hx_requests_lsp.daemon import Daemon, SessionProtocol, SharedWorkspace
+from hx_requests_lsp.index import BUILD_INDEX, HxRequestIndex
+from hx_requests_lsp.metrics import Metrics, MetricsFileWriter, hit_rate, memory_usage
+from hx_requests_lsp.pipeline import ParsePipeline
+from hx_requests_lsp.profiling import Profiler
+from hx_requests_lsp.python_parser import HxRequestDefinition
+from hx_requests_lsp.scheduler import DebounceScheduler
+from hx_requests_lsp.settings import ServerSettings
+from hx_requests_lsp.store import open_store
+from hx_requests_lsp.template_parser import HxRequestUsage
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Command that returns the server's metrics (see HxRequestsLanguageServer.stats)
+STATS_COMMAND = "hxRequests.stats"
+
+# Command that writes a tracemalloc snapshot (needs --profile-dir and --trace-memory)
+MEMORY_SNAPSHOT_COMMAND = "hxRequests.memorySnapshot"
+
+# Seconds a request waits for a document's in-flight parse before answering anyway
+PENDING_PARSE_TIMEOUT = 2.0
+
+# Template files whose references are sent in each partial result of a references request
+REFERENCE_BATCH_FILES = 20
+
+# Most symbols a workspace symbol search returns; clients search again as the query gets longer
+WORKSPACE_SYMBOL_LIMIT = 100
+
+# Defined names suggested as quick fixes for each unknown hx_request
+SUGGESTION_LIMIT = 3
+
+# Code of the diagnostic reported for a usage of an undefined hx_request
+UNKNOWN_HX_REQUEST = "unknown-hx-request"
+
 # Get version from package metadata
 try:
     __version__ = get_version("hx-requests-lsp")
@@ -23,12 +61,300 @@ except Exception:
     __version__ = "0.0.0"  # Fallback for development
 
 
+T = TypeVar("T")
+
+# Profile of the request being handled, if it was sampled; collects its work on the worker pool
+_request_profile: ContextVar[cProfile.Profile | None] = ContextVar("request_profile", default=None)
+
+
+@dataclass(frozen=True)
+class DocumentSnapshot:
+    """Copy of a document's text taken on the event loop, safe to use from workers.
+
+    The text isn't split into lines; handlers that need one look it up.
+    """
+
+    source: str
+
+    def line(self, number: int) -> str:
+        """Get a 0-based line, with its line ending, or "" past the end of the text."""
+        source = self.source
+        start = 0
+        for _ in range(number):
+            start = source.find("\n", start) + 1
+            if not start:
+                return ""
+        return source[start : source.find("\n", start) + 1 or len(source)]
+
+
+def _timed(metrics: Metrics, name: str, handler: Callable) -> Callable:
+    """Wrap an LSP handler so its latency is recorded under the method name."""
+    if asyncio.iscoroutinefunction(handler):
+
+        @functools.wraps(handler)
+        async def timed_async(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - start)
+
+        return timed_async
+
+    @functools.wraps(handler)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            metrics.record(name, time.perf_counter() - start)
+
+    return timed
+
+
+def _profiled(ls: "HxRequestsLanguageServer", name: str, handler: Callable) -> Callable:
+    """Wrap an LSP handler so sampled calls are profiled when profiling is on.
+
+    Synchronous handlers are profiled as they run. Asynchronous handlers are
+    profiled while their work runs on the worker pool (see run_in_worker).
+    """
+    if asyncio.iscoroutinefunction(handler):
+
+        @functools.wraps(handler)
+        async def profiled_async(*args, **kwargs):
+            profile = ls.profiler.sample() if ls.profiler is not None else None
+            if profile is None:
+                return await handler(*args, **kwargs)
+            token = _request_profile.set(profile)
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                _request_profile.reset(token)
+                ls.profiler.dump(profile, name)
+
+        return profiled_async
+
+    @functools.wraps(handler)
+    def profiled(*args, **kwargs):
+        profile = ls.profiler.sample() if ls.profiler is not None else None
+        if profile is None:
+            return handler(*args, **kwargs)
+        try:
+            return ls.profiler.run(profile, functools.partial(handler, *args, **kwargs))
+        finally:
+            ls.profiler.dump(profile, name)
+
+    return profiled
+
+
 class HxRequestsLanguageServer(LanguageServer):
     """Language Server for hx-requests Django library."""
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.index = HxRequestIndex()
+        self.settings = ServerSettings()
+        self.scheduler = DebounceScheduler(self.settings.debounce_delay)
+        self.pipeline = ParsePipeline(self.index)
+        self.completion_cache = CompletionItemCache(self.index)
+        self._executor: ThreadPoolExecutor | None = None
+
+        # Maps URI -> (content hash, definitions epoch) of the last published diagnostics
+        self.published_diagnostics: dict[str, tuple[int, int]] = {}
+
+        # Paths of the documents the client has open
+        self.open_files: set[str] = set()
+
+        # (feature name, options, handler) of registered features, for daemon sessions
+        self.feature_handlers: list[tuple[str, Any, Callable]] = []
+
+        # (command name, handler) of registered commands, for daemon sessions
+        self.command_handlers: list[tuple[str, Callable]] = []
+
+        # Set on daemon sessions; clients of the same workspace root share its index
+        self.daemon: Daemon | None = None
+        self.shared: SharedWorkspace | None = None
+
+        # Latency of each LSP method's handler
+        self.metrics = Metrics()
+        self.metrics_writer: MetricsFileWriter | None = None
+        self.started_at = time.monotonic()
+
+        # Set by --profile-dir; profiles indexing and a sample of requests
+        self.profiler: Profiler | None = None
+
+    def feature(self, feature_name: str, options: Any | None = None) -> Callable:
+        """Register an LSP feature, remembering it so daemon sessions can register it too."""
+        register = super().feature(feature_name, options)
+
+        def decorator(f):
+            self.feature_handlers.append((feature_name, options, f))
+            register(_timed(self.metrics, feature_name, _profiled(self, feature_name, f)))
+            return f
+
+        return decorator
+
+    def command(self, command_name: str) -> Callable:
+        """Register a command, remembering it so daemon sessions can register it too."""
+        register = super().command(command_name)
+
+        def decorator(f):
+            self.command_handlers.append((command_name, f))
+            return register(f)
+
+        return decorator
+
+    def create_session(self, loop: asyncio.AbstractEventLoop) -> "HxRequestsLanguageServer":
+        """Create the server for one daemon client, with the same features as this one."""
+        session = type(self)(self.name, self.version, loop=loop, protocol_cls=SessionProtocol)
+        session.profiler = self.profiler
+        for feature_name, options, handler in self.feature_handlers:
+            session.feature(feature_name, options)(handler)
+        for command_name, handler in self.command_handlers:
+            session.command(command_name)(handler)
+        return session
+
+    def attach_workspace(self, root: str | None) -> None:
+        """Point the server at its workspace root, once settings are known.
+
+        Daemon sessions share the index of every other client with the same
+        root instead of building their own.
+        """
+        if self.daemon is None or root is None:
+            self.index.workspace_root = root
+            self.index.discovery = self.settings.discovery
+            if root is not None:
+                self.index.use_store(
+                    open_store(
+                        root,
+                        self.settings.index_store,
+                        self.settings.index_store_path,
+                        self.settings.usage_budget,
+                    )
+                )
+            # Parse document updates on the worker pool from now on
+            self.pipeline.executor = self.executor
+            return
+
+        self.shared = self.daemon.join(self, root, self.settings)
+        self.index = self.shared.index
+        self.pipeline = self.shared.pipeline
+        self.completion_cache = self.shared.completion_cache
+
+    async def build_index(self) -> None:
+        """Build the index of the workspace, or wait for a shared workspace's build."""
+        build = self.index.build_lazy_index if self.settings.lazy_index else self.index.build_full_index
+        if self.profiler is not None:
+            build = self.profiler.profiled(BUILD_INDEX, build)
+        if self.shared is not None:
+            await self.shared.build_index(build)
+        else:
+            await asyncio.wrap_future(self.executor.submit(build))
+        if self.profiler is not None:
+            self.profiler.take_snapshot("index-built")
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Bounded worker pool for parsing and index queries (created lazily)."""
+        if self.shared is not None:
+            return self.shared.executor
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.settings.worker_threads, thread_name_prefix="hx-requests-lsp"
+            )
+        return self._executor
+
+    async def run_in_worker(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a function on the worker pool without blocking the event loop.
+
+        If the request is cancelled by the client, work that hasn't started yet
+        is dropped from the pool. Work done for a request picked for profiling
+        is collected into its profile.
+        """
+        return await self.submit_to_worker(func, *args)
+
+    def submit_to_worker(self, func: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        """Submit a function to the worker pool right away, like run_in_worker, and return its future."""
+        profile = _request_profile.get()
+        if profile is not None and self.profiler is not None:
+            return asyncio.wrap_future(self.executor.submit(self.profiler.run, profile, func, *args))
+        return asyncio.wrap_future(self.executor.submit(func, *args))
+
+    def snapshot_document(self, uri: str) -> DocumentSnapshot:
+        """Take a snapshot of a document's text for use on a worker thread."""
+        doc = self.workspace.get_text_document(uri)
+        return DocumentSnapshot(source=doc.source)
+
+    async def wait_for_index(self, uri: str) -> None:
+        """Wait until the index reflects the latest edits to a document.
+
+        Runs any debounced re-index for the document right away and waits (up
+        to PENDING_PARSE_TIMEOUT) for its parse to be applied. With a lazy
+        index, also waits for the templates of the document's app.
+        """
+        self.scheduler.flush(uri)
+        file_path = self.uri_to_path(uri)
+        if self.index.has_pending_app(file_path):
+            await self.run_in_worker(self.index.index_app_of, file_path)
+        pending = self.pipeline.pending(file_path)
+        if pending is not None:
+            await asyncio.wait([asyncio.wrap_future(pending)], timeout=PENDING_PARSE_TIMEOUT)
+
+    def index_app_of(self, file_path: str) -> None:
+        """Start indexing the templates of a file's app, if a lazy index leaves them pending."""
+        if self.settings.lazy_index or self.index.has_pending_app(file_path):
+            self.executor.submit(self.index.index_app_of, file_path)
+
+    def start_metrics_file(self) -> None:
+        """Start appending stats to the metrics file, if one is configured."""
+        if self.settings.metrics_file and self.metrics_writer is None:
+            self.metrics_writer = MetricsFileWriter(
+                self.settings.metrics_file, self.stats, self.settings.metrics_interval
+            )
+            self.metrics_writer.start(self.loop)
+
+    def stop_metrics_file(self) -> None:
+        """Write a last line to the metrics file and stop appending to it."""
+        if self.metrics_writer is not None:
+            self.metrics_writer.stop()
+            self.metrics_writer = None
+
+    def stats(self) -> dict[str, Any]:
+        """Collect request latencies, parse timings, index gauges and cache hit rates."""
+        completion = self.completion_cache.stats()
+        resolver = base_class_resolver.cache_stats()
+        return {
+            "version": __version__,
+            "uptime_s": round(time.monotonic() - self.started_at, 3),
+            "requests": self.metrics.snapshot(),
+            "parsing": self.index.metrics.snapshot(),
+            "index": self.index.stats(),
+            "memory": memory_usage(),
+            "caches": {
+                "completion": {
+                    **completion,
+                    "hit_rate": hit_rate(completion["hits"], completion["misses"]),
+                },
+                **{
+                    f"resolver.{name}": {
+                        **counters,
+                        "hit_rate": hit_rate(counters["hits"], counters["misses"]),
+                    }
+                    for name, counters in resolver.items()
+                },
+            },
+            "scheduler": self.scheduler.stats(),
+            "pipeline": self.pipeline.stats(),
+        }
+
+    def shutdown(self):
+        """Shut down the worker pool along with the server."""
+        self.stop_metrics_file()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.shared is None:
+            self.index.close()
+        super().shutdown()
 
     def uri_to_path(self, uri: str) -> str:
         """Convert a URI to a file path."""
@@ -45,10 +371,15 @@ def initialize(ls: HxRequestsLanguageServer, params: lsp.InitializeParams):
     """Handle initialization request."""
     logger.info(f"Initializing hx-requests LSP with params: {params.root_uri}")
 
+    root = None
     if params.root_uri:
-        ls.index.workspace_root = ls.uri_to_path(params.root_uri)
+        root = ls.uri_to_path(params.root_uri)
     elif params.root_path:
-        ls.index.workspace_root = params.root_path
+        root = params.root_path
+
+    ls.settings = ServerSettings.from_initialization_options(params.initialization_options)
+    ls.scheduler.delay = ls.settings.debounce_delay
+    ls.attach_workspace(root)
 
     return lsp.InitializeResult(
         capabilities=lsp.ServerCapabilities(
@@ -64,6 +395,8 @@ def initialize(ls: HxRequestsLanguageServer, params: lsp.InitializeParams):
             definition_provider=True,
             references_provider=True,
             hover_provider=True,
+            workspace_symbol_provider=True,
+            code_action_provider=lsp.CodeActionOptions(code_action_kinds=[lsp.CodeActionKind.QuickFix]),
             diagnostic_provider=lsp.DiagnosticOptions(
                 inter_file_dependencies=True,
                 workspace_diagnostics=False,
@@ -77,128 +410,223 @@ def initialize(ls: HxRequestsLanguageServer, params: lsp.InitializeParams):
 
 
 @server.feature(lsp.INITIALIZED)
-def initialized(ls: HxRequestsLanguageServer, params: lsp.InitializedParams):
+async def initialized(ls: HxRequestsLanguageServer, params: lsp.InitializedParams):
     """Handle initialized notification - build the index."""
     logger.info("Server initialized, building index...")
-    ls.index.build_full_index()
+    ls.start_metrics_file()
+    await ls.build_index()
     logger.info(f"Index built with {len(ls.index.get_all_definition_names())} definitions")
 
 
 @server.feature(lsp.TEXT_DOCUMENT_DID_OPEN)
 def did_open(ls: HxRequestsLanguageServer, params: lsp.DidOpenTextDocumentParams):
     """Handle document open event."""
-    file_path = ls.uri_to_path(params.text_document.uri)
-    logger.debug(f"Document opened: {file_path}")
-
-    # Update index with the opened file
-    ls.index.update_file(file_path, params.text_document.text)
+    uri = params.text_document.uri
+    logger.debug("Document opened: %s", uri)
 
-    # Publish diagnostics for the opened file
-    _publish_diagnostics(ls, params.text_document.uri, params.text_document.text)
+    # A newly opened document starts a new version sequence
+    file_path = ls.uri_to_path(uri)
+    ls.scheduler.cancel(uri)
+    ls.pipeline.forget(file_path)
+    ls.open_files.add(file_path)
+    ls.index_app_of(file_path)
+    _reindex_document(ls, uri, params.text_document.text, params.text_document.version)
 
 
 @server.feature(lsp.TEXT_DOCUMENT_DID_CHANGE)
 def did_change(ls: HxRequestsLanguageServer, params: lsp.DidChangeTextDocumentParams):
-    """Handle document change event."""
-    file_path = ls.uri_to_path(params.text_document.uri)
-    content = params.content_changes[0].text if params.content_changes else ""
+    """Handle document change event.
 
-    # Update index with changed content
-    ls.index.update_file(file_path, content)
+    Re-indexing is debounced so that a burst of edits is parsed once.
+    """
+    uri = params.text_document.uri
+    content = params.content_changes[0].text if params.content_changes else ""
 
-    # Publish diagnostics
-    _publish_diagnostics(ls, params.text_document.uri, content)
+    ls.scheduler.schedule(uri, _reindex_document, ls, uri, content, params.text_document.version)
 
 
 @server.feature(lsp.TEXT_DOCUMENT_DID_SAVE)
 def did_save(ls: HxRequestsLanguageServer, params: lsp.DidSaveTextDocumentParams):
-    """Handle document save event."""
-    file_path = ls.uri_to_path(params.text_document.uri)
+    """Handle document save event.
 
-    # Update index from saved file
-    if params.text:
-        ls.index.update_file(file_path, params.text)
-    else:
-        ls.index.update_file(file_path)
+    The saved text of an open document is indexed as both its buffer's
+    content and what is on disk, with its diagnostics published.
+    """
+    uri = params.text_document.uri
+    file_path = ls.uri_to_path(uri)
+
+    # Saved content supersedes any edits still waiting to be indexed
+    ls.scheduler.cancel(uri)
+
+    if file_path not in ls.open_files:
+        # Update index from saved file (reads from disk if the client sent no text)
+        ls.pipeline.submit(file_path, params.text or None)
+        return
+
+    doc = ls.workspace.get_text_document(uri)
+    text = params.text if params.text is not None else doc.source
+    _reindex_document(ls, uri, text, doc.version, saved=True)
 
 
 @server.feature(lsp.TEXT_DOCUMENT_DID_CLOSE)
 def did_close(ls: HxRequestsLanguageServer, params: lsp.DidCloseTextDocumentParams):
-    """Handle document close event."""
-    # We keep the file in the index, just log it
-    logger.debug(f"Document closed: {params.text_document.uri}")
+    """Handle document close event.
+
+    Unsaved edits are discarded: the file reverts to what was indexed from disk.
+    """
+    uri = params.text_document.uri
+    file_path = ls.uri_to_path(uri)
+
+    # Drop edits still waiting to be indexed
+    ls.scheduler.cancel(uri)
+    ls.open_files.discard(file_path)
+    ls.published_diagnostics.pop(uri, None)
+    logger.debug("Document closed: %s", uri)
+
+    if ls.shared is not None and ls.shared.is_open_elsewhere(ls, file_path):
+        # Another daemon client still has the document open; keep its edits
+        return
+
+    # Drop any parse in flight and revert to the file on disk
+    ls.pipeline.forget(file_path)
+    ls.index.close_buffer(file_path)
+
+
+# Ask clients to report renames and deletes of any file or folder on disk
+FILE_OPERATION_OPTIONS = lsp.FileOperationRegistrationOptions(
+    filters=[lsp.FileOperationFilter(pattern=lsp.FileOperationPattern(glob="**/*"), scheme="file")]
+)
+
+
+@server.feature(lsp.WORKSPACE_DID_RENAME_FILES, FILE_OPERATION_OPTIONS)
+async def did_rename_files(ls: HxRequestsLanguageServer, params: lsp.RenameFilesParams):
+    """Move renamed files and folders in the index."""
+    for rename in params.files:
+        old_path = ls.uri_to_path(rename.old_uri)
+        new_path = ls.uri_to_path(rename.new_uri)
+        ls.scheduler.cancel(rename.old_uri)
+        ls.pipeline.forget(old_path)
+
+        # Both paths now refer to different files than the ones interned for them
+        ls.index.remove_file(old_path)
+        ls.index.remove_file(new_path)
+
+        if Path(new_path).is_dir():
+            # Whether files in the folder are templates depends on its ancestors, so rescan
+            await ls.run_in_worker(ls.index.build_full_index)
+        else:
+            ls.pipeline.submit(new_path)
+
+
+@server.feature(lsp.WORKSPACE_DID_DELETE_FILES, FILE_OPERATION_OPTIONS)
+def did_delete_files(ls: HxRequestsLanguageServer, params: lsp.DeleteFilesParams):
+    """Remove deleted files and folders from the index."""
+    for deleted in params.files:
+        file_path = ls.uri_to_path(deleted.uri)
+        ls.scheduler.cancel(deleted.uri)
+        ls.pipeline.forget(file_path)
+        ls.index.remove_file(file_path)
+
+
+@server.command(STATS_COMMAND)
+def stats_command(ls: HxRequestsLanguageServer, *args) -> dict[str, Any]:
+    """Report request latencies, parse timings, index size, memory and cache hit rates."""
+    return ls.stats()
+
+
+@server.command(MEMORY_SNAPSHOT_COMMAND)
+def memory_snapshot_command(ls: HxRequestsLanguageServer, *args) -> dict[str, Any]:
+    """Write a tracemalloc snapshot and report the biggest allocation sites."""
+    snapshot = ls.profiler.take_snapshot("command") if ls.profiler is not None else None
+    if snapshot is None:
+        raise RuntimeError(
+            "Memory snapshots need the server to run with --profile-dir and --trace-memory"
+        )
+    return snapshot
+
+
+def _reindex_document(
+    ls: HxRequestsLanguageServer, uri: str, content: str, version: int | None, saved: bool = False
+) -> None:
+    """Parse a document off the event loop and publish its diagnostics once indexed.
+
+    Results for versions that were superseded while parsing are discarded.
+    Content that is already indexed isn't parsed again; its diagnostics are
+    only published if they haven't been for that content yet.
+    """
+
+    def publish():
+        ls.loop.call_soon_threadsafe(_publish_diagnostics, ls, uri, content)
+
+    file_path = ls.uri_to_path(uri)
+    if ls.shared is not None and ls.shared.is_open_elsewhere(ls, file_path):
+        # Versions from different clients can't be compared; the latest edit wins
+        ls.index.forget_file_version(file_path)
+    ls.pipeline.submit(file_path, content, version, saved, on_applied=publish, on_unchanged=publish)
 
 
 @server.feature(lsp.TEXT_DOCUMENT_COMPLETION)
-def completions(ls: HxRequestsLanguageServer, params: lsp.CompletionParams) -> lsp.CompletionList | None:
+async def completions(
+    ls: HxRequestsLanguageServer, params: lsp.CompletionParams
+) -> lsp.CompletionList | None:
     """Provide completion items for hx_request names."""
+    doc = ls.snapshot_document(params.text_document.uri)
+    return await ls.run_in_worker(_completions, ls, params, doc)
+
+
+def _completions(
+    ls: HxRequestsLanguageServer, params: lsp.CompletionParams, doc: DocumentSnapshot
+) -> lsp.CompletionList | None:
     file_path = ls.uri_to_path(params.text_document.uri)
 
     # Only provide completions for HTML template files
-    if not file_path.endswith(".html"):
+    if not ls.index.is_template_file(file_path):
         return None
 
     # Get the current line content
-    doc = ls.workspace.get_text_document(params.text_document.uri)
-    line = doc.lines[params.position.line] if params.position.line < len(doc.lines) else ""
+    line = doc.line(params.position.line)
 
     # Check if we're in an hx_request context
     is_in_context, needs_quotes = _is_in_hx_request_context(line, params.position.character)
     if not is_in_context:
         return None
 
-    # Get definitions sorted by relevance (same app first, then alphabetical)
-    sorted_definitions = ls.index.get_definitions_sorted_by_relevance(file_path)
-
-    # Build completion items
-    items = []
-    for i, definition in enumerate(sorted_definitions):
-        doc_string = definition.docstring or ""
-        detail = f"Class: {definition.class_name}"
-        if definition.get_template:
-            detail += f"\nTemplate: {definition.get_template}"
-
-        insert_text = f'"{definition.name}"' if needs_quotes else definition.name
-
-        items.append(
-            lsp.CompletionItem(
-                label=definition.name,
-                kind=lsp.CompletionItemKind.Reference,
-                detail=detail,
-                documentation=lsp.MarkupContent(
-                    kind=lsp.MarkupKind.Markdown,
-                    value=f"**{definition.class_name}**\n\n"
-                    f"File: `{Path(definition.file_path).name}`\n\n"
-                    f"Bases: {', '.join(definition.base_classes)}\n\n"
-                    f"{doc_string}",
-                ),
-                insert_text=insert_text,
-                sort_text=f"{i:04d}",
-            )
-        )
+    # Items are prebuilt per definition; documentation is filled in on resolve
+    items = ls.completion_cache.get_items(file_path, needs_quotes)
 
     return lsp.CompletionList(is_incomplete=False, items=items)
 
 
+@server.feature(lsp.COMPLETION_ITEM_RESOLVE)
+def completion_item_resolve(
+    ls: HxRequestsLanguageServer, item: lsp.CompletionItem
+) -> lsp.CompletionItem:
+    """Fill in the detail and documentation of the highlighted completion item."""
+    return ls.completion_cache.resolve(item)
+
+
 @server.feature(lsp.TEXT_DOCUMENT_DEFINITION)
-def definition(
+async def definition(
     ls: HxRequestsLanguageServer, params: lsp.DefinitionParams
 ) -> lsp.Location | list[lsp.Location] | None:
     """Provide go-to-definition for hx_request names."""
-    file_path = ls.uri_to_path(params.text_document.uri)
+    doc = ls.snapshot_document(params.text_document.uri)
+    await ls.wait_for_index(params.text_document.uri)
+    return await ls.run_in_worker(_definition, ls, params, doc)
 
-    # Get the word at the cursor position
-    doc = ls.workspace.get_text_document(params.text_document.uri)
-    line = doc.lines[params.position.line] if params.position.line < len(doc.lines) else ""
+
+def _definition(
+    ls: HxRequestsLanguageServer, params: lsp.DefinitionParams, doc: DocumentSnapshot
+) -> lsp.Location | list[lsp.Location] | None:
+    file_path = ls.uri_to_path(params.text_document.uri)
 
     # For template files, look for hx_request name at position
-    if file_path.endswith(".html"):
-        result = get_hx_request_name_at_position(
-            doc.source, params.position.line + 1, params.position.character
+    if ls.index.is_template_file(file_path):
+        usage = ls.index.get_usage_at_position(
+            file_path, params.position.line + 1, params.position.character
         )
-        if result:
-            name, _, _ = result
-            hx_def = ls.index.get_definition(name)
+        if usage:
+            hx_def = ls.index.get_definition(usage.name)
             if hx_def:
                 return lsp.Location(
                     uri=f"file://{hx_def.file_path}",
@@ -210,7 +638,7 @@ def definition(
 
     # For Python files, check if cursor is on a name = "..." attribute
     elif file_path.endswith(".py"):
-        name = _get_hx_name_from_python_line(line, params.position.character)
+        name = _get_hx_name_from_python_line(doc.line(params.position.line), params.position.character)
         if name:
             hx_def = ls.index.get_definition(name)
             if hx_def:
@@ -226,93 +654,220 @@ def definition(
 
 
 @server.feature(lsp.TEXT_DOCUMENT_REFERENCES)
-def references(ls: HxRequestsLanguageServer, params: lsp.ReferenceParams) -> list[lsp.Location] | None:
-    """Find all references to an hx_request."""
+async def references(
+    ls: HxRequestsLanguageServer, params: lsp.ReferenceParams
+) -> list[lsp.Location] | None:
+    """Find all references to an hx_request.
+
+    If the client passes a partial result token, locations are streamed in
+    batches of template files, starting with the current app's templates,
+    and the response itself is empty.
+    """
+    doc = ls.snapshot_document(params.text_document.uri)
+    await ls.wait_for_index(params.text_document.uri)
+    if params.partial_result_token is None and params.work_done_token is None:
+        return await ls.run_in_worker(_references, ls, params, doc)
+
+    name = await ls.run_in_worker(_reference_name, ls, params, doc)
+    if not name:
+        return None
     file_path = ls.uri_to_path(params.text_document.uri)
-    doc = ls.workspace.get_text_document(params.text_document.uri)
-    line = doc.lines[params.position.line] if params.position.line < len(doc.lines) else ""
+    files = await ls.run_in_worker(_files_by_relevance, ls, name, file_path)
+    batches = [files[i : i + REFERENCE_BATCH_FILES] for i in range(0, len(files), REFERENCE_BATCH_FILES)]
+
+    partial_token = params.partial_result_token
+    work_done_token = params.work_done_token
+    if work_done_token is not None:
+        ls.progress.begin(
+            work_done_token,
+            lsp.WorkDoneProgressBegin(title="Finding references", message=name, percentage=0),
+        )
 
-    name = None
+    locations = []
+    if params.context.include_declaration:
+        locations.extend(_definition_locations(ls, name))
+    lookup = ls.submit_to_worker(_reference_locations, ls, name, batches[0]) if batches else None
+    for done in range(1, len(batches) + 1):
+        locations.extend(await lookup)
+        if done < len(batches):
+            # Look up the next batch on the pool while this one is sent
+            lookup = ls.submit_to_worker(_reference_locations, ls, name, batches[done])
+        if partial_token is not None and locations:
+            ls.send_notification(lsp.PROGRESS, lsp.ProgressParams(token=partial_token, value=locations))
+            locations = []
+        if work_done_token is not None:
+            ls.progress.report(
+                work_done_token,
+                lsp.WorkDoneProgressReport(
+                    message=f"{done}/{len(batches)} batches", percentage=done * 100 // len(batches)
+                ),
+            )
+    if partial_token is not None and locations:
+        # Only the declaration, as no template uses the name
+        ls.send_notification(lsp.PROGRESS, lsp.ProgressParams(token=partial_token, value=locations))
+        locations = []
+
+    if work_done_token is not None:
+        ls.progress.end(work_done_token, lsp.WorkDoneProgressEnd())
+    if partial_token is not None:
+        # Everything was sent as partial results; the response must not repeat it
+        return []
+    return locations if locations else None
+
+
+def _references(
+    ls: HxRequestsLanguageServer, params: lsp.ReferenceParams, doc: DocumentSnapshot
+) -> list[lsp.Location] | None:
+    name = _reference_name(ls, params, doc)
+    if not name:
+        return None
+
+    locations = _usage_locations(ls.index.get_usages(name))
+
+    # Include definition if requested
+    if params.context.include_declaration:
+        locations[:0] = _definition_locations(ls, name)
+
+    return locations if locations else None
+
+
+def _reference_name(
+    ls: HxRequestsLanguageServer, params: lsp.ReferenceParams, doc: DocumentSnapshot
+) -> str | None:
+    """Find the name of the hx_request whose references are asked for."""
+    file_path = ls.uri_to_path(params.text_document.uri)
 
     # For template files, get name at cursor
-    if file_path.endswith(".html"):
-        result = get_hx_request_name_at_position(
-            doc.source, params.position.line + 1, params.position.character
+    if ls.index.is_template_file(file_path):
+        usage = ls.index.get_usage_at_position(
+            file_path, params.position.line + 1, params.position.character
         )
-        if result:
-            name = result[0]
+        return usage.name if usage else None
 
     # For Python files, try to get name from line
-    elif file_path.endswith(".py"):
-        name = _get_hx_name_from_python_line(line, params.position.character)
-        if not name:
-            # Also check if we're on the class definition line
-            definitions = ls.index.get_definitions_in_file(file_path)
-            for hx_def in definitions:
-                if hx_def.line_number == params.position.line + 1:
-                    name = hx_def.name
-                    break
+    if file_path.endswith(".py"):
+        name = _get_hx_name_from_python_line(doc.line(params.position.line), params.position.character)
+        if name:
+            return name
+        # Also check if we're on the class definition line
+        for hx_def in ls.index.get_definitions_in_file(file_path):
+            if hx_def.line_number == params.position.line + 1:
+                return hx_def.name
+
+    return None
+
+
+def _files_by_relevance(ls: HxRequestsLanguageServer, name: str, current_file: str) -> list[str]:
+    """Get the templates using a name: the current file, then its app's templates, then the rest."""
+    app = ls.index.get_app_name(current_file)
+    files = ls.index.get_files_using(name)
+    return sorted(files, key=lambda path: (path != current_file, ls.index.get_app_name(path) != app))
+
+
+def _reference_locations(
+    ls: HxRequestsLanguageServer, name: str, files: list[str]
+) -> list[lsp.Location]:
+    """Get the locations of a name's usages in some template files."""
+    locations = []
+    for file_path in files:
+        locations.extend(
+            _usage_locations(u for u in ls.index.get_usages_in_file(file_path) if u.name == name)
+        )
+    return locations
 
-    if not name:
-        return None
 
-    # Find all usages
+def _usage_locations(usages: Iterable[HxRequestUsage]) -> list[lsp.Location]:
+    """Convert usages to locations; usages of the same file share one URI string."""
     locations = []
-    usages = ls.index.get_usages(name)
+    uri = file_path = None
     for usage in usages:
+        if usage.file_path != file_path:
+            file_path = usage.file_path
+            uri = f"file://{file_path}"
         locations.append(
             lsp.Location(
-                uri=f"file://{usage.file_path}",
+                uri=uri,
                 range=lsp.Range(
                     start=lsp.Position(line=usage.line_number - 1, character=usage.column),
                     end=lsp.Position(line=usage.line_number - 1, character=usage.end_column),
                 ),
             )
         )
+    return locations
 
-    # Include definition if requested
-    if params.context.include_declaration:
-        hx_def = ls.index.get_definition(name)
-        if hx_def:
-            locations.insert(
-                0,
-                lsp.Location(
-                    uri=f"file://{hx_def.file_path}",
-                    range=lsp.Range(
-                        start=lsp.Position(line=hx_def.line_number - 1, character=0),
-                        end=lsp.Position(line=hx_def.end_line_number - 1, character=0),
-                    ),
-                ),
-            )
 
-    return locations if locations else None
+def _definition_locations(ls: HxRequestsLanguageServer, name: str) -> list[lsp.Location]:
+    """Get the location of a name's definition, if it is defined."""
+    hx_def = ls.index.get_definition(name)
+    return [_definition_location(hx_def)] if hx_def else []
+
+
+def _definition_location(hx_def: HxRequestDefinition) -> lsp.Location:
+    """Get the location of a definition's class, from its first line to its last."""
+    return lsp.Location(
+        uri=f"file://{hx_def.file_path}",
+        range=lsp.Range(
+            start=lsp.Position(line=hx_def.line_number - 1, character=0),
+            end=lsp.Position(line=hx_def.end_line_number - 1, character=0),
+        ),
+    )
+
+
+@server.feature(lsp.WORKSPACE_SYMBOL)
+async def workspace_symbol(
+    ls: HxRequestsLanguageServer, params: lsp.WorkspaceSymbolParams
+) -> list[lsp.WorkspaceSymbol]:
+    """Find hx_requests by name or class name from anywhere in the workspace."""
+    return await ls.run_in_worker(_workspace_symbols, ls, params.query)
+
+
+def _workspace_symbols(ls: HxRequestsLanguageServer, query: str) -> list[lsp.WorkspaceSymbol]:
+    definitions, is_incomplete = ls.index.search_definitions(query, WORKSPACE_SYMBOL_LIMIT)
+    if is_incomplete:
+        # The response can't say so; the client asks again as the query is refined
+        logger.debug("Workspace symbols for %r capped at %d", query, WORKSPACE_SYMBOL_LIMIT)
+    return [
+        lsp.WorkspaceSymbol(
+            name=hx_def.name,
+            kind=lsp.SymbolKind.Class,
+            container_name=hx_def.class_name,
+            location=_definition_location(hx_def),
+        )
+        for hx_def in definitions
+    ]
 
 
 @server.feature(lsp.TEXT_DOCUMENT_HOVER)
-def hover(ls: HxRequestsLanguageServer, params: lsp.HoverParams) -> lsp.Hover | None:
+async def hover(ls: HxRequestsLanguageServer, params: lsp.HoverParams) -> lsp.Hover | None:
     """Provide hover information for hx_request names."""
+    doc = ls.snapshot_document(params.text_document.uri)
+    await ls.wait_for_index(params.text_document.uri)
+    return await ls.run_in_worker(_hover, ls, params, doc)
+
+
+def _hover(
+    ls: HxRequestsLanguageServer, params: lsp.HoverParams, doc: DocumentSnapshot
+) -> lsp.Hover | None:
     file_path = ls.uri_to_path(params.text_document.uri)
-    doc = ls.workspace.get_text_document(params.text_document.uri)
-    line = doc.lines[params.position.line] if params.position.line < len(doc.lines) else ""
 
     name = None
     hover_range = None
 
     # For template files
-    if file_path.endswith(".html"):
-        result = get_hx_request_name_at_position(
-            doc.source, params.position.line + 1, params.position.character
+    if ls.index.is_template_file(file_path):
+        usage = ls.index.get_usage_at_position(
+            file_path, params.position.line + 1, params.position.character
         )
-        if result:
-            name, start_col, end_col = result
+        if usage:
+            name = usage.name
             hover_range = lsp.Range(
-                start=lsp.Position(line=params.position.line, character=start_col),
-                end=lsp.Position(line=params.position.line, character=end_col),
+                start=lsp.Position(line=params.position.line, character=usage.column),
+                end=lsp.Position(line=params.position.line, character=usage.end_column),
             )
 
     # For Python files
     elif file_path.endswith(".py"):
-        name = _get_hx_name_from_python_line(line, params.position.character)
+        name = _get_hx_name_from_python_line(doc.line(params.position.line), params.position.character)
 
     if not name:
         return None
@@ -328,8 +883,8 @@ def hover(ls: HxRequestsLanguageServer, params: lsp.HoverParams) -> lsp.Hover |
         )
 
     # Build hover content
-    usages = ls.index.get_usages(name)
-    usage_count = len(usages)
+    # Only the count is shown, so compacted templates aren't re-scanned for positions
+    usage_count = ls.index.count_usages(name)
 
     base_classes_display = _format_base_classes_with_links(hx_def.base_class_info)
 
@@ -356,14 +911,17 @@ def hover(ls: HxRequestsLanguageServer, params: lsp.HoverParams) -> lsp.Hover |
 
 
 @server.feature(lsp.TEXT_DOCUMENT_DIAGNOSTIC)
-def diagnostics(
+async def diagnostics(
     ls: HxRequestsLanguageServer, params: lsp.DocumentDiagnosticParams
 ) -> lsp.DocumentDiagnosticReport:
     """Provide diagnostics for undefined hx_request usages."""
     file_path = ls.uri_to_path(params.text_document.uri)
-    doc = ls.workspace.get_text_document(params.text_document.uri)
+    doc = ls.snapshot_document(params.text_document.uri)
 
-    items = _compute_diagnostics(ls, file_path, doc.source)
+    # Make sure the index reflects the latest edits before reporting on them
+    await ls.wait_for_index(params.text_document.uri)
+
+    items = await ls.run_in_worker(_compute_diagnostics, ls, file_path, doc.source)
 
     return lsp.RelatedFullDocumentDiagnosticReport(
         kind=lsp.DocumentDiagnosticReportKind.Full,
@@ -371,8 +929,59 @@ def diagnostics(
     )
 
 
+@server.feature(
+    lsp.TEXT_DOCUMENT_CODE_ACTION,
+    lsp.CodeActionOptions(code_action_kinds=[lsp.CodeActionKind.QuickFix]),
+)
+async def code_action(
+    ls: HxRequestsLanguageServer, params: lsp.CodeActionParams
+) -> list[lsp.CodeAction] | None:
+    """Offer to replace unknown hx_request names with the closest defined names."""
+    unknown = [d for d in params.context.diagnostics if d.code == UNKNOWN_HX_REQUEST]
+    if not unknown:
+        return None
+    doc = ls.snapshot_document(params.text_document.uri)
+    return await ls.run_in_worker(_code_actions, ls, params.text_document.uri, unknown, doc)
+
+
+def _code_actions(
+    ls: HxRequestsLanguageServer, uri: str, diagnostics: list[lsp.Diagnostic], doc: DocumentSnapshot
+) -> list[lsp.CodeAction]:
+    actions = []
+    for diagnostic in diagnostics:
+        start, end = diagnostic.range.start, diagnostic.range.end
+        if start.line != end.line:
+            continue
+        # The diagnostic covers the name itself
+        name = doc.line(start.line)[start.character : end.character]
+        if not name or ls.index.get_definition(name):
+            continue
+        for i, suggestion in enumerate(ls.index.suggest_names(name, SUGGESTION_LIMIT)):
+            actions.append(
+                lsp.CodeAction(
+                    title=f"Change to '{suggestion}'",
+                    kind=lsp.CodeActionKind.QuickFix,
+                    diagnostics=[diagnostic],
+                    is_preferred=i == 0,
+                    edit=lsp.WorkspaceEdit(
+                        changes={uri: [lsp.TextEdit(range=diagnostic.range, new_text=suggestion)]}
+                    ),
+                )
+            )
+    return actions
+
+
 def _publish_diagnostics(ls: HxRequestsLanguageServer, uri: str, content: str):
-    """Publish diagnostics for a document."""
+    """Publish diagnostics for a document.
+
+    Skipped if neither the content nor any definition changed since the
+    diagnostics were last published for the document.
+    """
+    key = (hash(content), ls.index.definitions_epoch)
+    if ls.published_diagnostics.get(uri) == key:
+        return
+    ls.published_diagnostics[uri] = key
+
     file_path = ls.uri_to_path(uri)
     items = _compute_diagnostics(ls, file_path, content)
     ls.publish_diagnostics(uri, items)
@@ -385,7 +994,7 @@ def _compute_diagnostics(
     diagnostics = []
 
     # Only check template files for now
-    if not file_path.endswith(".html"):
+    if not ls.index.is_template_file(file_path):
         return diagnostics
 
     usages = ls.index.get_usages_in_file(file_path)
@@ -403,7 +1012,7 @@ def _compute_diagnostics(
                     message=f"Unknown hx_request: '{usage.name}'",
                     severity=lsp.DiagnosticSeverity.Warning,
                     source="hx-requests-lsp",
-                    code="unknown-hx-request",
+                    code=UNKNOWN_HX_REQUEST,
                 )
             )
 
@@ -499,21 +1108,10 @@ def _get_hx_name_from_python_line(line: str, column: int) -> str | None:
 
 
 def main():
-    """Run the language server."""
-    import argparse
-
-    parser = argparse.ArgumentParser(description="hx-requests Language Server")
-    parser.add_argument("--stdio", action="store_true", help="Use stdio transport")
-    parser.add_argument("--tcp", action="store_true", help="Use TCP transport")
-    parser.add_argument("--host", default="127.0.0.1", help="TCP host")
-    parser.add_argument("--port", type=int, default=2087, help="TCP port")
-
-    args = parser.parse_args()
+    """Run the language server; see hx_requests_lsp.cli for the command line."""
+    from hx_requests_lsp import cli
 
-    if args.tcp:
-        server.start_tcp(args.host, args.port)
-    else:
-        server.start_io()
+    cli.main()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+"""Server settings read from the client's initializationOptions."""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from hx_requests_lsp.discovery import DiscoveryOptions
+from hx_requests_lsp.store import DEFAULT_USAGE_BUDGET
+
+# Backends the index can keep usages in
+INDEX_STORES = ("memory", "compact", "sqlite")
+
+
+@dataclass
+class ServerSettings:
+    """Options that tune the language server's behaviour.
+
+    Clients pass these as camelCase keys in ``initializationOptions``, e.g.
+    ``{"debounceMs": 300}``.
+    """
+
+    debounce_delay: float = 0.2  # Seconds to wait for edits to settle before re-indexing
+    worker_threads: int = 4  # Size of the worker pool for parsing and index queries
+    # Which directories, template roots and extensions the workspace walk covers
+    discovery: DiscoveryOptions = field(default_factory=DiscoveryOptions)
+    index_store: str = "memory"  # Where the index keeps usages: "memory", "compact" or "sqlite"
+    index_store_path: str | None = None  # SQLite database file (under the user's cache dir if None)
+    usage_budget: int = DEFAULT_USAGE_BUDGET  # Usages the "compact" store keeps in full
+    lazy_index: bool = False  # Index an app's templates only once a file of the app is opened
+    metrics_file: str | None = None  # File to append a JSON line of server stats to periodically
+    metrics_interval: float = 60.0  # Seconds between lines of the metrics file
+
+    @classmethod
+    def from_initialization_options(cls, options: Any) -> "ServerSettings":
+        """Build settings from the initializationOptions sent by the client.
+
+        Unknown keys and values of the wrong type are ignored.
+
+        Args:
+            options: The raw initializationOptions value (usually a dict or None)
+
+        Returns:
+            Settings with defaults for anything not provided
+        """
+        settings = cls()
+        if not isinstance(options, dict):
+            return settings
+
+        debounce_ms = options.get("debounceMs")
+        if isinstance(debounce_ms, int | float) and debounce_ms >= 0:
+            settings.debounce_delay = debounce_ms / 1000
+
+        worker_threads = options.get("workerThreads")
+        if isinstance(worker_threads, int) and worker_threads > 0:
+            settings.worker_threads = worker_threads
+
+        exclude_dirs = _string_list(options.get("excludeDirs"))
+        if exclude_dirs:
+            settings.discovery.excluded_dirs = settings.discovery.excluded_dirs | set(exclude_dirs)
+
+        template_dirs = _string_list(options.get("templateDirs"))
+        if template_dirs:
+            settings.discovery.template_dirs = template_dirs
+
+        template_extensions = _string_list(options.get("templateExtensions"))
+        if template_extensions:
+            extensions = (ext if ext.startswith(".") else f".{ext}" for ext in template_extensions)
+            settings.discovery.template_extensions = tuple(dict.fromkeys([".html", *extensions]))
+
+        use_gitignore = options.get("useGitignore")
+        if isinstance(use_gitignore, bool):
+            settings.discovery.use_gitignore = use_gitignore
+
+        index_store = options.get("indexStore")
+        if index_store in INDEX_STORES:
+            settings.index_store = index_store
+
+        index_store_path = options.get("indexStorePath")
+        if isinstance(index_store_path, str) and index_store_path:
+            settings.index_store_path = index_store_path
+
+        usage_budget = options.get("usageBudget")
+        if isinstance(usage_budget, int) and usage_budget >= 0:
+            settings.usage_budget = usage_budget
+
+        lazy_index = options.get("lazyIndex")
+        if isinstance(lazy_index, bool):
+            settings.lazy_index = lazy_index
+
+        metrics_file = options.get("metricsFile")
+        if isinstance(metrics_file, str) and metrics_file:
+            settings.metrics_file = metrics_file
+
+        metrics_interval = options.get("metricsIntervalSeconds")
+        if isinstance(metrics_interval, int | float) and metrics_interval > 0:
+            settings.metrics_interval = metrics_interval
+
+        return settings
+
+
+def _string_list(value: Any) -> list[str]:
+    """Return the non-empty strings in a list option, or [] if it isn't a list."""
+    if not isinstance(value, list):
+        return []
+    return [item for item in value if isinstance(item, str) and item]
@@ -0,0 +1,833 @@
+"""Storage backends for the usages and file fingerprints held by the index."""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from collections import Counter, OrderedDict
+from collections.abc import Container, Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from hx_requests_lsp.python_parser import BaseClassInfo, HxRequestDefinition
+from hx_requests_lsp.template_parser import HxRequestUsage, parse_template_for_hx_requests
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the schema or the meaning of stored records changes
+SCHEMA_VERSION = 2
+
+# Template files whose usages the SQLite store keeps in memory after a lookup
+HOT_FILE_CACHE_SIZE = 256
+
+# Usages the compact store keeps in full by default, across the files looked up most recently
+DEFAULT_USAGE_BUDGET = 20_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash INTEGER,
+    is_python INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS definitions (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS definitions_by_path ON definitions (path);
+CREATE INDEX IF NOT EXISTS definitions_by_name ON definitions (name);
+CREATE TABLE IF NOT EXISTS usages (
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL,
+    end_col INTEGER NOT NULL,
+    tag_type TEXT NOT NULL,
+    full_match TEXT NOT NULL,
+    is_variable INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS usages_by_path ON usages (path, line, col);
+CREATE INDEX IF NOT EXISTS usages_by_name ON usages (name);
+"""
+
+_USAGE_COLUMNS = "path, name, line, col, end_col, tag_type, full_match, is_variable"
+
+
+class MemoryUsageStore:
+    """Keeps the usages of every template file in memory.
+
+    The index calls every method while holding its lock. Usages are passed in
+    and returned sorted by position within their file.
+    """
+
+    backend = "memory"
+    persistent = False
+
+    def __init__(self):
+        # Maps file ID -> usages in that file, in document order
+        self._by_file: dict[int, list[HxRequestUsage]] = {}
+
+        # Maps file ID -> (line, column) of each usage in that file, parallel to _by_file,
+        # for bisecting to the usage at a cursor position
+        self._positions: dict[int, list[tuple[int, int]]] = {}
+
+        # Maps hx_request name -> usages
+        self._by_name: dict[str, list[HxRequestUsage]] = {}
+
+    def clear(self) -> None:
+        """Forget all usages."""
+        self._by_file.clear()
+        self._positions.clear()
+        self._by_name.clear()
+
+    def set_usages(
+        self, file_id: int, file_path: str, usages: list[HxRequestUsage], pinned: bool = False
+    ) -> None:
+        """Replace the usages of a template file.
+
+        Args:
+            file_id: ID of the file
+            file_path: Canonical path of the file
+            usages: Usages sorted by position
+            pinned: Whether the usages come from an open buffer rather than disk
+        """
+        self.remove(file_id, file_path)
+        self._by_file[file_id] = usages
+        self._positions[file_id] = [(u.line_number, u.column) for u in usages]
+        for usage in usages:
+            self._by_name.setdefault(usage.name, []).append(usage)
+
+    def remove(self, file_id: int, file_path: str) -> None:
+        """Forget the usages of a file."""
+        old = self._by_file.pop(file_id, None)
+        self._positions.pop(file_id, None)
+        for name in {u.name for u in old or ()}:
+            remaining = [u for u in self._by_name.get(name, ()) if u.file_path != file_path]
+            if remaining:
+                self._by_name[name] = remaining
+            else:
+                self._by_name.pop(name, None)
+
+    def get_file(self, file_id: int) -> list[HxRequestUsage] | None:
+        """Get the usages of a file, or None if it isn't stored."""
+        return self._by_file.get(file_id)
+
+    def get_positions(self, file_id: int) -> list[tuple[int, int]] | None:
+        """Get the (line, column) of each usage of a file, or None if it isn't stored."""
+        return self._positions.get(file_id)
+
+    def path_of(self, file_id: int) -> str | None:
+        """Get the path the usages of a file were stored with."""
+        usages = self._by_file.get(file_id)
+        return usages[0].file_path if usages else None
+
+    def get_by_name(self, name: str) -> list[HxRequestUsage]:
+        """Get all usages of a name."""
+        return list(self._by_name.get(name, ()))
+
+    def count_by_name(self, name: str) -> int:
+        """Count the usages of a name."""
+        return len(self._by_name.get(name, ()))
+
+    def files_using(self, name: str) -> list[str]:
+        """Get the paths of the files using a name."""
+        return list(dict.fromkeys(u.file_path for u in self._by_name.get(name, ())))
+
+    def used_names(self) -> set[str]:
+        """Get every name with at least one usage."""
+        return set(self._by_name)
+
+    def get_undefined(self, defined: Container[str]) -> list[HxRequestUsage]:
+        """Get all usages of names that aren't in ``defined``."""
+        undefined = []
+        for name, usages in self._by_name.items():
+            if name not in defined:
+                undefined.extend(usages)
+        return undefined
+
+    def count(self) -> int:
+        """Count all usages."""
+        return sum(len(usages) for usages in self._by_name.values())
+
+    def stats(self) -> dict[str, int]:
+        """Return gauges specific to the store."""
+        return {}
+
+    # Persistence hooks; nothing outlives the process in memory
+
+    def save_file(
+        self,
+        file_id: int,
+        file_path: str,
+        content_hash: int | None,
+        definitions: list[HxRequestDefinition] | None,
+    ) -> None:
+        """Record a file indexed from disk; definitions are None for templates."""
+
+    def load_unchanged(
+        self, file_paths: Iterable[str]
+    ) -> dict[str, tuple[int | None, list[HxRequestDefinition] | None]]:
+        """Get the stored entries of files that haven't changed on disk since they were saved."""
+        return {}
+
+    def adopt(self, file_id: int, file_path: str) -> None:
+        """Take on a template file whose usages were stored by an earlier run."""
+
+    def prune(self, file_paths: Container[str]) -> None:
+        """Drop stored files that aren't in ``file_paths``."""
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group writes into a single transaction."""
+        yield
+
+    def close(self) -> None:
+        """Release resources held by the store."""
+
+
+class SqliteIndexStore(MemoryUsageStore):
+    """Keeps usages, definitions and file fingerprints in a SQLite database.
+
+    Usages of files indexed from disk live only in the database, which is
+    indexed on name and path; the usages of recently looked-up files are
+    cached, up to HOT_FILE_CACHE_SIZE files, and open buffers are held in
+    memory. Files are fingerprinted by modification time and size, so a
+    restart only parses files that changed since they were stored.
+
+    The database runs in WAL mode, so several servers can share it.
+    """
+
+    backend = "sqlite"
+    persistent = True
+
+    def __init__(self, db_path: str | Path):
+        """Open (or create) the database.
+
+        Args:
+            db_path: Path of the database file
+        """
+        super().__init__()
+        self.db_path = str(db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        # The index serializes access from its worker threads with its lock
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._batch_depth = 0
+        self._create_schema()
+
+        # Maps file ID -> path of template files whose usages are in the database
+        self._stored_paths: dict[int, str] = {}
+
+        # Maps file ID -> usages of an open buffer, which override the database
+        self._pinned: dict[int, list[HxRequestUsage]] = {}
+
+        # Maps file ID -> (line, column) of each usage of an open buffer, parallel to _pinned
+        self._pinned_positions: dict[int, list[tuple[int, int]]] = {}
+
+        # LRU cache of file ID -> (usages, positions) read from the database
+        self._hot: OrderedDict[int, tuple[list[HxRequestUsage], list[tuple[int, int]]]] = OrderedDict()
+
+    def _create_schema(self) -> None:
+        self._db.executescript(_SCHEMA)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is not None and row[0] == str(SCHEMA_VERSION):
+            return
+        if row is not None:
+            logger.info(f"Index store {self.db_path} has an old schema, starting afresh")
+        with self._transaction():
+            for table in ("files", "definitions", "usages"):
+                self._db.execute(f"DELETE FROM {table}")
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(SCHEMA_VERSION),),
+            )
+
+    def clear(self) -> None:
+        """Forget the usages held in memory; the database is reconciled by the next build."""
+        self._stored_paths.clear()
+        self._pinned.clear()
+        self._pinned_positions.clear()
+        self._hot.clear()
+
+    def set_usages(
+        self, file_id: int, file_path: str, usages: list[HxRequestUsage], pinned: bool = False
+    ) -> None:
+        """Replace the usages of a template file.
+
+        Usages of open buffers are held in memory and shadow the file's
+        stored usages; usages from disk replace the stored ones.
+        """
+        if pinned:
+            self._pinned[file_id] = usages
+            self._pinned_positions[file_id] = [(u.line_number, u.column) for u in usages]
+            self._hot.pop(file_id, None)
+            return
+
+        self._pinned.pop(file_id, None)
+        self._pinned_positions.pop(file_id, None)
+        with self._transaction():
+            self._db.execute("DELETE FROM usages WHERE path = ?", (file_path,))
+            self._db.executemany(
+                f"INSERT INTO usages ({_USAGE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [_usage_row(u) for u in usages],
+            )
+        self._stored_paths[file_id] = file_path
+        self._cache(file_id, usages)
+
+    def remove(self, file_id: int, file_path: str) -> None:
+        """Forget a file, deleting everything stored for it."""
+        self._pinned.pop(file_id, None)
+        self._pinned_positions.pop(file_id, None)
+        self._hot.pop(file_id, None)
+        self._stored_paths.pop(file_id, None)
+        with self._transaction():
+            for table in ("usages", "definitions", "files"):
+                self._db.execute(f"DELETE FROM {table} WHERE path = ?", (file_path,))
+
+    def get_file(self, file_id: int) -> list[HxRequestUsage] | None:
+        """Get the usages of a file, reading them from the database if they aren't cached."""
+        entry = self._get_entry(file_id)
+        return entry[0] if entry is not None else None
+
+    def get_positions(self, file_id: int) -> list[tuple[int, int]] | None:
+        """Get the (line, column) of each usage of a file, or None if it isn't stored."""
+        entry = self._get_entry(file_id)
+        return entry[1] if entry is not None else None
+
+    def path_of(self, file_id: int) -> str | None:
+        """Get the path the usages of a file were stored with."""
+        pinned = self._pinned.get(file_id)
+        if pinned:
+            return pinned[0].file_path
+        return self._stored_paths.get(file_id)
+
+    def get_by_name(self, name: str) -> list[HxRequestUsage]:
+        """Get all usages of a name, from open buffers and the database."""
+        shadowed = self._shadowed_paths()
+        usages = [
+            _row_usage(row)
+            for row in self._db.execute(
+                f"SELECT {_USAGE_COLUMNS} FROM usages WHERE name = ? ORDER BY path, line, col", (name,)
+            )
+            if row[0] not in shadowed
+        ]
+        for pinned in self._pinned.values():
+            usages.extend(u for u in pinned if u.name == name)
+        return usages
+
+    def count_by_name(self, name: str) -> int:
+        """Count the usages of a name without reading them."""
+        shadowed = self._shadowed_paths()
+        total = sum(
+            count
+            for path, count in self._db.execute(
+                "SELECT path, COUNT(*) FROM usages WHERE name = ? GROUP BY path", (name,)
+            )
+            if path not in shadowed
+        )
+        return total + sum(u.name == name for pinned in self._pinned.values() for u in pinned)
+
+    def files_using(self, name: str) -> list[str]:
+        """Get the paths of the files using a name, from open buffers and the database."""
+        shadowed = self._shadowed_paths()
+        paths = [
+            row[0]
+            for row in self._db.execute(
+                "SELECT DISTINCT path FROM usages WHERE name = ? ORDER BY path", (name,)
+            )
+            if row[0] not in shadowed
+        ]
+        paths.extend(
+            pinned[0].file_path
+            for pinned in self._pinned.values()
+            if any(u.name == name for u in pinned)
+        )
+        return paths
+
+    def used_names(self) -> set[str]:
+        """Get every name with at least one usage."""
+        shadowed = self._shadowed_paths()
+        if shadowed:
+            placeholders = ", ".join("?" * len(shadowed))
+            rows = self._db.execute(
+                f"SELECT DISTINCT name FROM usages WHERE path NOT IN ({placeholders})", tuple(shadowed)
+            )
+        else:
+            rows = self._db.execute("SELECT DISTINCT name FROM usages")
+        names = {row[0] for row in rows}
+        for pinned in self._pinned.values():
+            names.update(u.name for u in pinned)
+        return names
+
+    def get_undefined(self, defined: Container[str]) -> list[HxRequestUsage]:
+        """Get all usages of names that aren't in ``defined``."""
+        names = {row[0] for row in self._db.execute("SELECT DISTINCT name FROM usages")}
+        for pinned in self._pinned.values():
+            names.update(u.name for u in pinned)
+        undefined = []
+        for name in sorted(names):
+            if name not in defined:
+                undefined.extend(self.get_by_name(name))
+        return undefined
+
+    def count(self) -> int:
+        """Count all usages."""
+        shadowed = self._shadowed_paths()
+        total = self._db.execute("SELECT COUNT(*) FROM usages").fetchone()[0]
+        for path in shadowed:
+            total -= self._db.execute("SELECT COUNT(*) FROM usages WHERE path = ?", (path,)).fetchone()[
+                0
+            ]
+        return total + sum(len(usages) for usages in self._pinned.values())
+
+    def save_file(
+        self,
+        file_id: int,
+        file_path: str,
+        content_hash: int | None,
+        definitions: list[HxRequestDefinition] | None,
+    ) -> None:
+        """Record a file indexed from disk with its fingerprint; definitions are None for templates."""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return
+        with self._transaction():
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, content_hash, is_python) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (file_path, st.st_mtime_ns, st.st_size, content_hash, definitions is not None),
+            )
+            if definitions is not None:
+                self._db.execute("DELETE FROM definitions WHERE path = ?", (file_path,))
+                self._db.executemany(
+                    "INSERT INTO definitions (path, name, data) VALUES (?, ?, ?)",
+                    [(file_path, d.name, _definition_data(d)) for d in definitions],
+                )
+
+    def load_unchanged(
+        self, file_paths: Iterable[str]
+    ) -> dict[str, tuple[int | None, list[HxRequestDefinition] | None]]:
+        """Get the stored entries of files whose modification time and size haven't changed.
+
+        Returns:
+            Maps path -> (content hash, definitions); definitions are None for
+            templates, whose usages stay in the database
+        """
+        fingerprints = {
+            row[0]: row[1:]
+            for row in self._db.execute(
+                "SELECT path, mtime_ns, size, content_hash, is_python FROM files"
+            )
+        }
+        unchanged: dict[str, tuple[int | None, list[HxRequestDefinition] | None]] = {}
+        python_paths = set()
+        for file_path in file_paths:
+            stored = fingerprints.get(file_path)
+            if stored is None:
+                continue
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            mtime_ns, size, content_hash, is_python = stored
+            if (st.st_mtime_ns, st.st_size) != (mtime_ns, size):
+                continue
+            unchanged[file_path] = (content_hash, [] if is_python else None)
+            if is_python:
+                python_paths.add(file_path)
+
+        if python_paths:
+            invalid = set()
+            for file_path, data in self._db.execute("SELECT path, data FROM definitions"):
+                if file_path in python_paths:
+                    try:
+                        unchanged[file_path][1].append(_data_definition(data))
+                    except (ValueError, TypeError, KeyError):
+                        invalid.add(file_path)
+            for file_path in invalid:
+                # Parse the file again rather than trust what was stored for it
+                logger.warning(f"Ignoring invalid stored definitions of {file_path}")
+                del unchanged[file_path]
+        return unchanged
+
+    def adopt(self, file_id: int, file_path: str) -> None:
+        """Take on a template file whose usages were stored by an earlier run."""
+        self._stored_paths[file_id] = file_path
+
+    def prune(self, file_paths: Container[str]) -> None:
+        """Drop stored files that aren't in ``file_paths``, e.g. files deleted while not running."""
+        stale = {
+            row[0]
+            for table in ("files", "usages", "definitions")
+            for row in self._db.execute(f"SELECT DISTINCT path FROM {table}")
+            if row[0] not in file_paths
+        }
+        if not stale:
+            return
+        with self._transaction():
+            for table in ("files", "usages", "definitions"):
+                self._db.executemany(f"DELETE FROM {table} WHERE path = ?", [(p,) for p in stale])
+        logger.info(f"Pruned {len(stale)} files from the index store")
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group writes into a single transaction."""
+        with self._transaction():
+            yield
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Run writes in a transaction; nested transactions join the outermost one."""
+        if self._batch_depth:
+            self._batch_depth += 1
+            try:
+                yield
+            finally:
+                self._batch_depth -= 1
+            return
+
+        self._db.execute("BEGIN IMMEDIATE")
+        self._batch_depth = 1
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        else:
+            self._db.execute("COMMIT")
+        finally:
+            self._batch_depth = 0
+
+    def _get_entry(self, file_id: int) -> tuple[list[HxRequestUsage], list[tuple[int, int]]] | None:
+        pinned = self._pinned.get(file_id)
+        if pinned is not None:
+            return pinned, self._pinned_positions[file_id]
+
+        entry = self._hot.get(file_id)
+        if entry is not None:
+            self._hot.move_to_end(file_id)
+            return entry
+
+        file_path = self._stored_paths.get(file_id)
+        if file_path is None:
+            return None
+        usages = [
+            _row_usage(row)
+            for row in self._db.execute(
+                f"SELECT {_USAGE_COLUMNS} FROM usages WHERE path = ? ORDER BY line, col", (file_path,)
+            )
+        ]
+        return self._cache(file_id, usages)
+
+    def _cache(
+        self, file_id: int, usages: list[HxRequestUsage]
+    ) -> tuple[list[HxRequestUsage], list[tuple[int, int]]]:
+        entry = (usages, [(u.line_number, u.column) for u in usages])
+        self._hot[file_id] = entry
+        self._hot.move_to_end(file_id)
+        while len(self._hot) > HOT_FILE_CACHE_SIZE:
+            self._hot.popitem(last=False)
+        return entry
+
+    def _shadowed_paths(self) -> set[str]:
+        """Paths whose stored usages are overridden by an open buffer."""
+        return {self._stored_paths[file_id] for file_id in self._pinned if file_id in self._stored_paths}
+
+
+class CompactUsageStore(MemoryUsageStore):
+    """Keeps usages in memory within a budget, compacting the files looked up least recently.
+
+    Every template file is summarized by how often it uses each name, which
+    is all that counts, the names in use and the files using a name need.
+    The full usages, with their positions, are kept for the files looked up
+    most recently, up to ``budget`` usages in all; the least recently used
+    files are compacted to their summary beyond that. Looking up the
+    usages of a compacted file re-scans it from disk. Usages of open
+    buffers are always kept and don't count towards the budget.
+    """
+
+    backend = "compact"
+
+    def __init__(self, budget: int = DEFAULT_USAGE_BUDGET):
+        """Initialize the store.
+
+        Args:
+            budget: Number of usages to keep in full, across all files
+        """
+        super().__init__()
+        self.budget = max(budget, 0)
+
+        # Maps file ID -> path of every template file with usages stored
+        self._paths: dict[int, str] = {}
+
+        # Maps file ID -> number of usages of each name in that file
+        self._summaries: dict[int, Counter[str]] = {}
+
+        # Maps hx_request name -> IDs of the files using it, in the order they were stored
+        self._files_by_name: dict[str, dict[int, None]] = {}
+
+        # Maps file ID -> usages of an open buffer, which are never compacted
+        self._pinned: dict[int, list[HxRequestUsage]] = {}
+
+        # Maps file ID -> (line, column) of each usage of an open buffer, parallel to _pinned
+        self._pinned_positions: dict[int, list[tuple[int, int]]] = {}
+
+        # LRU cache of file ID -> (usages, positions) of files that aren't compacted
+        self._detailed: OrderedDict[int, tuple[list[HxRequestUsage], list[tuple[int, int]]]] = (
+            OrderedDict()
+        )
+        self._detailed_usages = 0
+
+        self.evictions = 0
+        self.rescans = 0
+
+    def clear(self) -> None:
+        """Forget all usages."""
+        self._paths.clear()
+        self._summaries.clear()
+        self._files_by_name.clear()
+        self._pinned.clear()
+        self._pinned_positions.clear()
+        self._detailed.clear()
+        self._detailed_usages = 0
+
+    def set_usages(
+        self, file_id: int, file_path: str, usages: list[HxRequestUsage], pinned: bool = False
+    ) -> None:
+        """Replace the usages of a template file.
+
+        Usages from disk may be compacted later; usages of open buffers are
+        kept until they are replaced.
+        """
+        self._drop_details(file_id)
+        self._pinned.pop(file_id, None)
+        self._pinned_positions.pop(file_id, None)
+        self._paths[file_id] = file_path
+        self._summarize(file_id, usages)
+        if pinned:
+            self._pinned[file_id] = usages
+            self._pinned_positions[file_id] = [(u.line_number, u.column) for u in usages]
+        else:
+            self._keep_details(file_id, usages)
+
+    def remove(self, file_id: int, file_path: str) -> None:
+        """Forget the usages of a file."""
+        self._drop_details(file_id)
+        self._pinned.pop(file_id, None)
+        self._pinned_positions.pop(file_id, None)
+        self._paths.pop(file_id, None)
+        self._summarize(file_id, [])
+        self._summaries.pop(file_id, None)
+
+    def get_file(self, file_id: int) -> list[HxRequestUsage] | None:
+        """Get the usages of a file, re-scanning it if it was compacted."""
+        entry = self._get_entry(file_id)
+        return entry[0] if entry is not None else None
+
+    def get_positions(self, file_id: int) -> list[tuple[int, int]] | None:
+        """Get the (line, column) of each usage of a file, or None if it isn't stored."""
+        entry = self._get_entry(file_id)
+        return entry[1] if entry is not None else None
+
+    def path_of(self, file_id: int) -> str | None:
+        """Get the path the usages of a file were stored with."""
+        return self._paths.get(file_id)
+
+    def get_by_name(self, name: str) -> list[HxRequestUsage]:
+        """Get all usages of a name, re-scanning the compacted files that use it."""
+        usages = []
+        for file_id in list(self._files_by_name.get(name, ())):
+            entry = self._get_entry(file_id)
+            if entry is not None:
+                usages.extend(u for u in entry[0] if u.name == name)
+        return usages
+
+    def count_by_name(self, name: str) -> int:
+        """Count the usages of a name from the file summaries."""
+        return sum(self._summaries[file_id][name] for file_id in self._files_by_name.get(name, ()))
+
+    def files_using(self, name: str) -> list[str]:
+        """Get the paths of the files using a name from the file summaries."""
+        return [self._paths[file_id] for file_id in self._files_by_name.get(name, ())]
+
+    def used_names(self) -> set[str]:
+        """Get every name with at least one usage."""
+        return set(self._files_by_name)
+
+    def get_undefined(self, defined: Container[str]) -> list[HxRequestUsage]:
+        """Get all usages of names that aren't in ``defined``."""
+        undefined = []
+        for name in list(self._files_by_name):
+            if name not in defined:
+                undefined.extend(self.get_by_name(name))
+        return undefined
+
+    def count(self) -> int:
+        """Count all usages."""
+        return sum(summary.total() for summary in self._summaries.values())
+
+    def stats(self) -> dict[str, int]:
+        """Return how many usages are kept in full and how often files were compacted or re-scanned."""
+        return {
+            "usage_budget": self.budget,
+            "detailed_usages": self._detailed_usages,
+            "compacted_files": len(self._summaries) - len(self._detailed) - len(self._pinned),
+            "evictions": self.evictions,
+            "rescans": self.rescans,
+        }
+
+    def _get_entry(self, file_id: int) -> tuple[list[HxRequestUsage], list[tuple[int, int]]] | None:
+        pinned = self._pinned.get(file_id)
+        if pinned is not None:
+            return pinned, self._pinned_positions[file_id]
+
+        entry = self._detailed.get(file_id)
+        if entry is not None:
+            self._detailed.move_to_end(file_id)
+            return entry
+
+        file_path = self._paths.get(file_id)
+        if file_path is None:
+            return None
+        usages = _scan_template(file_path)
+        self.rescans += 1
+        # The file may have changed since it was summarized; the summary follows what was found
+        self._summarize(file_id, usages)
+        return self._keep_details(file_id, usages)
+
+    def _keep_details(
+        self, file_id: int, usages: list[HxRequestUsage]
+    ) -> tuple[list[HxRequestUsage], list[tuple[int, int]]]:
+        """Keep the usages of a file in full, compacting the least recently used files beyond the budget."""
+        entry = (usages, [(u.line_number, u.column) for u in usages])
+        self._detailed[file_id] = entry
+        self._detailed_usages += len(usages)
+        # The file just kept is always the most recently used, so it is never compacted here
+        while self._detailed_usages > self.budget and len(self._detailed) > 1:
+            _, (evicted, _) = self._detailed.popitem(last=False)
+            self._detailed_usages -= len(evicted)
+            self.evictions += 1
+        return entry
+
+    def _drop_details(self, file_id: int) -> None:
+        entry = self._detailed.pop(file_id, None)
+        if entry is not None:
+            self._detailed_usages -= len(entry[0])
+
+    def _summarize(self, file_id: int, usages: list[HxRequestUsage]) -> None:
+        """Replace the name counts of a file."""
+        summary = Counter(u.name for u in usages)
+        for name in self._summaries.get(file_id, {}).keys() - summary.keys():
+            files = self._files_by_name[name]
+            del files[file_id]
+            if not files:
+                del self._files_by_name[name]
+        for name in summary:
+            self._files_by_name.setdefault(name, {})[file_id] = None
+        self._summaries[file_id] = summary
+
+
+def open_store(
+    workspace_root: str | Path,
+    backend: str = "memory",
+    db_path: str | Path | None = None,
+    usage_budget: int = DEFAULT_USAGE_BUDGET,
+) -> MemoryUsageStore:
+    """Open the usage store for a workspace.
+
+    Falls back to memory if the database can't be opened.
+
+    Args:
+        workspace_root: Root directory of the workspace
+        backend: "memory", "compact" or "sqlite"
+        db_path: Database file for the SQLite store (see default_store_path if None)
+        usage_budget: Usages the compact store keeps in full
+
+    Returns:
+        The store
+    """
+    if backend == "compact":
+        logger.info(f"Keeping up to {usage_budget} usages in full, compacting the rest")
+        return CompactUsageStore(usage_budget)
+    if backend != "sqlite":
+        return MemoryUsageStore()
+    db_path = db_path or default_store_path(workspace_root)
+    try:
+        store = SqliteIndexStore(db_path)
+    except (OSError, sqlite3.Error) as e:
+        logger.error(f"Could not open index store {db_path}, keeping the index in memory: {e}")
+        return MemoryUsageStore()
+    logger.info(f"Using index store {db_path}")
+    return store
+
+
+def default_store_path(workspace_root: str | Path) -> Path:
+    """Get the default database path for a workspace, in the user's cache directory."""
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    key = hashlib.blake2b(str(Path(workspace_root).resolve()).encode(), digest_size=8).hexdigest()
+    return Path(cache_dir) / "hx-requests-lsp" / f"{Path(workspace_root).name}-{key}.sqlite3"
+
+
+def _scan_template(file_path: str) -> list[HxRequestUsage]:
+    """Read a template from disk and parse its usages, sorted by position."""
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError):
+        return []
+    usages = parse_template_for_hx_requests(content, file_path)
+    return sorted(usages, key=lambda u: (u.line_number, u.column))
+
+
+def _usage_row(usage: HxRequestUsage) -> tuple:
+    return (
+        usage.file_path,
+        usage.name,
+        usage.line_number,
+        usage.column,
+        usage.end_column,
+        usage.tag_type,
+        usage.full_match,
+        usage.is_variable,
+    )
+
+
+def _definition_data(definition: HxRequestDefinition) -> str:
+    return json.dumps(dataclasses.asdict(definition))
+
+
+def _data_definition(data: str) -> HxRequestDefinition:
+    """Rebuild a stored definition; raises ValueError, TypeError or KeyError if it is malformed."""
+    fields = json.loads(data)
+    fields["base_class_info"] = [BaseClassInfo(**info) for info in fields["base_class_info"]]
+    return HxRequestDefinition(**fields)
+
+
+def _row_usage(row: tuple) -> HxRequestUsage:
+    path, name, line, col, end_col, tag_type, full_match, is_variable = row
+    return HxRequestUsage(
+        name=name,
+        file_path=path,
+        line_number=line,
+        column=col,
+        end_column=end_col,
+        tag_type=tag_type,
+        full_match=full_match,
+        is_variable=bool(is_variable),
+    )
@@ -1,9 +1,13 @@
 """Parser for finding hx_request usages in Django templates."""
 
 import re
+from bisect import bisect_right
 from dataclasses import dataclass
+from itertools import accumulate
 from pathlib import Path
 
+from hx_requests_lsp.discovery import DiscoveryOptions, discover_workspace_files
+
 
 @dataclass
 class HxRequestUsage:
@@ -42,7 +46,7 @@ HX_TAG_PATTERN = re.compile(
     (hx_post|hx_get|hx_request)          # Tag name (captured)
     \s+                                   # Whitespace
     (?:
-        ['"]([^'"]+)['"]                  # Quoted string name (captured)
+        ['"]([^'"\r\n]+)['"]              # Quoted string name (captured)
         |
         ([a-zA-Z_][a-zA-Z0-9_.]*)         # Variable name (captured)
     )
@@ -55,10 +59,10 @@ HX_VALS_PATTERN = re.compile(
     r"""\{%\s*                           # Opening tag
     hx_vals                              # Tag name
     \s+                                   # Whitespace
-    .*?                                   # Any content before
+    .*?                                   # Any content before (bounded by the tag end)
     hx_request_name\s*=\s*               # Keyword argument
     (?:
-        ['"]([^'"]+)['"]                  # Quoted string name (captured)
+        ['"]([^'"\r\n]+)['"]              # Quoted string name (captured)
         |
         ([a-zA-Z_][a-zA-Z0-9_.]*)         # Variable name (captured)
     )
@@ -82,9 +86,20 @@ HX_NAME_IN_TAG = re.compile(
 )
 
 
+# Opening of an hx tag, used to jump straight from one hx tag to the next
+# and classify it once by its name
+HX_TAG_START_PATTERN = re.compile(r"\{%\s*(hx_post|hx_get|hx_request|hx_vals)\b")
+
+
 def parse_template_for_hx_requests(content: str, file_path: str = "<string>") -> list[HxRequestUsage]:
     """Parse a Django template and find all hx_request usages.
 
+    Scans the whole document in a single pass, jumping from one hx tag opening
+    ``{% hx_...`` to the next. Each tag is classified once by its name and only
+    the pattern for that tag is matched, within the tag's span. Tags may span
+    several lines. Offsets are mapped to lines through a table of line starts
+    that is built on the first hit.
+
     Args:
         content: Template content as a string
         file_path: Path to the template file (for position information)
@@ -93,57 +108,64 @@ def parse_template_for_hx_requests(content: str, file_path: str = "<string>") ->
         List of HxRequestUsage objects found in the template
     """
     usages: list[HxRequestUsage] = []
-    lines = content.splitlines()
-
-    for line_num, line in enumerate(lines, start=1):
-        # Find hx_post, hx_get, hx_request tags
-        for match in HX_TAG_PATTERN.finditer(line):
-            tag_type = match.group(1)
-            quoted_name = match.group(2)  # Name in quotes (literal)
-            unquoted_name = match.group(3)  # Name without quotes (variable)
-
-            name = quoted_name or unquoted_name
-            is_variable = quoted_name is None and unquoted_name is not None
-
-            if name:
-                # Skip variable references containing dots
-                if "." in name:
-                    continue
-
-                # Find the exact position of the name in the line
-                name_start = _find_name_position(line, match.start(), name)
-                usages.append(
-                    HxRequestUsage(
-                        name=name,
-                        file_path=file_path,
-                        line_number=line_num,
-                        column=name_start,
-                        end_column=name_start + len(name),
-                        tag_type=tag_type,
-                        full_match=match.group(0),
-                        is_variable=is_variable,
-                    )
-                )
-
-        # Find hx_vals with hx_request_name
-        for match in HX_VALS_PATTERN.finditer(line):
-            quoted_name = match.group(1)  # Name in quotes (literal)
-            unquoted_name = match.group(2)  # Name without quotes (variable)
+    line_starts: list[int] | None = None
+
+    # Next "%}" and "{%" at or after the current tag; each is only searched for
+    # again once the scan has moved past it, which keeps the pass linear
+    next_close = next_open = -1
+
+    for tag in HX_TAG_START_PATTERN.finditer(content):
+        pos = tag.start()
+        tag_name = tag.group(1)
+
+        if line_starts is None:
+            line_starts = _line_start_offsets(content)
+
+        if next_close != len(content) and next_close < tag.end():
+            next_close = content.find("%}", tag.end())
+            next_close = len(content) if next_close == -1 else next_close
+        if next_open != len(content) and next_open < tag.end():
+            next_open = content.find("{%", tag.end())
+            next_open = len(content) if next_open == -1 else next_open
+
+        if next_close < next_open:
+            tag_end = next_close
+        else:
+            # Unclosed tag: it ends at the end of its line or the next tag, whichever is first
+            line_index = bisect_right(line_starts, pos) - 1
+            line_end = line_starts[line_index + 1] if line_index + 1 < len(line_starts) else len(content)
+            tag_end = min(line_end, next_open)
+
+        if tag_name == "hx_vals":
+            match = HX_VALS_PATTERN.match(content, pos, tag_end)
+            tag_type = "hx_vals"
+        else:
+            match = HX_TAG_PATTERN.match(content, pos, tag_end)
+            tag_type = tag_name
+
+        if match:
+            # Groups are (quoted name, unquoted name) for both patterns
+            quoted_group = 2 if tag_type != "hx_vals" else 1
+            quoted_name = match.group(quoted_group)  # Name in quotes (literal)
+            unquoted_name = match.group(quoted_group + 1)  # Name without quotes (variable)
 
             name = quoted_name or unquoted_name
             is_variable = quoted_name is None and unquoted_name is not None
 
+            # Skip variable references containing dots
             if name and "." not in name:
-                # Find the exact position of the name in the line
-                name_start = _find_name_position(line, match.start(), name)
+                # The name may be on a later line than the opening {%
+                name_start = match.start(quoted_group if quoted_name else quoted_group + 1)
+                line_index = bisect_right(line_starts, name_start) - 1
+                column = name_start - line_starts[line_index]
                 usages.append(
                     HxRequestUsage(
                         name=name,
                         file_path=file_path,
-                        line_number=line_num,
-                        column=name_start,
-                        end_column=name_start + len(name),
-                        tag_type="hx_vals",
+                        line_number=line_index + 1,
+                        column=column,
+                        end_column=column + len(name),
+                        tag_type=tag_type,
                         full_match=match.group(0),
                         is_variable=is_variable,
                     )
@@ -152,27 +174,12 @@ def parse_template_for_hx_requests(content: str, file_path: str = "<string>") ->
     return usages
 
 
-def _find_name_position(line: str, search_start: int, name: str) -> int:
-    """Find the exact column position of a name within a line.
-
-    Args:
-        line: The line of text
-        search_start: Position to start searching from
-        name: The name to find
+def _line_start_offsets(content: str) -> list[int]:
+    """Build a table of the offsets at which each line starts.
 
-    Returns:
-        Column position (0-based) of the name
+    Lines are split the same way as ``str.splitlines``.
     """
-    # Look for quoted version first
-    for quote in ["'", '"']:
-        quoted_name = f"{quote}{name}{quote}"
-        pos = line.find(quoted_name, search_start)
-        if pos != -1:
-            return pos + 1  # +1 to skip the quote
-
-    # Fall back to unquoted search
-    pos = line.find(name, search_start)
-    return pos if pos != -1 else search_start
+    return [0, *accumulate(map(len, content.splitlines(keepends=True)))]
 
 
 def parse_template_file(file_path: str | Path) -> list[HxRequestUsage]:
@@ -196,31 +203,18 @@ def parse_template_file(file_path: str | Path) -> list[HxRequestUsage]:
     return parse_template_for_hx_requests(content, str(file_path.resolve()))
 
 
-def find_template_files(root_dir: str | Path) -> list[Path]:
+def find_template_files(root_dir: str | Path, options: DiscoveryOptions | None = None) -> list[Path]:
     """Find all Django template files in a directory.
 
     Args:
         root_dir: Root directory to search
+        options: Discovery options (excluded directories, extra roots, extensions)
 
     Returns:
-        List of paths to template files (.html)
+        List of paths to template files below templates/ and template_partials/
+        directories and any extra template roots
     """
-    root_dir = Path(root_dir)
-    templates = []
-
-    # Find .html files in templates/ and template_partials/ directories
-    for pattern in ["**/templates/**/*.html", "**/template_partials/**/*.html"]:
-        templates.extend(root_dir.glob(pattern))
-
-    # Deduplicate
-    seen = set()
-    result = []
-    for f in templates:
-        if f.resolve() not in seen and "__pycache__" not in str(f):
-            seen.add(f.resolve())
-            result.append(f)
-
-    return sorted(result)
+    return discover_workspace_files(root_dir, options).template_files
 
 
 def collect_all_usages(root_dir: str | Path) -> dict[str, list[HxRequestUsage]]:
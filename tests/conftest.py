@@ -1,8 +1,58 @@
 """Test configuration for hx-requests-lsp tests."""
 
+import asyncio
 import sys
 from pathlib import Path
 
+import pytest
+
 # Add the package to the path for testing
 package_path = Path(__file__).parent.parent / "hx_requests_lsp"
 sys.path.insert(0, str(package_path.parent))
+
+
+@pytest.fixture
+def loop():
+    """Create an event loop for running server handlers to completion."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def make_workspace(tmp_path):
+    """Get a function that writes files into a workspace and returns its root.
+
+    Files are given as a dict of relative path -> content. Content is either
+    the text to write or, for hx_requests modules, a dict of class name ->
+    hx_request name to define.
+    """
+
+    def make(files: dict[str, str | dict[str, str]], root: Path = tmp_path) -> Path:
+        for relative, content in files.items():
+            path = root / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if isinstance(content, dict):
+                content = _hx_requests_module(content)
+            path.write_text(content)
+        return root
+
+    return make
+
+
+@pytest.fixture
+def workspace(make_workspace):
+    """Create a workspace with one hx_request and one template using it."""
+    return make_workspace(
+        {
+            "app/hx_requests/views.py": {"NotesCount": "notes_count"},
+            "app/templates/list.html": "<b {% hx_get 'notes_count' %}></b>\n",
+        }
+    )
+
+
+def _hx_requests_module(classes: dict[str, str]) -> str:
+    source = "from hx_requests.hx_requests import BaseHxRequest\n"
+    for class_name, name in classes.items():
+        source += f'\n\nclass {class_name}(BaseHxRequest):\n    name = "{name}"\n'
+    return source
@@ -0,0 +1,138 @@
+"""Tests for the check module."""
+
+import io
+import json
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hx_requests_lsp import check
+from hx_requests_lsp.index import HxRequestIndex
+
+
+@pytest.fixture
+def workspace(make_workspace):
+    """Create a workspace with one undefined usage and one unused definition."""
+    return make_workspace(
+        {
+            "app/hx_requests/views.py": {"NotesCount": "notes_count", "Orphan": "orphan"},
+            "app/templates/app/list.html": (
+                "<button {% hx_post 'notes_count' %}>Refresh</button>\n"
+                "<button {% hx_post 'missing' %}>Broken</button>\n"
+                "<button {% hx_get name_var %}>Dynamic</button>\n"
+            ),
+        }
+    )
+
+
+def run_check(*argv):
+    parser = check.argparse.ArgumentParser()
+    check.add_arguments(parser)
+    stdout, stderr = io.StringIO(), io.StringIO()
+    code = check.run(parser.parse_args([str(a) for a in argv]), stdout=stdout, stderr=stderr)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+class TestCheck:
+    """Tests for the check command."""
+
+    def test_reports_findings_as_text(self, workspace):
+        """Should report undefined usages and unused definitions and exit 1."""
+        code, out, err = run_check(workspace)
+
+        assert code == 1
+        assert out.splitlines() == [
+            "app/hx_requests/views.py:8: warning: hx_request 'orphan' (Orphan) is never used "
+            "[unused-hx-request]",
+            "app/templates/app/list.html:2:21: error: Unknown hx_request: 'missing' [unknown-hx-request]",
+        ]
+        assert "2 finding(s)" in err
+
+    def test_clean_workspace_exits_zero(self, workspace):
+        """Should exit 0 when nothing is reported."""
+        template = workspace / "app" / "templates" / "app" / "list.html"
+        template.write_text("<button {% hx_post 'notes_count' %}></button>\n")
+
+        code, out, _ = run_check(workspace, "--no-unused")
+
+        assert code == 0
+        assert out == ""
+
+    def test_json_output(self, workspace):
+        """Should write findings and a summary as JSON."""
+        code, out, _ = run_check(workspace, "--format", "json", "--no-unused")
+
+        report = json.loads(out)
+        assert code == 1
+        assert report["summary"] == {"unknown-hx-request": 1, "unused-hx-request": 0}
+        assert report["findings"][0]["path"] == "app/templates/app/list.html"
+        assert report["findings"][0]["line"] == 2
+
+    def test_sarif_output(self, workspace):
+        """Should write a SARIF 2.1.0 log with 1-based regions relative to the source root."""
+        _, out, _ = run_check(workspace, "--format", "sarif")
+
+        log = json.loads(out)
+        assert log["version"] == "2.1.0"
+        run = log["runs"][0]
+        assert {r["id"] for r in run["tool"]["driver"]["rules"]} == set(check.RULES)
+
+        result = next(r for r in run["results"] if r["ruleId"] == "unknown-hx-request")
+        location = result["locations"][0]["physicalLocation"]
+        assert result["level"] == "error"
+        assert location["artifactLocation"] == {
+            "uri": "app/templates/app/list.html",
+            "uriBaseId": "%SRCROOT%",
+        }
+        assert location["region"] == {"startLine": 2, "startColumn": 21, "endColumn": 28}
+
+    def test_sarif_output_skips_server_imports(self, workspace):
+        """Should write SARIF without importing the language server and pygls."""
+        script = (
+            "import sys\n"
+            "from hx_requests_lsp import check\n"
+            f"check.main([{str(workspace)!r}, '--format', 'sarif'])\n"
+            "print(sorted(m for m in sys.modules if m.startswith(('pygls', 'hx_requests_lsp.server'))))\n"
+        )
+
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+
+        assert result.stdout.splitlines()[-1] == "[]"
+
+    @pytest.mark.parametrize("log_args", [[], ["--log-level", "WARNING"]])
+    def test_command_line_logs_warnings_only(self, workspace, log_args):
+        """Should keep stderr free of INFO logs by default, and accept --log-level after the command."""
+        result = subprocess.run(
+            [sys.executable, "-m", "hx_requests_lsp.cli", "check", workspace, "--format", "json"]
+            + log_args,
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 1
+        assert json.loads(result.stdout)["summary"]["unknown-hx-request"] == 1
+        assert "INFO" not in result.stderr
+
+    def test_missing_root(self, tmp_path):
+        """Should exit 2 when the path isn't a directory."""
+        code, _, err = run_check(tmp_path / "nope")
+
+        assert code == 2
+        assert "not a directory" in err
+
+
+class TestParallelBuild:
+    """Tests for building the index with an executor."""
+
+    def test_executor_build_matches_serial_build(self, workspace):
+        """Should index the same definitions and usages when parsing in workers."""
+        serial = HxRequestIndex(workspace)
+        serial.build_full_index()
+        parallel = HxRequestIndex(workspace)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            parallel.build_full_index(executor)
+
+        assert parallel.get_all_definition_names() == serial.get_all_definition_names()
+        assert {u.name for u in parallel.find_undefined_usages()} == {"missing", "name_var"}
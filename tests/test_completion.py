@@ -0,0 +1,102 @@
+"""Tests for the completion module."""
+
+import pytest
+from lsprotocol import types as lsp
+
+from hx_requests_lsp.completion import CompletionItemCache
+from hx_requests_lsp.index import HxRequestIndex
+
+
+@pytest.fixture
+def workspace(make_workspace):
+    """Create a workspace with two apps, whose hx_requests have docstrings."""
+    files = {}
+    for app, names in (("notes", ["notes_count", "edit_note"]), ("tasks", ["task_list"])):
+        classes = "\n".join(
+            f'class Request{i}(BaseHxRequest):\n    """Docs for {name}."""\n    name = "{name}"\n'
+            for i, name in enumerate(names)
+        )
+        files[f"{app}/hx_requests/views.py"] = (
+            f"from hx_requests.hx_requests import BaseHxRequest\n\n{classes}"
+        )
+    return make_workspace(files)
+
+
+@pytest.fixture
+def index(workspace):
+    index = HxRequestIndex(workspace)
+    index.build_full_index()
+    return index
+
+
+class TestCompletionItemCache:
+    """Tests for CompletionItemCache class."""
+
+    def test_orders_current_app_first(self, workspace, index):
+        """Should list the current app's definitions first."""
+        cache = CompletionItemCache(index)
+
+        items = cache.get_items(workspace / "tasks" / "templates" / "page.html", needs_quotes=False)
+
+        assert [i.label for i in items] == ["task_list", "edit_note", "notes_count"]
+        assert sorted(items, key=lambda i: i.sort_text) == items
+
+    def test_reuses_items_across_requests(self, workspace, index):
+        """Should return the same item objects for unchanged definitions."""
+        cache = CompletionItemCache(index)
+        template = workspace / "notes" / "templates" / "page.html"
+
+        first = cache.get_items(template, needs_quotes=True)
+        second = cache.get_items(template, needs_quotes=True)
+
+        assert all(a is b for a, b in zip(first, second, strict=True))
+        assert first[0].insert_text == '"edit_note"'
+        assert cache.stats()["hits"] == 3
+
+    def test_invalidates_changed_definition_only(self, workspace, index):
+        """Should rebuild only the items whose definition changed."""
+        cache = CompletionItemCache(index)
+        template = workspace / "notes" / "templates" / "page.html"
+        before = {i.label: i for i in cache.get_items(template, needs_quotes=False)}
+
+        index.update_file(
+            workspace / "tasks" / "hx_requests" / "views.py",
+            'class Tasks(BaseHxRequest):\n    name = "task_board"\n',
+        )
+        after = {i.label: i for i in cache.get_items(template, needs_quotes=False)}
+
+        assert set(after) == {"notes_count", "edit_note", "task_board"}
+        assert after["notes_count"] is before["notes_count"]
+        assert cache.stats()["entries"] == 3
+
+    def test_keeps_unchanged_definitions_of_reparsed_file(self, workspace, index):
+        """Should keep the items of definitions a re-parse of their file left unchanged."""
+        cache = CompletionItemCache(index)
+        template = workspace / "notes" / "templates" / "page.html"
+        views = workspace / "notes" / "hx_requests" / "views.py"
+        before = {i.label: i for i in cache.get_items(template, needs_quotes=False)}
+        generation = index.get_definition_generation("notes_count")
+
+        index.update_file(views, views.read_text().replace("Docs for edit_note.", "Edit a note."))
+        after = {i.label: i for i in cache.get_items(template, needs_quotes=False)}
+
+        assert index.get_definition_generation("notes_count") == generation
+        assert after["notes_count"] is before["notes_count"]
+        assert index.get_definition("edit_note").docstring == "Edit a note."
+
+    def test_resolve_adds_documentation(self, workspace, index):
+        """Should fill in detail and documentation on resolve."""
+        cache = CompletionItemCache(index)
+        item = lsp.CompletionItem(label="task_list", data={"name": "task_list"})
+
+        resolved = cache.resolve(item)
+
+        assert resolved.detail == "Class: Request0"
+        assert "Docs for task_list." in resolved.documentation.value
+
+    def test_resolve_ignores_unknown_items(self, index):
+        """Should leave items without a known name untouched."""
+        cache = CompletionItemCache(index)
+        item = lsp.CompletionItem(label="gone", data={"name": "gone"})
+
+        assert cache.resolve(item).documentation is None
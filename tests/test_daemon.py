@@ -0,0 +1,109 @@
+"""Tests for the daemon module."""
+
+import asyncio
+
+import pytest
+from lsprotocol import types as lsp
+
+from hx_requests_lsp.daemon import Daemon
+from hx_requests_lsp.server import did_close, server
+
+
+@pytest.fixture
+def daemon():
+    """Create a daemon that releases workspaces as soon as their last client leaves."""
+    loop = asyncio.new_event_loop()
+    yield Daemon(server.create_session, idle_timeout=0, loop=loop)
+    loop.close()
+
+
+def connect(daemon, root):
+    """Connect a client and initialize it for a workspace root."""
+    protocol = daemon.connect()
+    session = next(s for s in daemon.sessions if s.lsp is protocol)
+    session.attach_workspace(str(root))
+    return session
+
+
+def close_document(session, path):
+    did_close(
+        session,
+        lsp.DidCloseTextDocumentParams(text_document=lsp.TextDocumentIdentifier(uri=path.as_uri())),
+    )
+
+
+class TestDaemon:
+    """Tests for the Daemon class."""
+
+    def test_clients_share_index_per_root(self, daemon, workspace, tmp_path_factory):
+        """Should give clients of the same root one index, and other roots their own."""
+        first = connect(daemon, workspace)
+        second = connect(daemon, workspace)
+        other = connect(daemon, tmp_path_factory.mktemp("other"))
+
+        assert first.index is second.index
+        assert first.pipeline is second.pipeline
+        assert first.executor is second.executor
+        assert other.index is not first.index
+        assert first.scheduler is not second.scheduler
+        assert len(daemon.workspaces) == 2
+
+    def test_builds_shared_index_once(self, daemon, workspace):
+        """Should build a shared index once for all of its clients."""
+        first = connect(daemon, workspace)
+        second = connect(daemon, workspace)
+        builds = []
+        build_full_index = first.index.build_full_index
+        first.index.build_full_index = lambda: builds.append(build_full_index())
+
+        async def build_both():
+            await asyncio.gather(first.build_index(), second.build_index())
+
+        daemon.loop.run_until_complete(build_both())
+
+        assert len(builds) == 1
+        assert second.index.get_definition("notes_count") is not None
+
+    def test_buffer_stays_while_another_client_has_it_open(self, daemon, workspace):
+        """Should only revert an edited document once no client has it open."""
+        first = connect(daemon, workspace)
+        second = connect(daemon, workspace)
+        first.index.build_full_index()
+        template = workspace / "app" / "templates" / "list.html"
+        for session in (first, second):
+            session.open_files.add(str(template))
+        first.index.update_file(template, "<b {% hx_get 'other' %}></b>\n", version=2)
+
+        close_document(first, template)
+        assert first.index.has_buffer_overlay(template)
+
+        close_document(second, template)
+        assert not first.index.has_buffer_overlay(template)
+        assert [u.name for u in first.index.get_usages_in_file(template)] == ["notes_count"]
+
+    def test_disconnect_releases_workspace_and_stops(self, daemon, workspace):
+        """Should drop a workspace after its last client and stop after the last client overall."""
+        first = connect(daemon, workspace)
+        second = connect(daemon, workspace)
+        first.index.build_full_index()
+        template = workspace / "app" / "templates" / "list.html"
+        first.open_files.add(str(template))
+        first.index.update_file(template, "<b {% hx_get 'other' %}></b>\n", version=2)
+
+        daemon.disconnect(first)
+
+        assert not second.index.has_buffer_overlay(template)
+        assert len(daemon.workspaces) == 1
+        assert not daemon.stopping
+
+        daemon.disconnect(second)
+
+        assert daemon.workspaces == {}
+        assert daemon.stopping
+
+    def test_reports_lock_file_errors(self, daemon, tmp_path):
+        """Should raise a clear error if the lock file next to the socket can't be opened."""
+        path = tmp_path / "missing" / "daemon.sock"
+
+        with pytest.raises(OSError, match="Can't open the daemon's lock file"):
+            daemon.serve_unix(str(path))
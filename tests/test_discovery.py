@@ -0,0 +1,134 @@
+"""Tests for the discovery module."""
+
+import pytest
+
+from hx_requests_lsp.discovery import DiscoveryOptions, GitIgnore, discover_workspace_files
+from hx_requests_lsp.settings import ServerSettings
+
+
+@pytest.fixture
+def workspace(make_workspace):
+    """Create a workspace with templates, hx_requests and directories to skip."""
+    files = [
+        "notes/hx_requests.py",
+        "notes/models.py",
+        "tasks/hx_requests/views.py",
+        "notes/templates/notes/list.html",
+        "notes/template_partials/row.html",
+        "notes/static/page.html",
+        "node_modules/pkg/templates/x.html",
+        ".venv/lib/hx_requests/base.py",
+        "generated/templates/out.html",
+        "frontend/templates/email.txt",
+    ]
+    return make_workspace(dict.fromkeys(files, ""))
+
+
+def relative(paths, root):
+    return sorted(str(p.relative_to(root)) for p in paths)
+
+
+class TestDiscoverWorkspaceFiles:
+    """Tests for discover_workspace_files function."""
+
+    def test_finds_python_and_template_files(self, workspace):
+        """Should find hx_requests files and templates, skipping excluded directories."""
+        files = discover_workspace_files(workspace)
+
+        assert relative(files.python_files, workspace) == [
+            "notes/hx_requests.py",
+            "tasks/hx_requests/views.py",
+        ]
+        assert relative(files.template_files, workspace) == [
+            "generated/templates/out.html",
+            "notes/template_partials/row.html",
+            "notes/templates/notes/list.html",
+        ]
+        assert files.directories > 0
+        assert files.seconds >= 0
+
+    def test_honours_gitignore(self, workspace):
+        """Should skip files and directories ignored by .gitignore files."""
+        (workspace / ".gitignore").write_text("# build output\ngenerated/\n")
+        (workspace / "notes" / ".gitignore").write_text("*.html\n!list.html\n")
+
+        files = discover_workspace_files(workspace)
+
+        assert relative(files.template_files, workspace) == ["notes/templates/notes/list.html"]
+
+    def test_gitignore_can_be_disabled(self, workspace):
+        """Should ignore .gitignore files when use_gitignore is off."""
+        (workspace / ".gitignore").write_text("generated/\n")
+
+        files = discover_workspace_files(workspace, DiscoveryOptions(use_gitignore=False))
+
+        assert "generated/templates/out.html" in relative(files.template_files, workspace)
+
+    def test_extra_template_roots_and_extensions(self, workspace, tmp_path_factory):
+        """Should find templates in extra roots, inside or outside the workspace."""
+        outside = tmp_path_factory.mktemp("shared")
+        (outside / "base.jinja").write_text("")
+        options = DiscoveryOptions(
+            template_dirs=["notes/static", str(outside)],
+            template_extensions=(".html", ".txt", ".jinja"),
+        )
+
+        files = discover_workspace_files(workspace, options)
+
+        names = {p.name for p in files.template_files}
+        assert {"page.html", "email.txt", "base.jinja"} <= names
+
+    def test_extra_excluded_dirs(self, workspace):
+        """Should not enter directories added to the excluded set."""
+        options = DiscoveryOptions(excluded_dirs=DiscoveryOptions().excluded_dirs | {"tasks"})
+
+        files = discover_workspace_files(workspace, options)
+
+        assert relative(files.python_files, workspace) == ["notes/hx_requests.py"]
+
+    def test_symlink_cycles_terminate(self, workspace):
+        """Should not loop forever on symlinked directories."""
+        (workspace / "notes" / "templates" / "loop").symlink_to(workspace / "notes")
+
+        files = discover_workspace_files(workspace)
+
+        assert "notes/templates/notes/list.html" in relative(files.template_files, workspace)
+
+
+class TestGitIgnore:
+    """Tests for GitIgnore class."""
+
+    def test_pattern_semantics(self, tmp_path):
+        """Should apply anchoring, directory-only, wildcard and negation rules."""
+        base = str(tmp_path)
+        gitignore = GitIgnore(base, ["/dist", "cache/", "**/tmp/*.html", "*.log", "!keep.log"])
+
+        assert gitignore.match(f"{base}/dist", is_dir=True) is True
+        assert gitignore.match(f"{base}/app/dist", is_dir=True) is None
+        assert gitignore.match(f"{base}/app/cache", is_dir=True) is True
+        assert gitignore.match(f"{base}/app/cache", is_dir=False) is None
+        assert gitignore.match(f"{base}/a/b/tmp/x.html", is_dir=False) is True
+        assert gitignore.match(f"{base}/a/debug.log", is_dir=False) is True
+        assert gitignore.match(f"{base}/a/keep.log", is_dir=False) is False
+
+
+class TestDiscoverySettings:
+    """Tests for discovery options read from initializationOptions."""
+
+    def test_reads_discovery_options(self):
+        """Should extend the defaults with the client's options."""
+        settings = ServerSettings.from_initialization_options(
+            {
+                "excludeDirs": ["vendor"],
+                "templateDirs": ["templates_extra"],
+                "templateExtensions": ["txt", ".jinja"],
+                "useGitignore": False,
+            }
+        )
+
+        discovery = settings.discovery
+        assert "vendor" in discovery.excluded_dirs
+        assert "node_modules" in discovery.excluded_dirs
+        assert discovery.template_dirs == ["templates_extra"]
+        assert discovery.template_extensions == (".html", ".txt", ".jinja")
+        assert discovery.use_gitignore is False
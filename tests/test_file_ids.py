@@ -0,0 +1,53 @@
+"""Tests for the file_ids module."""
+
+from hx_requests_lsp.file_ids import FileIdTable
+
+
+class TestFileIdTable:
+    """Tests for FileIdTable class."""
+
+    def test_same_file_gets_same_id(self, tmp_path):
+        """Every spelling of a file should map to one ID."""
+        path = tmp_path / "page.html"
+        path.write_text("")
+        (tmp_path / "link").symlink_to(tmp_path)
+        table = FileIdTable()
+
+        file_id = table.get_id(path)
+
+        assert table.get_id(str(path)) == file_id
+        assert table.get_id(f"file://{path}") == file_id
+        assert table.get_id(tmp_path / "link" / "page.html") == file_id
+        assert table.get_id(tmp_path / "other.html") != file_id
+        assert table.get_path(file_id) == str(path.resolve())
+
+    def test_resolves_each_spelling_once(self, tmp_path):
+        """Repeated lookups should not resolve the path again."""
+        table = FileIdTable()
+
+        for _ in range(3):
+            table.get_id(tmp_path / "page.html")
+
+        assert table.resolve_count == 1
+
+    def test_invalidate_file(self, tmp_path):
+        """Invalidated files should get a new ID and lose their old path."""
+        table = FileIdTable()
+        old_id = table.get_id(tmp_path / "page.html")
+        other_id = table.get_id(tmp_path / "other.html")
+
+        assert table.invalidate(f"file://{tmp_path}/page.html") == [old_id]
+
+        assert table.get_path(old_id) is None
+        assert table.get_id(tmp_path / "page.html") != old_id
+        assert table.get_id(tmp_path / "other.html") == other_id
+
+    def test_invalidate_directory(self, tmp_path):
+        """Invalidating a directory should drop every file below it."""
+        table = FileIdTable()
+        inside = table.get_id(tmp_path / "templates" / "a.html")
+        nested = table.get_id(tmp_path / "templates" / "sub" / "b.html")
+        sibling = table.get_id(tmp_path / "templates_old" / "c.html")
+
+        assert sorted(table.invalidate(tmp_path / "templates")) == sorted([inside, nested])
+        assert table.get_path(sibling) is not None
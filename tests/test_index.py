@@ -1,6 +1,7 @@
 """Tests for the index module."""
 
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
@@ -157,6 +158,38 @@ class NewRequest(BaseHxRequest):
         # Should have more usages now (3 in list.html + 1 in detail.html)
         assert len(index.get_usages("edit_modal")) == 4
 
+    def test_update_file_python_keeps_definitions_on_syntax_error(self, temp_workspace):
+        """Should keep the last good definitions while the buffer has syntax errors."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+
+        hx_file = temp_workspace / "app" / "hx_requests" / "views.py"
+        content = hx_file.read_text()
+        index.update_file(hx_file, content)
+        index.update_file(hx_file, content.replace('name = "notes_count"', "name = ("))
+
+        assert index.get_definition("notes_count") is not None
+        assert index.get_definition("edit_modal") is not None
+
+        index.update_file(hx_file, content.replace("notes_count", "notes_total"))
+
+        assert index.get_definition("notes_count") is None
+        assert index.get_definition("notes_total") is not None
+
+    def test_update_file_skips_unchanged_content(self, temp_workspace):
+        """Should not re-index content identical to what is indexed."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        hx_file = temp_workspace / "app" / "hx_requests" / "views.py"
+        epoch = index.definitions_epoch
+
+        assert index.update_file(hx_file, hx_file.read_text(), version=3) is False
+        assert index.update_file(hx_file) is False
+
+        assert index.definitions_epoch == epoch
+        assert index.get_file_version(hx_file) == 3
+        assert index.update_file(hx_file, hx_file.read_text() + "\n") is True
+
     def test_remove_file(self, temp_workspace):
         """Should remove file from index."""
         index = HxRequestIndex(temp_workspace)
@@ -170,6 +203,28 @@ class NewRequest(BaseHxRequest):
         assert index.get_definition("notes_count") is None
         assert index.get_definition("edit_modal") is None
 
+    def test_remove_directory(self, temp_workspace):
+        """Should remove every file below a removed directory."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+
+        index.remove_file(temp_workspace / "app" / "templates")
+
+        assert index.get_usages("edit_modal") == []
+        assert index.get_definition("edit_modal") is not None
+
+    def test_removed_file_can_be_indexed_again(self, temp_workspace):
+        """A new file at a removed path should be indexed afresh."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+
+        index.remove_file(template_file)
+        index.update_file(template_file, "{% hx_get 'notes_count' %}")
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["notes_count"]
+        assert len(index.get_usages("edit_modal")) == 1
+
     def test_get_definitions_in_file(self, temp_workspace):
         """Should return definitions from a specific file."""
         index = HxRequestIndex(temp_workspace)
@@ -194,6 +249,32 @@ class NewRequest(BaseHxRequest):
         assert "edit_modal" in names
         assert "undefined_action" in names
 
+    def test_get_usage_at_position(self, temp_workspace):
+        """Should find the usage whose name is under the cursor."""
+        index = HxRequestIndex(temp_workspace)
+        template_file = temp_workspace / "app" / "templates" / "app" / "page.html"
+        index.update_file(
+            template_file,
+            "<p>\n{% hx_get 'first' %} {% hx_post 'second' %}\n{% hx_vals a=1\n   hx_request_name='third' %}",
+        )
+
+        assert index.get_usage_at_position(template_file, 2, 11).name == "first"
+        assert index.get_usage_at_position(template_file, 2, 15).name == "first"
+        assert index.get_usage_at_position(template_file, 2, 34).name == "second"
+        assert index.get_usage_at_position(template_file, 4, 20).name == "third"
+
+    def test_get_usage_at_position_outside_names(self, temp_workspace):
+        """Should return None when the cursor isn't on a name."""
+        index = HxRequestIndex(temp_workspace)
+        template_file = temp_workspace / "app" / "templates" / "app" / "page.html"
+        index.update_file(template_file, "<p>\n{% hx_get 'first' %}")
+
+        assert index.get_usage_at_position(template_file, 1, 0) is None
+        assert index.get_usage_at_position(template_file, 2, 10) is None
+        assert index.get_usage_at_position(template_file, 2, 16) is None
+        assert index.get_usage_at_position(template_file, 3, 0) is None
+        assert index.get_usage_at_position(temp_workspace / "other.html", 2, 11) is None
+
     def test_thread_safety(self, temp_workspace):
         """Index operations should be thread-safe."""
         import threading
@@ -233,3 +314,307 @@ class NewRequest(BaseHxRequest):
             t.join()
 
         assert errors == [], f"Thread safety errors: {errors}"
+
+
+class TestBufferOverlay:
+    """Tests for open-buffer entries overlaying disk entries."""
+
+    def test_close_reverts_to_disk_entries(self, temp_workspace):
+        """Closing a modified buffer should restore the entries indexed from disk."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+
+        index.update_file(template_file, "{% hx_get 'notes_count' %}", version=1)
+        assert index.has_buffer_overlay(template_file)
+        assert len(index.get_usages("edit_modal")) == 1
+
+        # The disk entries are restored from memory, not by reading the file again
+        template_file.write_text("")
+        assert index.close_buffer(template_file) is True
+
+        assert not index.has_buffer_overlay(template_file)
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["edit_modal"]
+        assert len(index.get_usages("edit_modal")) == 2
+        assert index.get_usages("notes_count")[0].file_path != str(template_file.resolve())
+        assert index.get_file_version(template_file) is None
+
+    def test_close_reverts_python_definitions(self, temp_workspace):
+        """Closing a modified Python buffer should restore its disk definitions."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        hx_file = temp_workspace / "app" / "hx_requests" / "views.py"
+
+        index.update_file(hx_file, hx_file.read_text().replace("notes_count", "notes_total"), version=1)
+        assert index.get_definition("notes_count") is None
+
+        index.close_buffer(hx_file)
+
+        assert index.get_definition("notes_count") is not None
+        assert index.get_definition("notes_total") is None
+
+    def test_buffer_matching_disk_has_no_overlay(self, temp_workspace):
+        """Opening a file without changing it should not set disk entries aside."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+
+        index.update_file(template_file, template_file.read_text(), version=1)
+
+        assert not index.has_buffer_overlay(template_file)
+        assert index.close_buffer(template_file) is False
+
+    def test_disk_updates_stay_under_open_buffer(self, temp_workspace):
+        """Disk updates should not replace an open buffer, but apply once it is closed."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+
+        index.update_file(template_file, "{% hx_get 'from_buffer' %}", version=1)
+        template_file.write_text("{% hx_get 'changed_on_disk' %}")
+        assert index.update_file(template_file) is False
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["from_buffer"]
+
+        index.close_buffer(template_file)
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["changed_on_disk"]
+
+    def test_saved_buffer_survives_close(self, temp_workspace):
+        """After a save, closing the buffer should keep the saved entries."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+        content = "{% hx_get 'saved' %}"
+
+        index.update_file(template_file, content, version=1)
+        template_file.write_text(content)
+        index.update_file(template_file, content)
+        index.close_buffer(template_file)
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["saved"]
+
+    def test_saved_text_replaces_buffer_and_disk_entries(self, temp_workspace):
+        """A save should update the buffer's entries as well as those set aside for disk."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+
+        index.update_file(template_file, "{% hx_get 'b' %}", version=1)
+        assert index.update_file(template_file, "{% hx_get 'c' %}", version=2, saved=True) is True
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["c"]
+        index.close_buffer(template_file)
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["c"]
+
+    def test_stale_save_only_updates_disk_entries(self, temp_workspace):
+        """A save of an older version than the buffer's should leave the buffer's entries alone."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+
+        index.update_file(template_file, "{% hx_get 'b' %}", version=3)
+        assert index.update_file(template_file, "{% hx_get 'c' %}", version=2, saved=True) is False
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["b"]
+        index.close_buffer(template_file)
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["c"]
+
+    def test_close_unsaved_new_file(self, temp_workspace):
+        """Closing a buffer for a file that was never on disk should drop it from the index."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "new.html"
+
+        index.update_file(template_file, "{% hx_get 'draft' %}", version=1)
+        index.close_buffer(template_file)
+
+        assert index.get_usages_in_file(template_file) == []
+        assert index.get_usages("draft") == []
+
+    def test_rebuild_keeps_open_buffer(self, temp_workspace):
+        """A full build should keep an edited buffer and only refresh the disk entries under it."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+
+        index.update_file(template_file, "{% hx_get 'from_buffer' %}", version=3)
+        template_file.write_text("{% hx_get 'changed_on_disk' %}")
+        index.build_full_index()
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["from_buffer"]
+        assert index.get_file_version(template_file) == 3
+        assert index.has_buffer_overlay(template_file)
+
+        index.close_buffer(template_file)
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["changed_on_disk"]
+
+    def test_rebuild_keeps_open_python_buffer(self, temp_workspace):
+        """A full build should keep a Python buffer's definitions until it is closed."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        hx_file = temp_workspace / "app" / "hx_requests" / "views.py"
+        disk_source = hx_file.read_text()
+
+        index.update_file(hx_file, disk_source.replace("notes_count", "notes_total"), version=2)
+        hx_file.write_text(disk_source.replace("notes_count", "notes_sum"))
+        index.build_full_index()
+
+        assert index.get_definition("notes_total") is not None
+        assert index.get_definition("notes_sum") is None
+
+        index.close_buffer(hx_file)
+
+        assert index.get_definition("notes_sum") is not None
+        assert index.get_definition("notes_total") is None
+
+    @pytest.mark.parametrize("edited", [False, True])
+    def test_rebuild_keeps_files_saved_while_parsing(self, temp_workspace, edited):
+        """A full build should not replace files indexed after it parsed them, e.g. by a save."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        template_file = temp_workspace / "app" / "templates" / "app" / "detail.html"
+        saved = "{% hx_get 'saved' %}"
+        if edited:
+            index.update_file(template_file, "{% hx_get 'draft' %}", version=1)
+
+        class SaveWhileParsing(ThreadPoolExecutor):
+            def map(self, *args, **kwargs):
+                results = list(super().map(*args, **kwargs))
+                template_file.write_text(saved)
+                index.update_file(template_file, saved, version=2, saved=True)
+                return results
+
+        with SaveWhileParsing() as executor:
+            index.build_full_index(executor)
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["saved"]
+        index.close_buffer(template_file)
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["saved"]
+
+
+class TestLazyIndex:
+    """Tests for indexing templates one app at a time."""
+
+    @pytest.fixture
+    def workspace(self, temp_workspace):
+        """Add a second app whose template uses the first app's hx_requests."""
+        templates_dir = temp_workspace / "billing" / "templates" / "billing"
+        templates_dir.mkdir(parents=True)
+        (templates_dir / "invoice.html").write_text("<b {% hx_get 'notes_count' %}></b>\n")
+        return temp_workspace
+
+    def test_indexes_definitions_but_not_templates(self, workspace):
+        """Should index every definition, leaving each app's templates pending."""
+        index = HxRequestIndex(workspace)
+        index.build_lazy_index()
+
+        assert index.get_all_definition_names() == ["edit_modal", "notes_count"]
+        assert index.stats()["template_files"] == 0
+        assert index.stats()["pending_apps"] == 2
+
+    def test_indexes_app_of_opened_file(self, workspace):
+        """Should index the templates of an app once a file of it is asked for."""
+        index = HxRequestIndex(workspace)
+        index.build_lazy_index()
+        invoice = workspace / "billing" / "templates" / "billing" / "invoice.html"
+
+        assert index.has_pending_app(invoice)
+        assert index.index_app_of(invoice) == 1
+
+        assert not index.has_pending_app(invoice)
+        assert [u.name for u in index.get_usages_in_file(invoice)] == ["notes_count"]
+        assert index.stats()["pending_apps"] == 1
+        assert index.index_app_of(invoice) == 0
+
+    def test_indexes_apps_asked_for_before_build(self, workspace):
+        """Should index apps asked for before the build as part of it."""
+        index = HxRequestIndex(workspace)
+        invoice = workspace / "billing" / "templates" / "billing" / "invoice.html"
+
+        index.index_app_of(invoice)
+        index.build_lazy_index()
+
+        assert not index.has_pending_app(invoice)
+        assert index.stats()["template_files"] == 1
+
+    def test_usage_lookups_index_pending_apps(self, workspace):
+        """Should index every pending app before looking up all usages of a name."""
+        index = HxRequestIndex(workspace)
+        index.build_lazy_index()
+
+        assert len(index.get_usages("notes_count")) == 2
+        assert index.stats()["pending_apps"] == 0
+        assert [u.name for u in index.find_undefined_usages()] == ["undefined_action"]
+
+    def test_buffer_opened_before_app_is_indexed(self, workspace):
+        """Should keep an open buffer's entries and restore the disk entries on close."""
+        index = HxRequestIndex(workspace)
+        index.build_lazy_index()
+        invoice = workspace / "billing" / "templates" / "billing" / "invoice.html"
+
+        index.update_file(invoice, "{% hx_get 'edit_modal' %}", version=1)
+        index.index_app_of(invoice)
+
+        assert [u.name for u in index.get_usages_in_file(invoice)] == ["edit_modal"]
+        index.close_buffer(invoice)
+        assert [u.name for u in index.get_usages_in_file(invoice)] == ["notes_count"]
+
+
+class TestSearchDefinitions:
+    """Tests for searching definitions by name."""
+
+    def test_finds_by_name_and_class_name(self, temp_workspace):
+        """Should find definitions by either name, best matches first."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+
+        definitions, is_incomplete = index.search_definitions("EditMod", limit=10)
+
+        assert [d.name for d in definitions] == ["edit_modal"]
+        assert not is_incomplete
+
+    def test_follows_edits(self, temp_workspace):
+        """Should search the definitions as they are after a file changes."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        views = temp_workspace / "app" / "hx_requests" / "views.py"
+
+        index.update_file(
+            views,
+            "from hx_requests.hx_requests import BaseHxRequest\n\n"
+            "class NotesTotal(BaseHxRequest):\n    name = 'notes_total'\n",
+            version=2,
+        )
+
+        assert [d.name for d in index.search_definitions("notes", limit=10)[0]] == ["notes_total"]
+        assert index.search_definitions("modal", limit=10)[0] == []
+
+
+class TestSuggestNames:
+    """Tests for suggesting defined names in place of unknown ones."""
+
+    def test_suggests_closest_names(self, temp_workspace):
+        """Should suggest defined names a few edits away from an unknown one."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+
+        assert index.suggest_names("notes_cuont", limit=3) == ["notes_count"]
+        assert index.suggest_names("undefined_action", limit=3) == []
+
+    def test_follows_definition_changes(self, temp_workspace):
+        """Should drop cached suggestions once a definition changes."""
+        index = HxRequestIndex(temp_workspace)
+        index.build_full_index()
+        views = temp_workspace / "app" / "hx_requests" / "views.py"
+        assert index.suggest_names("notes_totl", limit=3) == []
+
+        index.update_file(
+            views,
+            "from hx_requests.hx_requests import BaseHxRequest\n\n"
+            "class NotesTotal(BaseHxRequest):\n    name = 'notes_total'\n",
+            version=2,
+        )
+
+        assert index.suggest_names("notes_totl", limit=3) == ["notes_total"]
@@ -0,0 +1,97 @@
+"""Tests for the metrics module."""
+
+import asyncio
+import json
+
+from lsprotocol import types as lsp
+
+from hx_requests_lsp.metrics import LatencyHistogram, Metrics, MetricsFileWriter, hit_rate
+from hx_requests_lsp.server import server
+
+
+class TestLatencyHistogram:
+    """Tests for the LatencyHistogram class."""
+
+    def test_percentiles_use_bucket_bounds(self):
+        """Should estimate percentiles as the upper bound of their bucket."""
+        histogram = LatencyHistogram(bounds_ms=(1, 10, 100))
+        for seconds in (0.0005,) * 90 + (0.05,) * 10:
+            histogram.record(seconds)
+
+        assert histogram.percentile(50) == 1
+        assert histogram.percentile(95) == 50
+        assert histogram.snapshot()["buckets"] == {"<=1": 90, "<=10": 0, "<=100": 10, "+Inf": 0}
+
+    def test_slow_durations_go_to_last_bucket(self):
+        """Should count durations above the last bound in the overflow bucket."""
+        histogram = LatencyHistogram(bounds_ms=(1, 10))
+        histogram.record(2.0)
+
+        assert histogram.snapshot()["buckets"]["+Inf"] == 1
+        assert histogram.percentile(99) == 2000
+
+    def test_empty_histogram(self):
+        """Should report zeros before anything is recorded."""
+        assert LatencyHistogram().snapshot()["p95_ms"] == 0.0
+
+
+class TestMetrics:
+    """Tests for the Metrics class."""
+
+    def test_timer_records_under_name(self):
+        """Should add a histogram per name."""
+        metrics = Metrics()
+        with metrics.timer("parse.template"):
+            pass
+        metrics.record("parse.template", 0.001)
+
+        assert metrics.snapshot()["parse.template"]["count"] == 2
+        assert metrics.get("parse.python") is None
+
+    def test_hit_rate(self):
+        """Should give the fraction of hits, or None without lookups."""
+        assert hit_rate(3, 1) == 0.75
+        assert hit_rate(0, 0) is None
+
+
+class TestMetricsFileWriter:
+    """Tests for the MetricsFileWriter class."""
+
+    def test_appends_json_lines(self, loop, tmp_path):
+        """Should append a line per interval and a last one on stop."""
+        path = tmp_path / "metrics.jsonl"
+        writer = MetricsFileWriter(str(path), lambda: {"requests": {}}, interval=0.01)
+
+        writer.start(loop)
+        loop.run_until_complete(asyncio.sleep(0.05))
+        writer.stop()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert len(lines) >= 2
+        assert set(lines[0]) == {"timestamp", "requests"}
+
+
+class TestServerMetrics:
+    """Tests for the server's request metrics."""
+
+    def test_records_handler_latency(self, loop):
+        """Should time registered handlers by LSP method."""
+        session = server.create_session(loop)
+        handler = session.lsp.fm.features[lsp.TEXT_DOCUMENT_DID_CLOSE]
+
+        handler(
+            lsp.DidCloseTextDocumentParams(
+                text_document=lsp.TextDocumentIdentifier(uri="file:///x.html")
+            )
+        )
+
+        stats = session.stats()
+        assert stats["requests"][lsp.TEXT_DOCUMENT_DID_CLOSE]["count"] == 1
+        assert stats["index"]["definitions"] == 0
+        assert "hit_rate" in stats["caches"]["completion"]
+
+    def test_registers_stats_command(self, loop):
+        """Should expose the stats through workspace/executeCommand, in daemon sessions too."""
+        session = server.create_session(loop)
+
+        assert "hxRequests.stats" in session.lsp.fm.commands
@@ -0,0 +1,85 @@
+"""Tests for the name_index module."""
+
+from hx_requests_lsp.name_index import NgramIndex
+
+
+def build(*names):
+    index = NgramIndex()
+    for name in names:
+        index.add(name, name)
+    return index
+
+
+class TestNgramIndex:
+    """Tests for the NgramIndex class."""
+
+    def test_ranks_exact_prefix_then_substring(self):
+        """Should rank exact matches first, then prefixes, then other substrings."""
+        index = build("count_notes", "notes_count", "notes", "notes_list")
+
+        result = index.search("notes", limit=10)
+
+        assert result.keys == ["notes", "notes_list", "notes_count", "count_notes"]
+        assert not result.is_incomplete
+
+    def test_matches_any_text_case_insensitively(self):
+        """Should match a key by any of its texts, ignoring case."""
+        index = NgramIndex()
+        index.add("notes_count", "notes_count", "NotesCountHxRequest")
+
+        assert index.search("CountHx", limit=10).keys == ["notes_count"]
+
+    def test_tolerates_typos(self):
+        """Should find names sharing most n-grams with a misspelled query."""
+        index = build("notes_count", "edit_modal", "delete_note")
+
+        assert index.search("notse_count", limit=10).keys == ["notes_count"]
+
+    def test_short_queries_scan_every_text(self):
+        """Should match queries shorter than an n-gram by substring."""
+        index = build("notes_count", "edit_modal")
+
+        assert index.search("mo", limit=10).keys == ["edit_modal"]
+
+    def test_caps_results(self):
+        """Should return at most the limit, flagging that more matched."""
+        index = build(*(f"notes_{i}" for i in range(5)))
+
+        result = index.search("notes", limit=3)
+
+        assert result.keys == ["notes_0", "notes_1", "notes_2"]
+        assert result.is_incomplete
+        assert index.search("", limit=10).keys == [f"notes_{i}" for i in range(5)]
+
+    def test_replaces_and_removes_keys(self):
+        """Should forget the old texts of a key re-added under new ones, and removed keys."""
+        index = build("notes_count", "edit_modal")
+
+        index.add("notes_count", "tally")
+        index.remove("edit_modal")
+
+        assert index.search("notes", limit=10).keys == []
+        assert index.search("modal", limit=10).keys == []
+        assert index.search("tally", limit=10).keys == ["notes_count"]
+        assert len(index) == 1
+        assert index._postings.keys() == {"tal", "all", "lly"}
+
+    def test_nearest_by_edit_distance(self):
+        """Should suggest the keys fewest edits away, counting a swap of two letters as one."""
+        index = build("notes_count", "notes_counts", "edit_modal", "delete_note")
+
+        assert index.nearest("notse_count", limit=3, max_distance=2) == ["notes_count", "notes_counts"]
+        assert index.nearest("edit_modl", limit=3, max_distance=1) == ["edit_modal"]
+        assert index.nearest("archive", limit=3, max_distance=2) == []
+
+    def test_nearest_short_queries(self):
+        """Should compare every key when the query is too short to filter by n-grams."""
+        index = build("row", "rows", "table")
+
+        assert index.nearest("rwo", limit=3, max_distance=1) == ["row"]
+
+    def test_ranks_typos_by_shared_ngrams(self):
+        """Should rank names sharing more of a misspelled query's n-grams above shorter ones."""
+        index = build("user_prof", "user_profile_edit")
+
+        assert index.search("user_profle_edit", limit=10).keys == ["user_profile_edit", "user_prof"]
@@ -0,0 +1,131 @@
+"""Tests for the pipeline module."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hx_requests_lsp.index import HxRequestIndex
+from hx_requests_lsp.pipeline import ParsePipeline
+
+
+@pytest.fixture
+def template_file(make_workspace):
+    """Create a template file inside a workspace."""
+    root = make_workspace({"app/templates/page.html": "{% hx_post 'on_disk' %}"})
+    return root / "app" / "templates" / "page.html"
+
+
+class SlowFirstIndex(HxRequestIndex):
+    """Index whose first parse blocks until released."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+        self._calls = 0
+
+    def parse_file(self, file_path, content=None, version=None, saved=False):
+        self._calls += 1
+        if self._calls == 1:
+            self.release.wait(timeout=5)
+        return super().parse_file(file_path, content, version, saved)
+
+
+class TestParsePipeline:
+    """Tests for ParsePipeline class."""
+
+    def test_applies_update_inline_without_executor(self, template_file):
+        """Should parse and apply synchronously when no executor is given."""
+        index = HxRequestIndex(template_file.parent)
+        pipeline = ParsePipeline(index)
+
+        future = pipeline.submit(template_file, "{% hx_get 'fresh' %}", version=1)
+
+        assert future.result() is True
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["fresh"]
+        assert index.get_file_version(template_file) == 1
+
+    def test_discards_stale_results(self, template_file):
+        """A slow parse of an old version should not overwrite a newer one."""
+        index = SlowFirstIndex(template_file.parent)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pipeline = ParsePipeline(index, executor)
+
+            old = pipeline.submit(template_file, "{% hx_get 'old' %}", version=1)
+            new = pipeline.submit(template_file, "{% hx_get 'new' %}", version=2)
+            assert new.result(timeout=5) is True
+
+            index.release.set()
+            assert old.result(timeout=5) is False
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["new"]
+        assert pipeline.stats() == {"applied": 1, "unchanged": 0, "discarded": 1}
+
+    def test_calls_on_applied(self, template_file):
+        """Should notify only for results that were applied."""
+        index = HxRequestIndex(template_file.parent)
+        pipeline = ParsePipeline(index)
+        applied = []
+
+        pipeline.submit(
+            template_file, "{% hx_get 'a' %}", version=1, on_applied=lambda: applied.append(1)
+        )
+
+        assert applied == [1]
+
+    def test_skips_unchanged_content(self, template_file):
+        """Should not re-apply content identical to what is indexed."""
+        index = HxRequestIndex(template_file.parent)
+        pipeline = ParsePipeline(index)
+        applied = []
+        unchanged = []
+
+        for version in (1, 2):
+            future = pipeline.submit(
+                template_file,
+                "{% hx_get 'a' %}",
+                version=version,
+                on_applied=lambda: applied.append(1),
+                on_unchanged=lambda: unchanged.append(1),
+            )
+
+        assert future.result() is False
+        assert applied == [1]
+        assert unchanged == [1]
+        assert index.get_file_version(template_file) == 2
+        assert pipeline.stats() == {"applied": 1, "unchanged": 1, "discarded": 0}
+
+    def test_forget_resets_version_sequence(self, template_file):
+        """After forgetting a file, lower versions should be accepted again."""
+        index = HxRequestIndex(template_file.parent)
+        pipeline = ParsePipeline(index)
+
+        pipeline.submit(template_file, "{% hx_get 'a' %}", version=5)
+        pipeline.forget(template_file)
+        future = pipeline.submit(template_file, "{% hx_get 'b' %}", version=1)
+
+        assert future.result() is True
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["b"]
+
+
+class TestIndexVersions:
+    """Tests for version checks when applying parse results."""
+
+    def test_rejects_older_version(self, template_file):
+        """Should not apply a result older than the indexed version."""
+        index = HxRequestIndex(template_file.parent)
+
+        assert index.update_file(template_file, "{% hx_get 'v2' %}", version=2) is True
+        assert index.update_file(template_file, "{% hx_get 'v1' %}", version=1) is False
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["v2"]
+
+    def test_unversioned_updates_apply_without_open_buffer(self, template_file):
+        """Updates without a version (e.g. from disk) should apply when no buffer overlays them."""
+        index = HxRequestIndex(template_file.parent)
+        index.update_file(template_file, "{% hx_get 'old' %}")
+
+        assert index.update_file(template_file) is True
+
+        assert [u.name for u in index.get_usages_in_file(template_file)] == ["on_disk"]
+        assert index.get_file_version(template_file) is None
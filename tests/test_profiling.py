@@ -0,0 +1,99 @@
+"""Tests for the profiling module."""
+
+import pstats
+import tracemalloc
+
+import pytest
+from lsprotocol import types as lsp
+
+from hx_requests_lsp.profiling import Profiler
+from hx_requests_lsp.server import MEMORY_SNAPSHOT_COMMAND, server
+
+
+def busy_work(n):
+    return sum(i * i for i in range(n))
+
+
+@pytest.fixture
+def tracing():
+    """Trace allocations for the duration of a test."""
+    already_tracing = tracemalloc.is_tracing()
+    yield
+    if not already_tracing:
+        tracemalloc.stop()
+
+
+class TestProfiler:
+    """Tests for the Profiler class."""
+
+    def test_samples_evenly(self, tmp_path):
+        """Should pick the given fraction of requests, spread evenly."""
+        profiler = Profiler(str(tmp_path), sample_rate=0.25)
+
+        picked = [profiler.sample() is not None for _ in range(8)]
+
+        assert picked == [False, False, False, True] * 2
+
+    def test_writes_pstats_files(self, tmp_path):
+        """Should write profiles that pstats can load, named after what was profiled."""
+        profiler = Profiler(str(tmp_path))
+
+        assert profiler.profiled("textDocument/references", busy_work)(1000) == busy_work(1000)
+
+        [path] = tmp_path.glob("*.prof")
+        assert path.name.endswith("-textDocument-references.prof")
+        stats = pstats.Stats(str(path))
+        assert any(func[2] == "busy_work" for func in stats.stats)
+
+    def test_skips_overlapping_profiles(self, tmp_path):
+        """Should run work unprofiled while another profile is being collected."""
+        profiler = Profiler(str(tmp_path))
+        inner = profiler.profiled("inner", busy_work)
+
+        profiler.profiled("outer", inner)(1000)
+
+        assert [path.name.split("-")[-1] for path in tmp_path.glob("*.prof")] == ["outer.prof"]
+
+    def test_writes_memory_snapshots(self, tmp_path, tracing):
+        """Should write snapshots that tracemalloc can load and report the biggest allocations."""
+        profiler = Profiler(str(tmp_path), trace_memory=True)
+        profiler.start()
+        data = [str(i) for i in range(10000)]
+
+        snapshot = profiler.take_snapshot("manual")
+
+        assert snapshot["path"].endswith("-manual.tracemalloc")
+        assert snapshot["traced_bytes"] > 0
+        assert snapshot["top"][0]["size_bytes"] > 0
+        assert tracemalloc.Snapshot.load(snapshot["path"]).traces
+        del data
+
+    def test_no_snapshot_without_tracing(self, tmp_path):
+        """Should not take snapshots unless memory tracing was asked for."""
+        assert Profiler(str(tmp_path)).take_snapshot("manual") is None
+
+
+class TestServerProfiling:
+    """Tests for profiling LSP handlers."""
+
+    def test_profiles_sampled_handlers(self, loop, tmp_path):
+        """Should write a profile for each sampled request."""
+        session = server.create_session(loop)
+        session.profiler = Profiler(str(tmp_path), sample_rate=1.0)
+        handler = session.lsp.fm.features[lsp.TEXT_DOCUMENT_DID_CLOSE]
+
+        handler(
+            lsp.DidCloseTextDocumentParams(
+                text_document=lsp.TextDocumentIdentifier(uri="file:///x.html")
+            )
+        )
+
+        [path] = tmp_path.glob("*.prof")
+        assert path.name.endswith("-textDocument-didClose.prof")
+
+    def test_memory_snapshot_command_needs_tracing(self, loop):
+        """Should refuse to take a snapshot when memory tracing is off."""
+        session = server.create_session(loop)
+
+        with pytest.raises(RuntimeError):
+            session.lsp.fm.commands[MEMORY_SNAPSHOT_COMMAND]()
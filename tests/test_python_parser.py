@@ -6,6 +6,8 @@ from hx_requests_lsp.python_parser import (
     BaseClassInfo,
     HxRequestDefinition,
     parse_hx_requests_from_source,
+    parse_python_module,
+    reparse_python_module,
 )
 
 
@@ -222,3 +224,87 @@ class LocalHxRequest(LocalBaseHxRequest):
         assert base_info.name == "LocalBaseHxRequest"
         assert base_info.file_path == str(test_file.resolve())
         assert base_info.line_number == 2
+
+
+class TestReparsePythonModule:
+    """Tests for incremental re-parsing with reparse_python_module."""
+
+    SOURCE = """from hx_requests.hx_requests import BaseHxRequest
+
+class FirstRequest(BaseHxRequest):
+    name = "first"
+
+class SecondRequest(BaseHxRequest):
+    name = "second"
+
+class ThirdRequest(BaseHxRequest):
+    name = "third"
+"""
+
+    def test_edit_inside_class_matches_full_parse(self):
+        """Should produce the same definitions as a full parse for an edit inside a class."""
+        previous = parse_python_module(self.SOURCE)
+        source = self.SOURCE.replace(
+            'name = "second"', 'name = "renamed"\n    GET_template = "second.html"'
+        )
+
+        snapshot = reparse_python_module(source, "<string>", previous)
+        expected = parse_python_module(source).definitions
+
+        assert [(d.name, d.line_number, d.end_line_number) for d in snapshot.definitions] == [
+            (d.name, d.line_number, d.end_line_number) for d in expected
+        ]
+        renamed = next(d for d in snapshot.definitions if d.name == "renamed")
+        assert renamed.get_template == "second.html"
+        third = next(d for d in snapshot.definitions if d.name == "third")
+        assert third.line_number == 10
+
+    def test_unaffected_definitions_are_reused(self):
+        """Definitions before the edited class should be reused as-is."""
+        previous = parse_python_module(self.SOURCE)
+        source = self.SOURCE.replace('name = "third"', 'name = "third_v2"')
+
+        snapshot = reparse_python_module(source, "<string>", previous)
+
+        assert snapshot.definitions[0] is previous.definitions[0]
+        assert {d.name for d in snapshot.definitions} == {"first", "second", "third_v2"}
+
+    def test_edit_outside_class_falls_back_to_full_parse(self):
+        """Should fall back to a full parse when the edit is not inside a class."""
+        previous = parse_python_module(self.SOURCE)
+        source = self.SOURCE + '\nclass FourthRequest(BaseHxRequest):\n    name = "fourth"\n'
+
+        snapshot = reparse_python_module(source, "<string>", previous)
+
+        assert {d.name for d in snapshot.definitions} == {"first", "second", "third", "fourth"}
+
+    def test_dedented_insertion_falls_back_to_full_parse(self):
+        """An edit that moves code out of the class should not be parsed incrementally."""
+        previous = parse_python_module(self.SOURCE)
+        source = self.SOURCE.replace(
+            '    name = "first"\n', '    name = "first"\n\ndef helper():\n    pass\n'
+        )
+
+        snapshot = reparse_python_module(source, "<string>", previous)
+
+        assert snapshot.definitions == parse_python_module(source).definitions
+
+    def test_form_feed_keeps_line_numbers(self):
+        """Should not count a form feed, which isn't a line break for Python, as a new line."""
+        previous = parse_python_module(self.SOURCE)
+        source = self.SOURCE.replace('name = "first"', 'name = "first"  # \x0c')
+
+        snapshot = reparse_python_module(source, "<string>", previous)
+        expected = parse_python_module(source).definitions
+
+        assert [(d.name, d.line_number, d.end_line_number) for d in snapshot.definitions] == [
+            (d.name, d.line_number, d.end_line_number) for d in expected
+        ]
+
+    def test_raises_on_syntax_error(self):
+        """Should raise SyntaxError so callers can keep the last good state."""
+        previous = parse_python_module(self.SOURCE)
+        source = self.SOURCE.replace('name = "second"', 'name = "second')
+
+        with pytest.raises(SyntaxError):
+            reparse_python_module(source, "<string>", previous)
@@ -0,0 +1,116 @@
+"""Tests for the recording module."""
+
+import json
+
+import pytest
+
+from hx_requests_lsp.recording import (
+    SessionRecorder,
+    read_recording,
+    rebase_messages,
+    recorded_root,
+    replay,
+)
+
+
+def frame(message):
+    body = json.dumps(message).encode()
+    return b"Content-Length: %d\r\n\r\n" % len(body) + body
+
+
+def session(root):
+    """Client messages of a short editing session."""
+    uri = (root / "app" / "templates" / "list.html").as_uri()
+    text = "<b {% hx_get 'notes_count' %}></b>\n"
+    position = {"textDocument": {"uri": uri}, "position": {"line": 0, "character": 16}}
+    return [
+        (0.0, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {"rootUri": root.as_uri(), "capabilities": {}}}),
+        (0.01, {"jsonrpc": "2.0", "method": "initialized", "params": {}}),
+        (0.02, {"jsonrpc": "2.0", "method": "textDocument/didOpen", "params": {"textDocument": {"uri": uri, "languageId": "html", "version": 1, "text": text}}}),
+        (0.03, {"jsonrpc": "2.0", "id": 2, "method": "textDocument/hover", "params": position}),
+        (0.04, {"jsonrpc": "2.0", "id": 3, "method": "textDocument/references", "params": {**position, "context": {"includeDeclaration": True}}}),
+        (0.05, {"jsonrpc": "2.0", "id": 4, "method": "shutdown"}),
+        (0.06, {"jsonrpc": "2.0", "method": "exit"}),
+    ]  # fmt: skip
+
+
+class TestSessionRecorder:
+    """Tests for the SessionRecorder class."""
+
+    def test_records_messages_split_across_reads(self, tmp_path):
+        """Should record each complete message, however the data is chunked."""
+        path = tmp_path / "session.jsonl"
+        recorder = SessionRecorder(path, "1.0")
+        data = frame({"jsonrpc": "2.0", "method": "initialized"}) + frame(
+            {"jsonrpc": "2.0", "id": 1, "method": "shutdown"}
+        )
+
+        recorder.feed(data[:10])
+        recorder.feed(data[10:60])
+        recorder.feed(data[60:])
+        recorder.close()
+
+        header, messages = read_recording(path)
+        assert header["server_version"] == "1.0"
+        assert [m["method"] for _, m in messages] == ["initialized", "shutdown"]
+
+    def test_attach_passes_data_on(self, tmp_path):
+        """Should hand received data to the protocol unchanged."""
+
+        class Protocol:
+            def __init__(self):
+                self.received = []
+
+            def data_received(self, data):
+                self.received.append(data)
+
+        protocol = Protocol()
+        recorder = SessionRecorder(tmp_path / "session.jsonl", "1.0")
+        recorder.attach(protocol)
+
+        protocol.data_received(frame({"jsonrpc": "2.0", "method": "initialized"}))
+
+        assert len(protocol.received) == 1
+        assert len(read_recording(tmp_path / "session.jsonl")[1]) == 1
+
+    def test_rejects_other_files(self, tmp_path):
+        """Should refuse files that aren't recordings."""
+        path = tmp_path / "other.jsonl"
+        path.write_text('{"t": 0, "message": {}}\n')
+
+        with pytest.raises(ValueError):
+            read_recording(path)
+
+
+class TestRebaseMessages:
+    """Tests for the rebase_messages function."""
+
+    def test_moves_uris_and_paths(self, tmp_path):
+        """Should point URIs and paths at the new root, leaving similar paths alone."""
+        messages = [
+            (0.0, {"rootUri": "file:///work/ws", "rootPath": "/work/ws", "other": "/work/ws2/a.html"})
+        ]
+
+        [(_, rebased)] = rebase_messages(messages, "/work/ws", "/home/me/ws")
+
+        assert rebased == {
+            "rootUri": "file:///home/me/ws",
+            "rootPath": "/home/me/ws",
+            "other": "/work/ws2/a.html",
+        }
+        assert recorded_root([(0.0, {"method": "initialize", "params": rebased})]) == "/home/me/ws"
+
+
+class TestReplay:
+    """Tests for the replay function."""
+
+    def test_reports_latency_per_method(self, workspace):
+        """Should answer every replayed request and report latencies and bytes by method."""
+        report = replay(session(workspace), speed=0, timeout=10)
+
+        summary = report.summary()
+        assert report.unanswered == []
+        assert summary["methods"]["textDocument/hover"]["requests"] == 1
+        assert summary["methods"]["textDocument/references"]["bytes_sent"] > 0
+        assert "shutdown" not in summary["methods"]
+        assert summary["bytes_sent"] > 0
@@ -0,0 +1,74 @@
+"""Tests for the relay module."""
+
+import os
+import socket
+import stat
+import tempfile
+
+import pytest
+
+from hx_requests_lsp.relay import connect_to_daemon, default_socket_path
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    """Make a fresh directory the temp directory, and unset $XDG_RUNTIME_DIR."""
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def listening_socket(tmp_path):
+    """Listen on a Unix socket, like a daemon would."""
+    path = tmp_path / "daemon.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(str(path))
+        sock.listen()
+        yield path
+
+
+class TestDefaultSocketPath:
+    """Tests for default_socket_path."""
+
+    def test_uses_runtime_dir(self, tmp_path, monkeypatch):
+        """Should put the socket in $XDG_RUNTIME_DIR if it is set."""
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+
+        assert os.path.dirname(default_socket_path()) == str(tmp_path)
+
+    def test_makes_private_temp_dir(self, temp_dir):
+        """Should put the socket in a directory of the temp directory only the user can enter."""
+        socket_dir = os.path.dirname(default_socket_path())
+
+        assert os.path.dirname(socket_dir) == str(temp_dir)
+        assert stat.S_IMODE(os.stat(socket_dir).st_mode) == 0o700
+        assert os.path.dirname(default_socket_path()) == socket_dir
+
+    def test_rejects_shared_temp_dir(self, temp_dir):
+        """Should refuse a directory other users can access, e.g. one they made first."""
+        socket_dir = temp_dir / f"hx-requests-lsp-{os.getuid()}"
+        socket_dir.mkdir()
+        socket_dir.chmod(0o777)
+
+        with pytest.raises(PermissionError, match="mode 0700"):
+            default_socket_path()
+
+
+class TestConnectToDaemon:
+    """Tests for connect_to_daemon."""
+
+    def test_connects_to_own_daemon(self, listening_socket):
+        """Should connect to a daemon run by the same user."""
+        with connect_to_daemon(str(listening_socket)) as sock:
+            assert sock.getpeername() == str(listening_socket)
+
+    def test_refuses_daemon_of_other_user(self, listening_socket, monkeypatch):
+        """Should neither relay to a daemon run by another user nor start one of its own."""
+        uid = os.getuid()
+        monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+
+        with pytest.raises(PermissionError, match="another user"):
+            connect_to_daemon(str(listening_socket), ["hx-requests-lsp", "--daemon"])
+
+        assert not os.path.exists(f"{listening_socket}.log")
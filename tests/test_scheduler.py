@@ -0,0 +1,85 @@
+"""Tests for the scheduler module."""
+
+import asyncio
+
+import pytest
+
+from hx_requests_lsp.scheduler import DebounceScheduler
+
+
+class TestDebounceScheduler:
+    """Tests for DebounceScheduler class."""
+
+    @pytest.mark.asyncio
+    async def test_runs_only_latest_work(self):
+        """Should drop superseded work and run only the latest version."""
+        scheduler = DebounceScheduler(delay=0.01)
+        calls = []
+
+        for version in range(5):
+            scheduler.schedule("file:///a.html", calls.append, version)
+        await asyncio.sleep(0.05)
+
+        assert calls == [4]
+        assert scheduler.coalesced_count == 4
+        assert scheduler.executed_count == 1
+
+    @pytest.mark.asyncio
+    async def test_keys_are_independent(self):
+        """Work for different documents should not coalesce."""
+        scheduler = DebounceScheduler(delay=0.01)
+        calls = []
+
+        scheduler.schedule("file:///a.html", calls.append, "a")
+        scheduler.schedule("file:///b.html", calls.append, "b")
+        await asyncio.sleep(0.05)
+
+        assert sorted(calls) == ["a", "b"]
+        assert scheduler.coalesced_count == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_runs_pending_work_immediately(self):
+        """Should run pending work on flush and not run it again later."""
+        scheduler = DebounceScheduler(delay=10)
+        calls = []
+
+        scheduler.schedule("file:///a.html", calls.append, 1)
+        assert scheduler.has_pending("file:///a.html")
+
+        assert scheduler.flush("file:///a.html") is True
+        assert calls == [1]
+        assert not scheduler.has_pending("file:///a.html")
+        assert scheduler.flush("file:///a.html") is False
+
+    @pytest.mark.asyncio
+    async def test_cancel_drops_pending_work(self):
+        """Should not run cancelled work."""
+        scheduler = DebounceScheduler(delay=0.01)
+        calls = []
+
+        scheduler.schedule("file:///a.html", calls.append, 1)
+        assert scheduler.cancel("file:///a.html") is True
+        await asyncio.sleep(0.05)
+
+        assert calls == []
+
+    def test_runs_immediately_without_event_loop(self):
+        """Should run work synchronously when no event loop is running."""
+        scheduler = DebounceScheduler(delay=10)
+        calls = []
+
+        scheduler.schedule("file:///a.html", calls.append, 1)
+
+        assert calls == [1]
+        assert scheduler.stats()["executed"] == 1
+
+    def test_zero_delay_runs_immediately(self):
+        """A zero delay should disable debouncing."""
+        scheduler = DebounceScheduler(delay=0)
+        calls = []
+
+        async def run():
+            scheduler.schedule("file:///a.html", calls.append, 1)
+            assert calls == [1]
+
+        asyncio.run(run())
@@ -0,0 +1,316 @@
+"""Tests for the server module."""
+
+import asyncio
+import threading
+
+import pytest
+from lsprotocol import types as lsp
+from pygls.workspace import Workspace
+
+from hx_requests_lsp import server as server_module
+from hx_requests_lsp.server import (
+    UNKNOWN_HX_REQUEST,
+    DocumentSnapshot,
+    code_action,
+    completion_item_resolve,
+    completions,
+    definition,
+    did_change,
+    did_close,
+    did_open,
+    did_save,
+    references,
+    server,
+    workspace_symbol,
+)
+
+
+@pytest.fixture
+def workspace(make_workspace):
+    """Create a workspace with an hx_request used by templates of two apps."""
+    usage = "<b {% hx_get 'notes_count' %}></b>\n"
+    return make_workspace(
+        {
+            "notes/hx_requests/views.py": {"NotesCount": "notes_count"},
+            **{
+                f"{app}/templates/{page}.html": usage
+                for app in ("accounts", "notes")
+                for page in ("list", "detail")
+            },
+        }
+    )
+
+
+@pytest.fixture
+def session(loop, workspace):
+    """Create a server session with the workspace indexed, recording the notifications it sends."""
+    session = server.create_session(loop)
+    session.lsp._workspace = Workspace(workspace.as_uri())
+    session.attach_workspace(str(workspace))
+    session.index.build_full_index()
+    session.notifications = []
+    session.lsp.notify = lambda method, params=None: session.notifications.append((method, params))
+    yield session
+    session.executor.shutdown()
+
+
+def reference_params(path, **tokens):
+    return lsp.ReferenceParams(
+        text_document=lsp.TextDocumentIdentifier(uri=path.as_uri()),
+        position=lsp.Position(line=0, character=16),
+        context=lsp.ReferenceContext(include_declaration=True),
+        **tokens,
+    )
+
+
+def definition_params(path):
+    return lsp.DefinitionParams(
+        text_document=lsp.TextDocumentIdentifier(uri=path.as_uri()),
+        position=lsp.Position(line=0, character=16),
+    )
+
+
+class TestDocumentSnapshot:
+    """Tests for the DocumentSnapshot class."""
+
+    @pytest.mark.parametrize("source", ["", "one", "one\ntwo", "one\r\ntwo\n", "\n\nthree\n"])
+    def test_lines_match_split_text(self, source):
+        """Should look up the lines the text splits into, and none past its end."""
+        snapshot = DocumentSnapshot(source=source)
+        lines = source.splitlines(True)
+
+        assert [snapshot.line(i) for i in range(len(lines) + 2)] == lines + ["", ""]
+
+
+class TestDidSave:
+    """Tests for the save handler."""
+
+    def test_save_during_debounce(self, loop, session, workspace):
+        """Should index the saved text of an open document whose last edit was still debounced."""
+        template = workspace / "notes" / "templates" / "list.html"
+        uri = template.as_uri()
+        file_path = session.uri_to_path(uri)
+
+        def edit(version, text):
+            document = lsp.VersionedTextDocumentIdentifier(uri=uri, version=version)
+            changes = [lsp.TextDocumentContentChangeEvent_Type2(text=text)]
+            session.workspace.update_text_document(document, changes[0])
+            did_change(session, lsp.DidChangeTextDocumentParams(document, changes))
+
+        async def open_edit_and_save():
+            document = lsp.TextDocumentItem(
+                uri=uri, language_id="html", version=1, text=template.read_text()
+            )
+            session.workspace.put_text_document(document)
+            did_open(session, lsp.DidOpenTextDocumentParams(text_document=document))
+            edit(2, "{% hx_get 'notes_draft' %}")
+            await session.wait_for_index(uri)
+            edit(3, "{% hx_get 'notes_saved' %}")
+            assert session.scheduler.has_pending(uri)
+
+            did_save(
+                session,
+                lsp.DidSaveTextDocumentParams(
+                    lsp.TextDocumentIdentifier(uri), "{% hx_get 'notes_saved' %}"
+                ),
+            )
+            await asyncio.wrap_future(session.pipeline.pending(file_path))
+            await asyncio.sleep(0)
+
+        loop.run_until_complete(open_edit_and_save())
+
+        assert [u.name for u in session.index.get_usages_in_file(template)] == ["notes_saved"]
+        method, params = session.notifications[-1]
+        assert method == lsp.TEXT_DOCUMENT_PUBLISH_DIAGNOSTICS
+        assert [d.message for d in params.diagnostics] == ["Unknown hx_request: 'notes_saved'"]
+
+        did_close(session, lsp.DidCloseTextDocumentParams(lsp.TextDocumentIdentifier(uri)))
+
+        assert [u.name for u in session.index.get_usages_in_file(template)] == ["notes_saved"]
+
+
+class TestWorkerPool:
+    """Tests for running request handlers on the worker pool."""
+
+    def test_runs_handler_work_on_pool(self, loop, session, workspace, monkeypatch):
+        """Should look things up on a worker thread, not the event loop's."""
+        threads = []
+        lookup = server_module._definition
+        monkeypatch.setattr(
+            server_module,
+            "_definition",
+            lambda *args: threads.append(threading.current_thread()) or lookup(*args),
+        )
+        params = definition_params(workspace / "notes" / "templates" / "list.html")
+
+        location = loop.run_until_complete(definition(session, params))
+
+        assert location.uri.endswith("views.py")
+        assert threads[0] is not threading.current_thread()
+        assert threads[0].name.startswith("hx-requests-lsp")
+
+    def test_cancelled_request_drops_queued_work(self, loop, session, workspace, monkeypatch):
+        """Should drop a cancelled request's work that is still waiting for a worker."""
+        calls = []
+        monkeypatch.setattr(server_module, "_definition", lambda *args: calls.append(args))
+        release = threading.Event()
+        for _ in range(session.settings.worker_threads):
+            session.executor.submit(release.wait)
+        params = definition_params(workspace / "notes" / "templates" / "list.html")
+
+        task = loop.create_task(definition(session, params))
+        loop.run_until_complete(asyncio.sleep(0.01))
+        task.cancel()
+        loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+        release.set()
+        session.executor.shutdown(wait=True)
+
+        assert task.cancelled()
+        assert calls == []
+
+
+class TestCompletions:
+    """Tests for the completion and completion resolve handlers."""
+
+    def test_resolve_fills_in_documentation(self, loop, session, workspace):
+        """Should send lightweight items carrying the name, and document them on resolve."""
+        template = workspace / "notes" / "templates" / "list.html"
+        template.write_text("<b {% hx_get \n")
+        params = lsp.CompletionParams(
+            text_document=lsp.TextDocumentIdentifier(uri=template.as_uri()),
+            position=lsp.Position(line=0, character=13),
+        )
+
+        [item] = loop.run_until_complete(completions(session, params)).items
+
+        assert item.label == "notes_count"
+        assert item.documentation is None and item.detail is None
+        assert item.data == {"name": "notes_count"}
+
+        sent_back = lsp.CompletionItem(label=item.label, data=item.data)
+        resolved = completion_item_resolve(session, sent_back)
+
+        assert resolved.detail == "Class: NotesCount"
+        assert resolved.documentation.value.startswith("**NotesCount**")
+
+
+class TestReferences:
+    """Tests for the references handler."""
+
+    def test_returns_all_locations(self, loop, session, workspace):
+        """Should answer with every usage and the declaration when no token is given."""
+        params = reference_params(workspace / "notes" / "templates" / "list.html")
+
+        locations = loop.run_until_complete(references(session, params))
+
+        assert len(locations) == 5
+        assert locations[0].uri.endswith("views.py")
+        assert session.notifications == []
+
+    def test_streams_partial_results(self, loop, session, workspace, monkeypatch):
+        """Should send locations in batches, the current file and its app first, and answer empty."""
+        monkeypatch.setattr(server_module, "REFERENCE_BATCH_FILES", 2)
+        current = workspace / "notes" / "templates" / "list.html"
+
+        result = loop.run_until_complete(
+            references(session, reference_params(current, partial_result_token="refs"))
+        )
+
+        assert result == []
+        batches = [params.value for method, params in session.notifications if params.token == "refs"]
+        assert [len(batch) for batch in batches] == [3, 2]
+        assert batches[0][0].uri.endswith("views.py")
+        assert batches[0][1].uri == current.as_uri()
+        assert batches[0][2].uri == (workspace / "notes" / "templates" / "detail.html").as_uri()
+        assert all("/accounts/" in location.uri for location in batches[1])
+
+    def test_looks_up_next_batch_while_sending(self, loop, session, workspace, monkeypatch):
+        """Should submit each batch's lookup before sending the batch before it."""
+        monkeypatch.setattr(server_module, "REFERENCE_BATCH_FILES", 2)
+        events = []
+        submit = session.submit_to_worker
+        monkeypatch.setattr(
+            session, "submit_to_worker", lambda *args: events.append("lookup") or submit(*args)
+        )
+        session.lsp.notify = lambda method, params=None: events.append("send")
+        current = workspace / "notes" / "templates" / "list.html"
+
+        loop.run_until_complete(
+            references(session, reference_params(current, partial_result_token="refs"))
+        )
+
+        assert events[-4:] == ["lookup", "lookup", "send", "send"]
+
+    def test_reports_work_done(self, loop, session, workspace):
+        """Should report progress on a work done token and still answer with every location."""
+        params = reference_params(
+            workspace / "notes" / "templates" / "list.html", work_done_token="work"
+        )
+
+        locations = loop.run_until_complete(references(session, params))
+
+        kinds = [params.value.kind for method, params in session.notifications]
+        assert kinds[0] == "begin" and kinds[-1] == "end"
+        assert len(locations) == 5
+
+
+class TestWorkspaceSymbol:
+    """Tests for the workspace symbol handler."""
+
+    def test_finds_definitions_by_name(self, loop, session, workspace):
+        """Should answer with the matching definitions and their locations."""
+        params = lsp.WorkspaceSymbolParams(query="NotesCo")
+
+        [symbol] = loop.run_until_complete(workspace_symbol(session, params))
+
+        assert symbol.name == "notes_count"
+        assert symbol.container_name == "NotesCount"
+        assert symbol.location.uri == (workspace / "notes" / "hx_requests" / "views.py").as_uri()
+
+    def test_caps_results(self, loop, session, monkeypatch):
+        """Should return at most WORKSPACE_SYMBOL_LIMIT symbols."""
+        monkeypatch.setattr(server_module, "WORKSPACE_SYMBOL_LIMIT", 0)
+
+        symbols = loop.run_until_complete(workspace_symbol(session, lsp.WorkspaceSymbolParams(query="")))
+
+        assert symbols == []
+
+
+class TestCodeAction:
+    """Tests for the code action handler."""
+
+    def test_suggests_defined_names(self, loop, session, workspace):
+        """Should offer to replace an unknown name with the closest defined names."""
+        template = workspace / "notes" / "templates" / "list.html"
+        template.write_text("<b {% hx_get 'notes_cuont' %}></b>\n")
+        name_range = lsp.Range(
+            start=lsp.Position(line=0, character=14), end=lsp.Position(line=0, character=25)
+        )
+        diagnostic = lsp.Diagnostic(range=name_range, message="", code=UNKNOWN_HX_REQUEST)
+        params = lsp.CodeActionParams(
+            text_document=lsp.TextDocumentIdentifier(uri=template.as_uri()),
+            range=name_range,
+            context=lsp.CodeActionContext(diagnostics=[diagnostic]),
+        )
+
+        [action] = loop.run_until_complete(code_action(session, params))
+
+        assert action.title == "Change to 'notes_count'"
+        assert action.is_preferred
+        [edit] = action.edit.changes[template.as_uri()]
+        assert edit.range == name_range
+        assert edit.new_text == "notes_count"
+
+    def test_ignores_other_diagnostics(self, loop, session, workspace):
+        """Should offer nothing for diagnostics it didn't report."""
+        template = workspace / "notes" / "templates" / "list.html"
+        line = lsp.Range(start=lsp.Position(line=0, character=0), end=lsp.Position(line=1, character=0))
+        params = lsp.CodeActionParams(
+            text_document=lsp.TextDocumentIdentifier(uri=template.as_uri()),
+            range=line,
+            context=lsp.CodeActionContext(
+                diagnostics=[lsp.Diagnostic(range=line, message="", code="other")]
+            ),
+        )
+
+        assert loop.run_until_complete(code_action(session, params)) is None
@@ -0,0 +1,257 @@
+"""Tests for the store module."""
+
+import pickle
+import sqlite3
+
+import pytest
+
+from hx_requests_lsp import index as index_module
+from hx_requests_lsp.index import HxRequestIndex
+from hx_requests_lsp.store import CompactUsageStore, SqliteIndexStore, open_store
+from hx_requests_lsp.template_parser import parse_template_for_hx_requests
+
+
+@pytest.fixture
+def workspace(make_workspace, tmp_path):
+    """Create a workspace with two hx_requests and two templates, in a directory of its own."""
+    return make_workspace(
+        {
+            "app/hx_requests/views.py": {"NotesCount": "notes_count", "Orphan": "orphan"},
+            "app/templates/list.html": (
+                "<b {% hx_get 'notes_count' %}></b>\n<i {% hx_post 'missing' %}></i>\n"
+            ),
+            "app/templates/detail.html": "<b {% hx_get 'notes_count' %}></b>\n",
+        },
+        root=tmp_path / "project",
+    )
+
+
+def build(root, db_path):
+    index = HxRequestIndex(root, store=SqliteIndexStore(db_path))
+    index.build_full_index()
+    return index
+
+
+def count_parses(monkeypatch):
+    parsed = []
+    parse_disk_file = index_module._parse_disk_file
+
+    def counting(path, *args):
+        parsed.append(path)
+        return parse_disk_file(path, *args)
+
+    monkeypatch.setattr(index_module, "_parse_disk_file", counting)
+    return parsed
+
+
+# Calls made by unpickling Unpickled, which a store must never do
+UNPICKLED = []
+
+
+def record_unpickling():
+    UNPICKLED.append(True)
+
+
+class Unpickled:
+    def __reduce__(self):
+        return record_unpickling, ()
+
+
+class TestSqliteIndexStore:
+    """Tests for the SqliteIndexStore class."""
+
+    def test_queries_match_memory_store(self, workspace, tmp_path):
+        """Should answer every query the same way as the in-memory store."""
+        memory = HxRequestIndex(workspace)
+        memory.build_full_index()
+        sqlite = build(workspace, tmp_path / "index.sqlite3")
+        template = workspace / "app" / "templates" / "list.html"
+
+        assert sqlite.get_usages("notes_count") == memory.get_usages("notes_count")
+        assert sqlite.get_usages_in_file(template) == memory.get_usages_in_file(template)
+        assert sqlite.get_usage_at_position(template, 1, 20) == memory.get_usage_at_position(
+            template, 1, 20
+        )
+        assert sqlite.find_undefined_usages() == memory.find_undefined_usages()
+        assert sqlite.find_unused_definitions() == memory.find_unused_definitions()
+
+    def test_restart_only_parses_changed_files(self, workspace, tmp_path, monkeypatch):
+        """Should load unchanged files from the database instead of parsing them again."""
+        db_path = tmp_path / "index.sqlite3"
+        build(workspace, db_path).close()
+        detail = workspace / "app" / "templates" / "detail.html"
+        detail.write_text("<b {% hx_get 'orphan' %}></b>\n")
+        parsed = count_parses(monkeypatch)
+
+        index = build(workspace, db_path)
+
+        assert parsed == [str(detail)]
+        assert index.get_definition("notes_count") is not None
+        assert len(index.get_usages("notes_count")) == 1
+        assert index.find_unused_definitions() == []
+
+    def test_restart_loads_definitions_as_parsed(self, workspace, tmp_path):
+        """Should rebuild stored definitions, base classes included, as they were parsed."""
+        db_path = tmp_path / "index.sqlite3"
+        first = build(workspace, db_path)
+        parsed = first.get_definition("notes_count")
+        first.close()
+
+        stored = build(workspace, db_path).get_definition("notes_count")
+
+        assert vars(stored) == vars(parsed)
+        assert stored.base_class_info[0].name == "BaseHxRequest"
+
+    def test_never_unpickles_stored_definitions(self, workspace, tmp_path, monkeypatch):
+        """Should parse a file again, without running it, when its stored definitions aren't JSON."""
+        db_path = tmp_path / "index.sqlite3"
+        build(workspace, db_path).close()
+        with sqlite3.connect(db_path) as db:
+            db.execute("UPDATE definitions SET data = ?", (pickle.dumps(Unpickled()),))
+        parsed = count_parses(monkeypatch)
+
+        index = build(workspace, db_path)
+
+        assert UNPICKLED == []
+        assert parsed == [str(workspace / "app" / "hx_requests" / "views.py")]
+        assert index.get_definition("notes_count") is not None
+
+    def test_buffer_shadows_stored_usages(self, workspace, tmp_path):
+        """Should answer from an open buffer's usages until the buffer is closed."""
+        index = build(workspace, tmp_path / "index.sqlite3")
+        template = workspace / "app" / "templates" / "list.html"
+
+        index.update_file(template, "<b {% hx_get 'orphan' %}></b>\n", version=2)
+
+        assert [u.name for u in index.get_usages_in_file(template)] == ["orphan"]
+        assert len(index.get_usages("notes_count")) == 1
+        assert [u.name for u in index.find_undefined_usages()] == []
+
+        index.close_buffer(template)
+
+        assert [u.name for u in index.get_usages_in_file(template)] == ["notes_count", "missing"]
+        assert len(index.get_usages("notes_count")) == 2
+
+    def test_prunes_files_deleted_between_runs(self, workspace, tmp_path):
+        """Should drop stored usages of files that no longer exist."""
+        db_path = tmp_path / "index.sqlite3"
+        build(workspace, db_path).close()
+        (workspace / "app" / "templates" / "list.html").unlink()
+
+        index = build(workspace, db_path)
+
+        assert len(index.get_usages("notes_count")) == 1
+        assert index.find_undefined_usages() == []
+
+
+class TestCompactUsageStore:
+    """Tests for the CompactUsageStore class."""
+
+    def test_queries_match_memory_store(self, workspace):
+        """Should answer every query the same way as the in-memory store, re-scanning compacted files."""
+        memory = HxRequestIndex(workspace)
+        memory.build_full_index()
+        compact = HxRequestIndex(workspace, store=CompactUsageStore(budget=1))
+        compact.build_full_index()
+        template = workspace / "app" / "templates" / "list.html"
+
+        assert compact.get_usages("notes_count") == memory.get_usages("notes_count")
+        assert compact.count_usages("notes_count") == 2
+        assert compact.get_usages_in_file(template) == memory.get_usages_in_file(template)
+        assert compact.get_usage_at_position(template, 1, 20) == memory.get_usage_at_position(
+            template, 1, 20
+        )
+        assert compact.find_undefined_usages() == memory.find_undefined_usages()
+        assert compact.find_unused_definitions() == memory.find_unused_definitions()
+        assert compact.stats()["usages"] == memory.stats()["usages"]
+
+    def test_compacts_least_recently_used_files(self, workspace):
+        """Should keep the usages of recently looked-up files within the budget and count evictions."""
+        index = HxRequestIndex(workspace, store=CompactUsageStore(budget=2))
+        index.build_full_index()
+        templates = workspace / "app" / "templates"
+
+        index.get_usages_in_file(templates / "list.html")
+        stats = index.stats()
+
+        assert stats["store"] == "compact"
+        assert stats["detailed_usages"] == 2
+        assert stats["compacted_files"] == 1
+        assert stats["evictions"] >= 1
+
+        rescans = stats["rescans"]
+        index.get_usages_in_file(templates / "list.html")
+        assert index.stats()["rescans"] == rescans
+        index.get_usages_in_file(templates / "detail.html")
+        assert index.stats()["rescans"] == rescans + 1
+
+    def test_counts_without_rescanning(self, workspace):
+        """Should count usages from the file summaries."""
+        index = HxRequestIndex(workspace, store=CompactUsageStore(budget=0))
+        index.build_full_index()
+
+        assert index.count_usages("notes_count") == 2
+        assert index.count_usages("missing") == 1
+        assert index.stats()["rescans"] == 0
+
+    def test_keeps_buffer_usages(self, workspace):
+        """Should never compact the usages of an open buffer."""
+        index = HxRequestIndex(workspace, store=CompactUsageStore(budget=0))
+        index.build_full_index()
+        template = workspace / "app" / "templates" / "list.html"
+
+        index.update_file(template, "<b {% hx_get 'orphan' %}></b>\n", version=2)
+        index.get_usages("notes_count")
+
+        assert [u.name for u in index.get_usages_in_file(template)] == ["orphan"]
+        assert index.count_usages("notes_count") == 1
+
+        index.close_buffer(template)
+
+        assert [u.name for u in index.get_usages_in_file(template)] == ["notes_count", "missing"]
+
+
+class TestPinnedUsages:
+    """Tests for the usages of open buffers in the stores that pin them."""
+
+    @pytest.mark.parametrize("backend", ["compact", "sqlite"])
+    def test_positions_are_kept(self, backend, tmp_path):
+        """Should build the positions of an open buffer's usages once, not on every lookup."""
+        store = open_store(tmp_path, backend, tmp_path / "index.sqlite3")
+        path = str(tmp_path / "page.html")
+        usages = parse_template_for_hx_requests("{% hx_get 'a' %}\n{% hx_get 'b' %}", path)
+
+        store.set_usages(1, path, usages, pinned=True)
+
+        assert store.get_positions(1) == [(1, 11), (2, 11)]
+        assert store.get_positions(1) is store.get_positions(1)
+
+        store.set_usages(1, path, usages[1:], pinned=True)
+
+        assert store.get_positions(1) == [(2, 11)]
+        store.close()
+
+
+class TestOpenStore:
+    """Tests for the open_store function."""
+
+    def test_defaults_to_memory(self, tmp_path):
+        """Should keep usages in memory unless SQLite is asked for."""
+        assert not open_store(tmp_path).persistent
+
+    def test_opens_compact_store_with_budget(self, tmp_path):
+        """Should pass the usage budget to the compact store."""
+        store = open_store(tmp_path, "compact", usage_budget=100)
+
+        assert isinstance(store, CompactUsageStore)
+        assert store.budget == 100
+
+    def test_opens_sqlite_in_cache_dir(self, tmp_path, monkeypatch):
+        """Should put the database under the user's cache directory by default."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+        store = open_store(tmp_path / "project", "sqlite")
+
+        assert store.persistent
+        assert store.db_path.startswith(str(tmp_path / "cache" / "hx-requests-lsp"))
+        store.close()
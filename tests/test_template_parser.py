@@ -102,6 +102,46 @@ line 3
         # Column should point to start of 'my_action' (after the quote)
         assert usages[0].column == 14  # Position of 'm' in 'my_action'
 
+    def test_tracks_column_of_unquoted_name(self):
+        """Should point at the variable itself, not an earlier match of the same text."""
+        content = "{% if f %}{% hx_post f %}"
+        usages = parse_template_for_hx_requests(content)
+
+        assert len(usages) == 1
+        assert usages[0].column == 21
+
+    def test_hx_vals_stops_at_tag_end(self):
+        """Should not pick up hx_request_name from a later tag on the same line."""
+        content = "{% hx_vals a='1' %} {% hx_post 'x' hx_request_name='y' %}"
+        usages = parse_template_for_hx_requests(content)
+
+        assert [(u.name, u.tag_type) for u in usages] == [("x", "hx_post")]
+
+    def test_parses_hx_vals_spanning_lines(self):
+        """Should find hx_request_name on a later line of a multi-line tag."""
+        content = "<div>\n  {% hx_vals a='1'\n      b='2'\n      hx_request_name='edit_modal' %}\n</div>"
+        usages = parse_template_for_hx_requests(content)
+
+        assert len(usages) == 1
+        assert usages[0].name == "edit_modal"
+        assert usages[0].line_number == 4
+        assert usages[0].column == 23
+        assert usages[0].end_column == 33
+
+    def test_parses_name_on_line_after_tag_name(self):
+        """Should find a name that follows the tag name after a line break."""
+        content = "{% hx_post\n   'save' %}"
+        usages = parse_template_for_hx_requests(content)
+
+        assert [(u.name, u.line_number, u.column) for u in usages] == [("save", 2, 4)]
+
+    def test_unclosed_tag_stops_at_next_tag(self):
+        """An unclosed tag should not borrow arguments from the next tag."""
+        content = "{% hx_vals a='1' {% hx_get 'x' hx_request_name='y' %}"
+        usages = parse_template_for_hx_requests(content)
+
+        assert [(u.name, u.tag_type) for u in usages] == [("x", "hx_get")]
+
     def test_ignores_variable_references(self):
         """Should ignore variable references with dots."""
         content = "{% hx_post some_var.hx_name %}"